@@ -1,23 +1,90 @@
 
-import io, os, csv, json
-from typing import Optional
-from fastapi import FastAPI, UploadFile, File, Query, Body
+import io, os, re, csv, json, asyncio, logging, threading, time, contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, Query, Body, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from starlette.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from .extractors.ocr import extract_text_from_file
+from .extractors.ocr import extract_text_from_file, is_image
+from .extractors import ocr as ocr_mod, templates as templates_mod, llm as llm_mod, registry as registry_mod
+from .extractors import corrections as corrections_mod, qr as qr_mod, einvoice as einvoice_mod, split as split_mod
+from .extractors import dedup, progress, deadline, memory, items as items_mod
 from .extractors.heuristics import extract_fields_heuristic
 from .extractors.validate import validate_extraction
-from .extractors.postprocess import autofill_amounts
+from .extractors.postprocess import autofill_amounts, fix_text_fields
 from .extractors.llm import extract_fields_llm, llm_available
 from .extractors.templates import extract_fields_template
+from .extractors import metrics
+from . import profiling, results, columnar
+from .export import BULK_FORMATS, ExportError, to_isdoc, iter_pohoda
+
+_BULK_FORMATS = {**BULK_FORMATS, **columnar.FORMATS}
 
 load_dotenv()
 
-app = FastAPI(title="Invoice Extractor", version="0.3.0")
+logger = logging.getLogger(__name__)
+
+# Invoices of one multi-invoice PDF extracted concurrently
+SPLIT_WORKERS = int(os.getenv("SPLIT_WORKERS", "4"))
+# With a request deadline, the LLM is skipped when less than this is left (heuristics instead)
+LLM_MIN_BUDGET_MS = int(os.getenv("LLM_MIN_BUDGET_MS", "5000"))
+# Line items kept in a JSON response; longer tables are counted and summed, rows via /api/extract/items
+ITEMS_INLINE_MAX = int(os.getenv("ITEMS_INLINE_MAX", "1000"))
+
+# Sample used to warm up regexes, parsers and dateutil before the first request
+_WARMUP_TEXT = """Faktura - daňový doklad
+Dodavatel: Warmup s.r.o., Hlavní 1, 110 00 Praha 1
+IČO: 27082440 DIČ: CZ27082440
+Variabilní symbol: 2024001234
+Datum vystavení: 12.06.2025 Datum splatnosti: 26.06.2025 DUZP: 12.06.2025
+Základ daně: 10 000,00 Kč DPH 21 %: 2 100,00 Kč Celkem k úhradě: 12 100,00 Kč
+Způsob úhrady: převodem Banka: Komerční banka Číslo účtu: 123456789/0100
+"""
+
+_READINESS = {"ready": False, "components": {}, "warmup_ms": None}
+
+def _warm_parsers():
+    _extract_fields(_WARMUP_TEXT, "template")
+    extract_fields_heuristic(_WARMUP_TEXT)
+    return "ok"
+
+def _warm_up():
+    t0 = time.perf_counter()
+    steps = [
+        ("templates", templates_mod.warm),
+        ("parsers", _warm_parsers),
+        ("llm_client", llm_mod.warm),
+        ("registry", registry_mod.warm),
+        ("corrections", corrections_mod.warm),
+        ("qr", qr_mod.warm),
+        ("ocr", ocr_mod.warm),
+    ]
+    for name, fn in steps:
+        s = time.perf_counter()
+        try:
+            status = fn()
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            status = f"failed ({type(e).__name__})"
+        _READINESS["components"][name] = {"status": status, "ms": round((time.perf_counter() - s) * 1000, 1)}
+    _READINESS["warmup_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    _READINESS["ready"] = True
+
+@asynccontextmanager
+async def lifespan(_app):
+    # Warm up in the background: liveness (/api/health) answers immediately, /api/ready once warm
+    if os.getenv("WARMUP", "1").lower() in ("0", "false", "no"):
+        _READINESS["ready"] = True
+    else:
+        threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+    yield
+
+app = FastAPI(title="Invoice Extractor", version="0.3.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,51 +98,484 @@ class ExtractResponse(BaseModel):
     data: dict
     method: str
     validations: dict
+    timings: Optional[dict] = None
+    duplicate: Optional[dict] = None
+    invoices: Optional[List[dict]] = None
+    partial: Optional[bool] = None
+    polozky: Optional[dict] = None
 
 @app.get("/api/health")
 def health():
     return {"status": "ok"}
 
-@app.post("/api/extract", response_model=ExtractResponse)
-async def extract(file: UploadFile = File(...), method: Optional[str] = Query("auto")):
-    try:
-        content = await file.read()
-        text = extract_text_from_file(filename=file.filename, data=content)
+@app.get("/api/ready")
+def ready():
+    body = {"status": "ready" if _READINESS["ready"] else "starting", **_READINESS}
+    return JSONResponse(body, status_code=200 if _READINESS["ready"] else 503)
 
-        used_method = ""
-        result = None
+@app.get("/api/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-        # 1) Template
-        if method in ["template", "auto"]:
+def _document_text(filename: str, content: bytes, method: str, pages: Optional[List[str]] = None):
+    """
+    OCR text plus the decoded QR payment code (or None). With a QR code, image OCR is
+    skipped when the code alone has every required field, and reduced to one pass
+    when the code plus a template match on that pass cover them; otherwise the
+    first pass is reused and only the confidence fallback may follow. `pages` are PDF
+    page texts that were already extracted.
+    """
+    payment = qr_mod.scan(filename, content)
+    if pages is not None and not is_image(filename):
+        return "\n".join(pages), payment
+    if payment is None or not is_image(filename):
+        return extract_text_from_file(filename=filename, data=content), payment
+    if qr_mod.complete(qr_mod.to_result(payment)):
+        metrics.QR_OCR.inc(ocr="skipped")
+        return "", payment
+    if method in ["template", "auto"]:
+        # The first pass is kept either way: without a template match only the fallback pass follows
+        passes = ocr_mod.image_text_passes(content)
+        try:
+            text = next(passes)
             tpl_res = extract_fields_template(text)
-            if tpl_res:
-                result = tpl_res
-                used_method = "template"
+            if tpl_res and qr_mod.complete(qr_mod.merge(tpl_res, payment)):
+                metrics.QR_OCR.inc(ocr="reduced")
+                return text, payment
+            metrics.QR_OCR.inc(ocr="full")
+            return next(passes, text), payment
+        finally:
+            passes.close()
+    metrics.QR_OCR.inc(ocr="full")
+    return extract_text_from_file(filename=filename, data=content), payment
 
-        # 2) LLM
-        if result is None and (method == "llm" or (method == "auto" and llm_available())):
-            try:
+def _einvoice(filename: str, content: bytes) -> Optional[dict]:
+    """Result from an embedded / uploaded ISDOC or ZUGFeRD XML; None for ordinary documents."""
+    with metrics.timed("einvoice"):
+        return einvoice_mod.extract(filename, content)
+
+def _extract_fields(text: str, method: str, filename: str = "", payment: Optional[dict] = None,
+                    structured: Optional[dict] = None):
+    used_method = ""
+    result = None
+
+    # 0) Structured e-invoice, or the QR code alone (OCR was skipped)
+    if structured is not None:
+        result = structured
+        used_method = "isdoc"
+    elif payment and not text.strip():
+        result = qr_mod.to_result(payment)
+        used_method = "qr"
+
+    # 1) Template
+    if result is None and method in ["template", "auto"]:
+        with metrics.timed("template"):
+            tpl_res = extract_fields_template(text)
+        progress.emit("template", matched=bool(tpl_res), template=(tpl_res or {}).get("_template"))
+        if tpl_res:
+            result = tpl_res
+            used_method = "template"
+
+    # 2) LLM
+    want_llm = result is None and (method == "llm" or (method == "auto" and llm_available()))
+    left = deadline.remaining()
+    if want_llm and left is not None and left * 1000 < LLM_MIN_BUDGET_MS:
+        deadline.mark_partial("llm")
+        metrics.DEADLINE_SKIPPED.inc(stage="llm")
+        progress.emit("llm", status="skipped")
+    elif want_llm:
+        progress.emit("llm", status="started")
+        try:
+            with metrics.timed("llm"):
                 result = extract_fields_llm(text)
-                used_method = "llm"
-            except Exception:
-                result = None
+            used_method = "llm"
+        except deadline.Expired:
+            deadline.mark_partial("llm")
+            result = None
+        except Exception as e:
+            logger.warning("LLM extraction failed for %s: %s", filename, e)
+            metrics.swallowed("llm", e)
+            left = deadline.remaining()
+            if left is not None and left <= 0:
+                deadline.mark_partial("llm")  # timed out against the request deadline
+            result = None
+        progress.emit("llm", status="finished", ok=result is not None)
 
-        # 3) Heuristic fallback
-        if result is None:
+    # 3) Heuristic fallback
+    if result is None:
+        with metrics.timed("heuristics"):
             result = extract_fields_heuristic(text)
-            used_method = "heuristic" if method != "llm" else "heuristic (fallback)"
+        used_method = "heuristic" if method != "llm" else "heuristic (fallback)"
 
-        # Postprocess: compute any missing related amounts
+    # Postprocess: compute any missing related amounts
+    with metrics.timed("postprocess"):
         if isinstance(result, dict):
+            if used_method not in ("qr", "isdoc"):
+                result = fix_text_fields(result)  # OCR corrections; structured sources are exact
+            if used_method != "qr":
+                result = qr_mod.merge(result, payment)  # QR values are authoritative
             result = autofill_amounts(result)
+            result = registry_mod.apply_to_supplier(result, text)
         else:
             result = {}
-
         validations = validate_extraction(result)
-        return ExtractResponse(data=result, method=used_method, validations=validations)
-    except Exception:
+    return result, used_method, validations
+
+def _run_pipeline(filename: str, content: bytes, method: str, pages: Optional[List[str]] = None):
+    structured = _einvoice(filename, content)
+    if structured is not None:
+        return _extract_fields("", method, filename, structured=structured)  # no text extraction at all
+    text, payment = _document_text(filename, content, method, pages)
+    return _extract_fields(text, method, filename, payment)
+
+def _split_document(filename: str, content: bytes, method: str):
+    """
+    (page texts, per-invoice results) of a PDF; results are None unless the PDF holds
+    more than one invoice. Segments are extracted in parallel on SPLIT_WORKERS threads.
+    """
+    if not (filename or "").lower().endswith(".pdf") or b"EmbeddedFile" in content:
+        return None, None  # images are single invoices; PDFs with attachments take the e-invoice path
+    pages = ocr_mod.extract_pages_from_file(filename, content)
+    with metrics.timed("split"):
+        segments = split_mod.segments(pages)
+    metrics.SPLIT_INVOICES.observe(len(segments))
+    if len(segments) < 2:
+        return pages, None
+    texts = ["\n".join(pages[start:end]) for start, end in segments]
+    with ThreadPoolExecutor(max_workers=max(1, min(SPLIT_WORKERS, len(texts))), thread_name_prefix="split") as pool:
+        # Each task gets a copy of the request context so stage timings are still attributed to it
+        futures = [pool.submit(contextvars.copy_context().run, _extract_fields, text, method, filename)
+                   for text in texts]
+        outcomes = [f.result() for f in futures]
+    return pages, [{"pages": [start + 1, end], "data": result, "method": used_method, "validations": validations}
+                   for (start, end), (result, used_method, validations) in zip(segments, outcomes)]
+
+def _line_items(filename: str, content: bytes, data: dict, first: int = 0, end: Optional[int] = None):
+    """
+    The `polozky` section: up to ITEMS_INLINE_MAX rows plus the count, sum and
+    cross-check of all of them ("zkraceno" when rows were left out); None on failure.
+    """
+    tally = items_mod.Tally(items_mod.iter_items(filename, content, first, end))
+    radky = []
+    try:
+        with metrics.timed("items"):
+            for row in tally:
+                if len(radky) < ITEMS_INLINE_MAX:
+                    radky.append(row)
+    except deadline.Expired:
+        deadline.mark_partial("items")  # rows parsed so far are still returned
+    except Exception as e:
+        logger.warning("Line items failed for %s: %s", filename, e)
+        metrics.swallowed("items", e)
+        return None
+    section = {"radky": radky, **tally.summary(data)}
+    if tally.count > len(radky):
+        section["zkraceno"] = True
+    return section
+
+def _reused(match: dict):
+    stored = match.get("_result") or {}
+    metrics.DUPLICATES.inc(match=match["match"], reused="true")
+    return stored.get("data") or {}, "duplicate", stored.get("validations") or {}, dedup.public(match)
+
+def _run_with_dedup(filename: str, content: bytes, method: str, reuse: bool, pages: Optional[List[str]] = None):
+    """_run_pipeline + duplicate index; returns (result, method, validations, duplicate)."""
+    index = dedup.get_index()
+    if index is None:
+        return (*_run_pipeline(filename, content, method, pages), None)
+    with metrics.timed("dedup"):
+        sha = dedup.sha256(content)
+        match = index.find_file(sha)
+    if match and reuse:
+        return _reused(match)  # identical bytes: skip OCR as well
+    structured = _einvoice(filename, content)
+    if structured is not None:
+        text, payment = "", None
+    else:
+        text, payment = _document_text(filename, content, method, pages)
+    with metrics.timed("dedup"):
+        sig = dedup.signature(text)
+        match = match or index.find_similar(sig, text)
+    if match and reuse:
+        result, used_method, validations, duplicate = _reused(match)
+        # Index the new file under the method that actually produced the data, not "duplicate"
+        index.add(filename, sha, sig, result, match.get("method") or "", validations)
+        return result, used_method, validations, duplicate
+    result, used_method, validations = _extract_fields(text, method, filename, payment, structured)
+    with metrics.timed("dedup"):
+        match = match or index.find_key(result)
+        index.add(filename, sha, sig, result, used_method, validations)
+    if match:
+        metrics.DUPLICATES.inc(match=match["match"], reused="false")
+    return result, used_method, validations, dedup.public(match)
+
+@app.post("/api/extract", response_model=ExtractResponse)
+async def extract(file: UploadFile = File(...), method: Optional[str] = Query("auto"),
+                  timings: bool = Query(False), profile: bool = Query(False),
+                  batch: Optional[str] = Query(None), reuse: Optional[bool] = Query(None),
+                  split: bool = Query(False), items: bool = Query(False), x_profile: Optional[str] = Header(None),
+                  x_deadline_ms: Optional[int] = Header(None)):
+    if batch is not None and not results.valid_batch_id(batch):
+        return JSONResponse({"error": "Invalid batch id"}, status_code=400)
+    with metrics.track_request() as rec, deadline.track(x_deadline_ms):
+        try:
+            with metrics.timed("file_read"):
+                content = await file.read()
+        except Exception as e:
+            logger.exception("Reading upload %s failed", file.filename)
+            metrics.swallowed("extract", e)
+            content = None
+        try:
+            need = memory.estimate(file.filename, content or b"")
+        except memory.Rejected as e:
+            return JSONResponse({"error": str(e)}, status_code=413)
+        # Wait (off the event loop) until the document fits the worker's memory budget
+        if not await asyncio.to_thread(memory.BUDGET.acquire, need, _admission_timeout()):
+            return JSONResponse({"error": "Server busy, retry later"}, status_code=503, headers={"Retry-After": "5"})
+        try:
+            # OCR is CPU-bound: run it on a worker thread so the loop keeps serving (and
+            # other uploads contend for the budget); to_thread runs it in a copy_context()
+            # of this request, so timings, deadline and profiling still apply
+            response, invoices = await asyncio.to_thread(
+                _process, file.filename, content, method, reuse, split,
+                profiling.is_requested(x_profile, profile), items)
+        finally:
+            memory.BUDGET.release(need)
+        if timings:
+            response.timings = rec.as_dict()
+    if batch:
+        _record_batch(batch, file.filename, response, invoices, rec)
+    return response
+
+def _process(filename: str, content: Optional[bytes], method: str, reuse: Optional[bool], split: bool,
+             want_profile: bool = False, items: bool = False):
+    """Extraction of one upload inside a tracked request; returns (response, invoices)."""
+    with memory.track_peak():  # measured peak, next to the estimate the budget admitted it on
+        return _process_document(filename, content, method, reuse, split, want_profile, items)
+
+def _process_document(filename: str, content: Optional[bytes], method: str, reuse: Optional[bool], split: bool,
+                      want_profile: bool, items: bool):
+    invoices = None
+    try:
+        if content is None:
+            raise ValueError("Upload could not be read")
+        with profiling.profile(content, filename) if want_profile else nullcontext():
+            pages = None
+            if split:
+                pages, invoices = _split_document(filename, content, method)
+            if invoices:
+                # Several invoices: `data` is the first one, all of them are in `invoices`
+                first = invoices[0]
+                result, used_method, validations, duplicate = first["data"], first["method"], first["validations"], None
+            else:
+                result, used_method, validations, duplicate = _run_with_dedup(
+                    filename, content, method, dedup.reuse_default() if reuse is None else reuse, pages)
+        if items and invoices:
+            for inv in invoices:
+                inv["polozky"] = _line_items(filename, content, inv["data"], inv["pages"][0] - 1, inv["pages"][1])
+        response = ExtractResponse(data=result, method=used_method, validations=validations,
+                                   duplicate=duplicate, invoices=invoices,
+                                   polozky=invoices[0]["polozky"] if items and invoices else None)
+        if items and not invoices:
+            response.polozky = _line_items(filename, content, result)
+    except deadline.Expired:
+        # A stage ran out of time without a fallback of its own
+        deadline.mark_partial()
+        used_method = "timeout"
+        invoices = None
+        response = ExtractResponse(data={}, method="timeout", validations={})
+    except Exception as e:
         # Never fail hard; always return a safe payload so the frontend can proceed
-        return ExtractResponse(data={}, method="error", validations={})
+        if content is not None:
+            logger.exception("Extraction failed for %s", filename)
+            metrics.swallowed("extract", e)
+        used_method = "error"
+        invoices = None
+        response = ExtractResponse(data={}, method="error", validations={})
+    for m in [inv["method"] for inv in invoices] if invoices else [used_method]:
+        metrics.METHOD_TOTAL.inc(method=m)
+    if deadline.is_partial():
+        response.partial = True
+        metrics.PARTIAL.inc()
+    return response, invoices
+
+def _record_batch(batch: str, filename: str, response: ExtractResponse, invoices, rec):
+    # Batch records always keep timings so they can be exported as a performance dataset;
+    # a multi-invoice PDF gives one record per invoice
+    for inv in invoices or [None]:
+        body = response.model_dump(exclude_none=True, exclude={"invoices"})
+        name = filename
+        if inv is not None:
+            body.update(data=inv["data"], method=inv["method"], validations=inv["validations"])
+            if "polozky" in inv:
+                body["polozky"] = inv["polozky"]
+            name = f"{filename}#{inv['pages'][0]}-{inv['pages'][1]}"
+        record = {"filename": name, **body}
+        record.setdefault("timings", rec.as_dict())
+        results.append(batch, record)
+
+def _admission_timeout() -> float:
+    left = deadline.remaining()
+    return memory.ADMISSION_TIMEOUT if left is None else max(0.0, min(memory.ADMISSION_TIMEOUT, left))
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/api/extract/stream")
+async def extract_stream(request: Request, file: UploadFile = File(...), method: Optional[str] = Query("auto"),
+                         batch: Optional[str] = Query(None), reuse: Optional[bool] = Query(None),
+                         split: bool = Query(False), items: bool = Query(False),
+                         x_deadline_ms: Optional[int] = Header(None)):
+    """
+    /api/extract as Server-Sent Events: "upload", "page" (k/N), "stage" (each finished
+    pipeline stage with its ms), "template", "llm" (started/finished) and finally
+    "result" (the ExtractResponse with timings); "busy" instead when the document
+    does not fit the memory budget in time. Every event carries elapsed_ms since
+    the upload arrived. When the client disconnects the remaining work is cancelled.
+    """
+    if batch is not None and not results.valid_batch_id(batch):
+        return JSONResponse({"error": "Invalid batch id"}, status_code=400)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def sink(event: dict):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:  # event loop already closed
+            reporter.cancel()
+
+    reporter = progress.Reporter(sink)
+    filename = file.filename
+    content = await file.read()  # the upload is closed once this handler returns
+    try:
+        need = memory.estimate(filename, content)
+    except memory.Rejected as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+
+    def work():
+        with metrics.track_request() as rec, progress.track(reporter), deadline.track(x_deadline_ms):
+            rec.on_stage = reporter.stage
+            if not memory.BUDGET.acquire(need, _admission_timeout()):
+                progress.emit("busy")
+                return None
+            try:
+                progress.emit("upload", filename=filename, bytes=len(content))
+                response, invoices = _process(filename, content, method, reuse, split, items=items)
+            except progress.Cancelled:
+                metrics.METHOD_TOTAL.inc(method="cancelled")
+                return None
+            finally:
+                memory.BUDGET.release(need)
+            response.timings = rec.as_dict()
+        if batch:
+            _record_batch(batch, filename, response, invoices, rec)
+        return response
+
+    async def events():
+        task = asyncio.ensure_future(asyncio.to_thread(work))
+        try:
+            while not (task.done() and queue.empty()):
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    continue
+                yield _sse(event.pop("event"), event)
+            response = task.result()
+            if response is not None:
+                yield _sse("result", response.model_dump(exclude_none=True))
+        finally:
+            # Client gone (or generator closed early): stop at the next page / OCR call
+            reporter.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+class _BudgetedStream(StreamingResponse):
+    """
+    StreamingResponse holding a memory.BUDGET reservation until the response is over,
+    however it ends: finished, failed, or the client disconnected (in which case the
+    body generator is abandoned without ever reaching its finally).
+    """
+
+    def __init__(self, content, need: int, **kwargs):
+        super().__init__(content, **kwargs)
+        self._need = need
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            need, self._need = self._need, 0
+            if need:
+                memory.BUDGET.release(need)
+
+@app.post("/api/extract/items")
+async def extract_items(file: UploadFile = File(...), method: Optional[str] = Query("auto"),
+                        reuse: Optional[bool] = Query(None), x_deadline_ms: Optional[int] = Header(None)):
+    """
+    Line items as NDJSON, for tables too long for one response: {"result": ...} with
+    the header fields first, then one {"polozka": ...} per row as it is parsed, then
+    {"souhrn": ...} with the count, sum and cross-check against castka_bez_dph.
+    """
+    filename = file.filename
+    content = await file.read()
+    try:
+        need = memory.estimate(filename, content)
+    except memory.Rejected as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    if not await asyncio.to_thread(memory.BUDGET.acquire, need, memory.ADMISSION_TIMEOUT):
+        return JSONResponse({"error": "Server busy, retry later"}, status_code=503, headers={"Retry-After": "5"})
+    try:
+        with metrics.track_request(), deadline.track(x_deadline_ms):
+            response, _ = await asyncio.to_thread(_process, filename, content, method, reuse, False)
+    except BaseException:
+        memory.BUDGET.release(need)
+        raise
+
+    def lines():
+        # Rows go out as pdfplumber reads the pages; only the running count and sum are kept.
+        # The budget is returned by _BudgetedStream, also when the client leaves before the first row.
+        tally = items_mod.Tally(items_mod.iter_items(filename, content))
+        try:
+            yield json.dumps({"result": response.model_dump(exclude_none=True)}, ensure_ascii=False) + "\n"
+            with metrics.timed("items"):
+                for row in tally:
+                    yield json.dumps({"polozka": row}, ensure_ascii=False) + "\n"
+            yield json.dumps({"souhrn": tally.summary(response.data)}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.warning("Line items failed for %s: %s", filename, e)
+            metrics.swallowed("items", e)
+            yield json.dumps({"error": "Line item extraction failed", "souhrn": tally.summary(response.data)}) + "\n"
+
+    return _BudgetedStream(lines(), need, media_type="application/x-ndjson")
+
+def _profiles_denied(x_profile: Optional[str]):
+    """Same gate as taking a profile: PROFILING_ENABLED, and the X-Profile token when PROFILING_TOKEN is set."""
+    if not profiling.profiling_enabled():
+        return JSONResponse({"error": "Profiling disabled"}, status_code=404)
+    if not profiling.is_requested(x_profile, True):
+        return JSONResponse({"error": "Profiling token required"}, status_code=403)
+    return None
+
+@app.get("/api/profiles")
+def get_profiles(x_profile: Optional[str] = Header(None)):
+    denied = _profiles_denied(x_profile)
+    if denied is not None:
+        return denied
+    return {"profiles": profiling.list_profiles()}
+
+@app.get("/api/profiles/{name}")
+def get_profile(name: str, x_profile: Optional[str] = Header(None)):
+    denied = _profiles_denied(x_profile)
+    if denied is not None:
+        return denied
+    body = profiling.read_profile(name)
+    if body is None:
+        return JSONResponse({"error": "Profile not found"}, status_code=404)
+    headers = {"Content-Disposition": f'attachment; filename="{name}.collapsed"'}
+    return PlainTextResponse(body, headers=headers)
 
 # -------- Export endpoint --------
 def _flatten_dict(d, prefix=""):
@@ -146,12 +646,75 @@ async def export_file(payload: dict = Body(...)):
         content = _to_xlsx(data)
         media = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         ext = "xlsx"
+    elif fmt in ("isdoc", "pohoda"):
+        rec = {"filename": payload.get("filename"), "data": data}
+        try:
+            content = to_isdoc(rec) if fmt == "isdoc" else b"".join(iter_pohoda([rec]))
+        except ExportError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        media = "application/xml"
+        ext = "isdoc" if fmt == "isdoc" else "xml"
     else:
         return JSONResponse({"error": "Unsupported format"}, status_code=400)
 
     headers = {"Content-Disposition": f'attachment; filename="{filename}.{ext}"'}
     return StreamingResponse(io.BytesIO(content), media_type=media, headers=headers)
 
+def _bulk_response(fmt: str, records, filename: str):
+    if fmt not in _BULK_FORMATS:
+        return JSONResponse({"error": "Unsupported format"}, status_code=400)
+    if fmt in columnar.FORMATS and not columnar.available():
+        return JSONResponse({"error": "pyarrow is not installed"}, status_code=501)
+    writer, media, ext = _BULK_FORMATS[fmt]
+    try:
+        body = writer(records)
+    except ExportError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{ext}"'}
+    return StreamingResponse(body, media_type=media, headers=headers)
+
+@app.post("/api/export/bulk")
+async def export_bulk(payload: dict = Body(...)):
+    """One row per invoice; takes {"records": [...]} or {"batch_id": "..."}."""
+    fmt = (payload.get("format") or "csv").lower()
+    batch_id = payload.get("batch_id")
+    if batch_id:
+        if not results.exists(batch_id):
+            return JSONResponse({"error": "Batch not found"}, status_code=404)
+        records = results.iter_records(batch_id)
+    else:
+        records = payload.get("records")
+        if not isinstance(records, list):
+            return JSONResponse({"error": "Expected 'records' list or 'batch_id'"}, status_code=400)
+    return _bulk_response(fmt, records, payload.get("filename") or batch_id or "invoices_export")
+
+@app.get("/api/export/bulk/{batch_id}")
+def export_batch(batch_id: str, format: str = Query("csv")):
+    if not results.exists(batch_id):
+        return JSONResponse({"error": "Batch not found"}, status_code=404)
+    return _bulk_response(format.lower(), results.iter_records(batch_id), batch_id)
+
+@app.post("/api/corrections")
+async def learn_correction(payload: dict = Body(...), x_corrections_token: Optional[str] = Header(None)):
+    """
+    Record a user edit {"from", "to", "ico"?, "word"?, "case"?} as an OCR correction rule.
+    Learned rules rewrite later invoices, so every call needs CORRECTIONS_TOKEN in the
+    X-Corrections-Token header; without CORRECTIONS_TOKEN learning is off.
+    """
+    if not corrections_mod.token_ok(x_corrections_token):
+        return JSONResponse({"error": "Learning corrections needs the CORRECTIONS_TOKEN (X-Corrections-Token)"},
+                            status_code=403)
+    ico = re.sub(r"\s", "", str(payload.get("ico") or ""))
+    if ico and not re.fullmatch(r"\d{8}", ico):
+        return JSONResponse({"error": "'ico' must be the 8-digit IČO of the supplier"}, status_code=400)
+    payload["ico"] = ico or None
+    try:
+        rule = corrections_mod.learn(payload.get("from"), payload.get("to"), ico=payload.get("ico"),
+                                     word=payload.get("word", True), case=payload.get("case", "exact"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return {"ok": True, "rule": rule}
+
 # --- Serve frontend last ---
 from pathlib import Path as _Path
 _FRONTEND_DIR = str((_Path(__file__).resolve().parents[1] / "frontend").resolve())
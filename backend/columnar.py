@@ -0,0 +1,236 @@
+import os, json, tempfile, datetime, itertools
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+try:
+    from .export import _Sink, _get, normalize_record
+except ImportError:  # imported as a top-level module (scripts, tests)
+    from export import _Sink, _get, normalize_record
+
+# Columnar (Parquet / Arrow IPC) export of extraction results for analytics.
+# pyarrow is optional and imported on first use. Rows are buffered per column
+# and flushed as one row group every `row_group_size` records, so memory is
+# bounded by the row group, not by the batch.
+# One timing_<stage>_ms column per stage the records actually recorded
+# (timings.stages), so new metrics.timed stages show up without code changes.
+
+# (column, path in the record, type); the per-stage timing columns follow, see columns()
+COLUMNS = [
+    ("filename", "filename", "string"),
+    ("method", "method", "string"),
+    ("variabilni_symbol", "data.variabilni_symbol", "string"),
+    ("datum_vystaveni", "data.datum_vystaveni", "date"),
+    ("datum_splatnosti", "data.datum_splatnosti", "date"),
+    ("duzp", "data.duzp", "date"),
+    ("castka_bez_dph", "data.castka_bez_dph", "float"),
+    ("dph", "data.dph", "float"),
+    ("castka_s_dph", "data.castka_s_dph", "float"),
+    ("mena", "data.mena", "string"),
+    ("dodavatel_nazev", "data.dodavatel.nazev", "string"),
+    ("dodavatel_ico", "data.dodavatel.ico", "string"),
+    ("dodavatel_dic", "data.dodavatel.dic", "string"),
+    ("dodavatel_adresa", "data.dodavatel.adresa", "string"),
+    ("platba_zpusob", "data.platba_zpusob", "string"),
+    ("banka_prijemce", "data.banka_prijemce", "string"),
+    ("ucet_prijemce", "data.ucet_prijemce", "string"),
+    ("confidence", "data.confidence", "float"),
+    ("computed_castka_bez_dph", "data._computed.castka_bez_dph", "bool"),
+    ("computed_dph", "data._computed.dph", "bool"),
+    ("computed_castka_s_dph", "data._computed.castka_s_dph", "bool"),
+    ("valid_variabilni_symbol", "validations.variabilni_symbol", "bool"),
+    ("valid_ico", "validations.ico", "bool"),
+    ("valid_dic", "validations.dic", "bool"),
+    ("valid_sum_check", "validations.sum_check", "bool"),
+    ("timing_total_ms", "timings.total_ms", "float"),
+]
+
+DEFAULT_ROW_GROUP = 10_000
+
+
+def timing_stages(records: Iterable[dict]) -> List[str]:
+    """Stage names of the records' timings, in the order they first appear."""
+    seen = {}
+    for rec in records:
+        for stage in _get(normalize_record(rec), "timings.stages") or {}:
+            seen.setdefault(stage, None)
+    return list(seen)
+
+
+def columns(stages: Sequence[str] = ()) -> list:
+    return COLUMNS + [(f"timing_{s}_ms", f"timings.stages.{s}.ms", "float") for s in stages] + [
+        ("tesseract_calls", "timings.stages.tesseract.calls", "int"),
+    ]
+
+
+def _pa():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import pyarrow.ipc as ipc
+    except ImportError:
+        raise RuntimeError("pyarrow is not installed (pip install pyarrow)")
+    return pa, pq, ipc
+
+
+def available() -> bool:
+    try:
+        _pa()
+        return True
+    except RuntimeError:
+        return False
+
+
+def schema(stages: Sequence[str] = ()):
+    pa = _pa()[0]
+    types = {"string": pa.string(), "float": pa.float64(), "date": pa.date32(), "bool": pa.bool_(),
+             "int": pa.int32()}
+    return pa.schema([(name, types[t]) for name, _, t in columns(stages)])
+
+
+def _convert(v, kind):
+    if v is None or v == "":
+        return None
+    try:
+        if kind == "string":
+            return str(v)
+        if kind == "float":
+            return float(v)
+        if kind == "int":
+            return int(v)
+        if kind == "bool":
+            return bool(v)
+        if kind == "date":
+            return v if isinstance(v, datetime.date) else datetime.date.fromisoformat(str(v)[:10])
+    except (TypeError, ValueError):
+        return None
+    return v
+
+
+def iter_tables(records: Iterable[dict], row_group_size: int = DEFAULT_ROW_GROUP,
+                stages: Optional[Sequence[str]] = None):
+    """
+    Yield pyarrow Tables of at most `row_group_size` rows (one empty table for no records).
+    Without `stages` the timing columns are the stages recorded in a list of records,
+    or in the first row group of a stream (the schema is fixed once writing starts).
+    """
+    pa = _pa()[0]
+    if stages is None and isinstance(records, (list, tuple)):
+        stages = timing_stages(records)
+    it = iter(records)
+    first = list(itertools.islice(it, row_group_size))
+    if stages is None:
+        stages = timing_stages(first)
+    spec = columns(stages)
+    sch = schema(stages)
+    cols = {name: [] for name, _, _ in spec}
+    n = 0
+    for rec in itertools.chain(first, it):
+        rec = normalize_record(rec)
+        for name, path, kind in spec:
+            cols[name].append(_convert(_get(rec, path), kind))
+        n += 1
+        if n >= row_group_size:
+            yield pa.Table.from_pydict(cols, schema=sch)
+            cols = {name: [] for name in cols}
+            n = 0
+    if n or not first:
+        yield pa.Table.from_pydict(cols, schema=sch)
+
+
+def write_parquet(records: Iterable[dict], where, row_group_size: int = DEFAULT_ROW_GROUP,
+                  compression: str = "zstd", stages: Optional[Sequence[str]] = None) -> int:
+    """Write records to a path or binary file object; returns the number of rows."""
+    pq = _pa()[1]
+    rows = 0
+    writer = None
+    try:
+        for table in iter_tables(records, row_group_size, stages):
+            if writer is None:
+                writer = pq.ParquetWriter(where, table.schema, compression=compression)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+# Long format: one row per (document, stage) for latency analysis
+def iter_timing_rows(records: Iterable[dict]) -> Iterator[dict]:
+    for rec in records:
+        rec = normalize_record(rec)
+        timings = rec.get("timings") or {}
+        for stage, row in (timings.get("stages") or {}).items():
+            yield {"filename": rec.get("filename"), "method": rec.get("method"), "stage": stage,
+                   "ms": _convert(row.get("ms"), "float"), "calls": _convert(row.get("calls"), "int"),
+                   "total_ms": _convert(timings.get("total_ms"), "float")}
+
+
+def write_timings_parquet(records: Iterable[dict], where, row_group_size: int = DEFAULT_ROW_GROUP) -> int:
+    pa, pq, _ = _pa()
+    sch = pa.schema([("filename", pa.string()), ("method", pa.string()), ("stage", pa.string()),
+                     ("ms", pa.float64()), ("calls", pa.int32()), ("total_ms", pa.float64())])
+    rows, buf = 0, []
+    with pq.ParquetWriter(where, sch, compression="zstd") as writer:
+        for row in iter_timing_rows(records):
+            buf.append(row)
+            if len(buf) >= row_group_size:
+                writer.write_table(pa.Table.from_pylist(buf, schema=sch))
+                rows += len(buf)
+                buf = []
+        if buf:
+            writer.write_table(pa.Table.from_pylist(buf, schema=sch))
+            rows += len(buf)
+    return rows
+
+
+# -------- Streaming writers for /api/export/bulk --------
+CHUNK_BYTES = 64 * 1024
+
+
+def iter_parquet(records: Iterable[dict], row_group_size: int = DEFAULT_ROW_GROUP) -> Iterator[bytes]:
+    # The footer needs absolute offsets; go through a temp file like the XLSX writer
+    with tempfile.TemporaryFile() as tmp:
+        write_parquet(records, tmp, row_group_size)
+        tmp.seek(0)
+        while True:
+            block = tmp.read(CHUNK_BYTES)
+            if not block:
+                break
+            yield block
+
+
+def iter_arrow(records: Iterable[dict], row_group_size: int = DEFAULT_ROW_GROUP) -> Iterator[bytes]:
+    """Arrow IPC stream format: record batches go out as soon as they are built."""
+    pa, _, ipc = _pa()
+    sink = _Sink()
+    writer = None
+    for table in iter_tables(records, row_group_size):
+        if writer is None:
+            writer = ipc.new_stream(pa.PythonFile(sink, mode="w"), table.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+FORMATS = {
+    "parquet": (iter_parquet, "application/vnd.apache.parquet", "parquet"),
+    "arrow": (iter_arrow, "application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def read_records(paths: Iterable[str]) -> Iterator[dict]:
+    """Records from JSONL files (results store, JSONL export) or single-record JSON files (corpus sidecars)."""
+    for path in paths:
+        if path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                rec = json.load(f)
+            if isinstance(rec, dict):
+                rec.setdefault("filename", (rec.get("_meta") or {}).get("file") or os.path.basename(path))
+                yield rec
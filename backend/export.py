@@ -0,0 +1,488 @@
+import io, os, re, csv, json, uuid, zipfile, tempfile
+from typing import Iterable, Iterator, Optional
+from xml.sax.saxutils import XMLGenerator
+
+# Streaming bulk export: one row per invoice, one column per field.
+# Writers consume an iterable of records and yield bytes as they go, so memory
+# stays constant no matter how many invoices are exported.
+
+COLUMNS = [
+    ("filename", "filename"),
+    ("method", "method"),
+    ("variabilni_symbol", "data.variabilni_symbol"),
+    ("datum_vystaveni", "data.datum_vystaveni"),
+    ("datum_splatnosti", "data.datum_splatnosti"),
+    ("duzp", "data.duzp"),
+    ("castka_bez_dph", "data.castka_bez_dph"),
+    ("dph", "data.dph"),
+    ("castka_s_dph", "data.castka_s_dph"),
+    ("mena", "data.mena"),
+    ("dodavatel_nazev", "data.dodavatel.nazev"),
+    ("dodavatel_ico", "data.dodavatel.ico"),
+    ("dodavatel_dic", "data.dodavatel.dic"),
+    ("dodavatel_adresa", "data.dodavatel.adresa"),
+    ("platba_zpusob", "data.platba_zpusob"),
+    ("banka_prijemce", "data.banka_prijemce"),
+    ("ucet_prijemce", "data.ucet_prijemce"),
+    ("confidence", "data.confidence"),
+    ("valid_variabilni_symbol", "validations.variabilni_symbol"),
+    ("valid_ico", "validations.ico"),
+    ("valid_dic", "validations.dic"),
+    ("valid_sum_check", "validations.sum_check"),
+]
+
+# Fixed widths instead of autosizing: autosizing needs every cell in memory
+_XLSX_WIDTHS = {"filename": 28, "dodavatel_nazev": 36, "dodavatel_adresa": 48, "banka_prijemce": 28,
+                "ucet_prijemce": 26, "platba_zpusob": 18}
+
+CHUNK_ROWS = 500
+CHUNK_BYTES = 64 * 1024
+
+
+class ExportError(ValueError):
+    """A record (or the configuration) does not allow a valid document in the requested format."""
+
+
+def normalize_record(rec: dict) -> dict:
+    """Accept either an /api/extract response ({"data": ..., "method": ...}) or a bare data dict."""
+    if isinstance(rec, dict) and isinstance(rec.get("data"), dict):
+        return rec
+    return {"data": rec if isinstance(rec, dict) else {}}
+
+
+def _get(d, path):
+    cur = d
+    for part in path.split("."):
+        if not isinstance(cur, dict):
+            return None
+        cur = cur.get(part)
+    return cur
+
+
+def record_row(rec: dict) -> list:
+    rec = normalize_record(rec)
+    return [_get(rec, path) for _, path in COLUMNS]
+
+
+def iter_csv(records: Iterable[dict]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow([name for name, _ in COLUMNS])
+    for n, rec in enumerate(records, 1):
+        w.writerow(["" if v is None else v for v in record_row(rec)])
+        if n % CHUNK_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def iter_jsonl(records: Iterable[dict]) -> Iterator[bytes]:
+    chunk = []
+    for n, rec in enumerate(records, 1):
+        chunk.append(json.dumps(normalize_record(rec), ensure_ascii=False, default=str))
+        if n % CHUNK_ROWS == 0:
+            yield ("\n".join(chunk) + "\n").encode("utf-8")
+            chunk = []
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode("utf-8")
+
+
+def iter_xlsx(records: Iterable[dict]) -> Iterator[bytes]:
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Invoices")
+    for i, (name, _) in enumerate(COLUMNS, 1):
+        ws.column_dimensions[get_column_letter(i)].width = _XLSX_WIDTHS.get(name, 16)
+    ws.append([name for name, _ in COLUMNS])
+    for rec in records:
+        ws.append(["" if v is None else v for v in record_row(rec)])
+    # The zip container is only complete after save(); spool it through a temp file
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            block = tmp.read(CHUNK_BYTES)
+            if not block:
+                break
+            yield block
+
+
+# -------- Accounting XML (ISDOC 6, Pohoda data-pack) --------
+# Written with XMLGenerator element by element; output is handed out after each
+# invoice so a batch of any size streams without building a DOM.
+
+ISDOC_NS = "http://isdoc.cz/namespace/2013"
+ISDOC_VERSION = "6.0.2"
+POHODA_NS = {
+    "dat": "http://www.stormware.cz/schema/version_2/data.xsd",
+    "inv": "http://www.stormware.cz/schema/version_2/invoice.xsd",
+    "typ": "http://www.stormware.cz/schema/version_2/type.xsd",
+}
+
+# UN/ECE 4461 codes used by ISDOC and Pohoda payment types
+_PAYMENT_CODES = [
+    (("hotov", "cash"), "10", "cash"),
+    (("kart", "card"), "48", "creditcard"),
+    (("dobír", "dobir", "cod"), "50", "delivery"),
+]
+
+
+class _Sink:
+    """File-like buffer that a writer (XML, zip, Arrow IPC) fills and the generator drains."""
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, b):
+        # bytes() copies buffers the writer may reuse (pyarrow passes memoryviews)
+        b = b.encode("utf-8") if isinstance(b, str) else bytes(b)
+        self.parts.append(b)
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self.parts)
+        self.parts = []
+        return out
+
+
+class _Xml:
+    def __init__(self, out):
+        self.g = XMLGenerator(out, encoding="utf-8", short_empty_elements=True)
+
+    def start(self, name, attrs=None):
+        self.g.startElement(name, attrs or {})
+
+    def end(self, name):
+        self.g.endElement(name)
+
+    def leaf(self, name, value=None, attrs=None):
+        self.g.startElement(name, attrs or {})
+        if value is not None:
+            self.g.characters(str(value))
+        self.g.endElement(name)
+
+
+def _num(v) -> Optional[float]:
+    if v is None or v == "":
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _amt(v) -> str:
+    return f"{(v or 0.0):.2f}"
+
+
+def _amounts(data: dict):
+    """(base, vat, total, vat_percent) with missing values derived from the others."""
+    base, vat, total = _num(data.get("castka_bez_dph")), _num(data.get("dph")), _num(data.get("castka_s_dph"))
+    if total is None and base is not None:
+        total = base + (vat or 0.0)
+    if base is None and total is not None:
+        base = total - (vat or 0.0)
+    if vat is None and base is not None and total is not None:
+        vat = round(total - base, 2)
+    percent = 0
+    if base and vat:
+        rate = vat / base * 100
+        percent = min((21, 12, 15, 10, 0), key=lambda r: abs(r - rate))
+    return base or 0.0, vat or 0.0, total or 0.0, percent
+
+
+def _payment(data: dict):
+    txt = (data.get("platba_zpusob") or "").lower()
+    for keys, code, pohoda in _PAYMENT_CODES:
+        if any(k in txt for k in keys):
+            return code, pohoda
+    return "42", "draft"
+
+
+def _account(data: dict):
+    """(account number, bank code, iban) from 'prefix-123456789/0100' or an IBAN."""
+    acc = re.sub(r"\s+", "", data.get("ucet_prijemce") or "")
+    if re.match(r"^[A-Z]{2}\d{2}[A-Z0-9]{10,30}$", acc):
+        return "", "", acc
+    m = re.match(r"^([\d-]+)/(\d{4})$", acc)
+    if m:
+        return m.group(1), m.group(2), ""
+    return acc, "", ""
+
+
+def _address(adresa: Optional[str]):
+    """Split 'Ulice 12, 110 00 Praha 1' into (street, number, city, zip); falls back to street only."""
+    adresa = (adresa or "").strip()
+    street = number = city = zip_code = ""
+    m = re.search(r"(\d{3})\s?(\d{2})\s+([^,\d][^,]*)", adresa)
+    if m:
+        zip_code, city = m.group(1) + m.group(2), m.group(3).strip()
+        adresa = (adresa[:m.start()] + adresa[m.end():]).strip(" ,")
+    m = re.match(r"^(.*?)\s+(\d+[\w/]*)$", adresa)
+    if m:
+        street, number = m.group(1).strip(" ,"), m.group(2)
+    else:
+        street = adresa
+    return street, number, city, zip_code
+
+
+def _currency(data: dict):
+    """(currency, CZK per unit) of a record; ExportError for a foreign currency without data.kurz."""
+    currency = (data.get("mena") or "CZK").upper()
+    if currency == "CZK":
+        return currency, 1.0
+    rate = _num(data.get("kurz"))
+    if not rate or rate <= 0:
+        raise ExportError(f"Invoice in {currency} needs an exchange rate to CZK (data.kurz)")
+    return currency, rate
+
+
+def isdoc_check(rec: dict):
+    """Raise ExportError when the record cannot give a valid ISDOC (no issue date, no exchange rate)."""
+    data = normalize_record(rec).get("data") or {}
+    if not (data.get("datum_vystaveni") or data.get("duzp")):
+        raise ExportError("Invoice has no issue date (datum_vystaveni / duzp)")
+    _currency(data)
+
+
+def _write_isdoc(x: _Xml, rec: dict):
+    isdoc_check(rec)
+    data = rec.get("data") or {}
+    sup = data.get("dodavatel") or {}
+    base, vat, total, percent = _amounts(data)
+    currency, rate = _currency(data)
+    acc_no, bank_code, iban = _account(data)
+    pay_code, _ = _payment(data)
+    vs = str(data.get("variabilni_symbol") or "")
+    issue = data.get("datum_vystaveni") or data.get("duzp")
+    seed = json.dumps([rec.get("filename"), vs, sup.get("ico"), issue], ensure_ascii=False)
+    foreign = currency != "CZK"
+
+    def money(name, value, curr_first=True):
+        # Extracted amounts are in the invoice currency; ISDOC wants CZK plus the *Curr twin for foreign ones
+        if foreign and curr_first:
+            x.leaf(name + "Curr", _amt(value))
+        x.leaf(name, _amt((value or 0.0) * rate))
+        if foreign and not curr_first:
+            x.leaf(name + "Curr", _amt(value))
+
+    x.start("Invoice", {"xmlns": ISDOC_NS, "version": ISDOC_VERSION})
+    x.leaf("DocumentType", 1)
+    x.leaf("ID", vs or rec.get("filename") or "N/A")
+    x.leaf("UUID", str(uuid.uuid5(uuid.NAMESPACE_URL, seed)).upper())
+    x.leaf("IssueDate", issue)
+    if data.get("duzp"):
+        x.leaf("TaxPointDate", data["duzp"])
+    x.leaf("VATApplicable", "true" if vat else "false")
+    x.leaf("ElectronicPossibilityAgreementReference", "")
+    x.leaf("LocalCurrencyCode", "CZK")
+    if foreign:
+        x.leaf("ForeignCurrencyCode", currency)
+    x.leaf("CurrRate", f"{rate:g}")
+    x.leaf("RefCurrRate", 1)
+
+    x.start("AccountingSupplierParty"); x.start("Party")
+    x.start("PartyIdentification"); x.leaf("ID", sup.get("ico") or ""); x.end("PartyIdentification")
+    x.start("PartyName"); x.leaf("Name", sup.get("nazev") or ""); x.end("PartyName")
+    street, number, city, zip_code = _address(sup.get("adresa"))
+    x.start("PostalAddress")
+    x.leaf("StreetName", street); x.leaf("BuildingNumber", number)
+    x.leaf("CityName", city); x.leaf("PostalZone", zip_code)
+    x.start("Country"); x.leaf("IdentificationCode", "CZ"); x.leaf("Name", ""); x.end("Country")
+    x.end("PostalAddress")
+    if sup.get("dic"):
+        x.start("PartyTaxScheme"); x.leaf("CompanyID", sup["dic"]); x.leaf("TaxScheme", "VAT"); x.end("PartyTaxScheme")
+    x.end("Party"); x.end("AccountingSupplierParty")
+    # The customer is not extracted
+    x.start("AnonymousCustomerParty"); x.leaf("ID", ""); x.leaf("IDScheme", ""); x.end("AnonymousCustomerParty")
+
+    x.start("InvoiceLines"); x.start("InvoiceLine")
+    x.leaf("ID", 1)
+    money("LineExtensionAmount", base)
+    money("LineExtensionAmountTaxInclusive", total)
+    x.leaf("LineExtensionTaxAmount", _amt((vat or 0.0) * rate))
+    x.leaf("UnitPrice", _amt((base or 0.0) * rate))
+    x.leaf("UnitPriceTaxInclusive", _amt((total or 0.0) * rate))
+    x.start("ClassifiedTaxCategory"); x.leaf("Percent", percent); x.leaf("VATCalculationMethod", 0); x.end("ClassifiedTaxCategory")
+    x.end("InvoiceLine"); x.end("InvoiceLines")
+
+    x.start("TaxTotal"); x.start("TaxSubTotal")
+    for name, val in (("TaxableAmount", base), ("TaxAmount", vat), ("TaxInclusiveAmount", total),
+                      ("AlreadyClaimedTaxableAmount", 0), ("AlreadyClaimedTaxAmount", 0),
+                      ("AlreadyClaimedTaxInclusiveAmount", 0), ("DifferenceTaxableAmount", base),
+                      ("DifferenceTaxAmount", vat), ("DifferenceTaxInclusiveAmount", total)):
+        money(name, val)
+    x.start("TaxCategory"); x.leaf("Percent", percent); x.end("TaxCategory")
+    x.end("TaxSubTotal"); money("TaxAmount", vat); x.end("TaxTotal")
+
+    x.start("LegalMonetaryTotal")
+    for name, val in (("TaxExclusiveAmount", base), ("TaxInclusiveAmount", total),
+                      ("AlreadyClaimedTaxExclusiveAmount", 0), ("AlreadyClaimedTaxInclusiveAmount", 0),
+                      ("DifferenceTaxExclusiveAmount", base), ("DifferenceTaxInclusiveAmount", total),
+                      ("PayableRoundingAmount", 0), ("PaidDepositsAmount", 0), ("PayableAmount", total)):
+        money(name, val, curr_first=False)  # here the *Curr elements follow their CZK twins
+    x.end("LegalMonetaryTotal")
+
+    x.start("PaymentMeans"); x.start("Payment")
+    x.leaf("PaidAmount", _amt(total))  # what is actually paid, in the invoice currency
+    x.leaf("PaymentMeansCode", pay_code)
+    x.start("Details")
+    x.leaf("PaymentDueDate", data.get("datum_splatnosti") or issue)
+    x.leaf("ID", acc_no); x.leaf("BankCode", bank_code); x.leaf("Name", data.get("banka_prijemce") or "")
+    x.leaf("IBAN", iban); x.leaf("BIC", ""); x.leaf("VariableSymbol", vs)
+    x.end("Details")
+    x.end("Payment"); x.end("PaymentMeans")
+    x.end("Invoice")
+
+
+def isdoc_name(rec: dict, n: int) -> str:
+    vs = str((rec.get("data") or {}).get("variabilni_symbol") or "")
+    stem = re.sub(r"[^A-Za-z0-9_.-]", "_", vs or os.path.splitext(rec.get("filename") or "")[0]) or "invoice"
+    return f"{n:06d}_{stem}.isdoc"
+
+
+def to_isdoc(rec: dict) -> bytes:
+    """A single ISDOC document; ExportError when the record lacks what ISDOC requires."""
+    sink = _Sink()
+    x = _Xml(sink)
+    x.g.startDocument()
+    _write_isdoc(x, normalize_record(rec))
+    x.g.endDocument()
+    return sink.drain()
+
+
+def iter_isdoc_zip(records: Iterable[dict]) -> Iterator[bytes]:
+    """
+    ISDOC has no multi-invoice envelope; a batch becomes a zip of .isdoc files, streamed
+    entry by entry. Records that cannot be valid ISDOC are left out and listed with
+    the reason in skipped.txt.
+    """
+    sink = _Sink()
+    skipped = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for n, rec in enumerate(records, 1):
+            rec = normalize_record(rec)
+            try:
+                isdoc_check(rec)
+            except ExportError as e:
+                skipped.append(f"{n}\t{rec.get('filename') or ''}\t{e}")
+                continue
+            with zf.open(isdoc_name(rec, n), "w") as dest:
+                x = _Xml(dest)
+                x.g.startDocument()
+                _write_isdoc(x, rec)
+                x.g.endDocument()
+            yield sink.drain()
+        if skipped:
+            zf.writestr("skipped.txt", "\n".join(skipped) + "\n")
+    yield sink.drain()
+
+
+def _write_pohoda_item(x: _Xml, rec: dict, n: int):
+    data = rec.get("data") or {}
+    sup = data.get("dodavatel") or {}
+    base, vat, total, percent = _amounts(data)
+    acc_no, bank_code, _ = _account(data)
+    _, pay_type = _payment(data)
+    currency = (data.get("mena") or "CZK").upper()
+
+    x.start("dat:dataPackItem", {"id": f"INV{n:06d}", "version": "2.0"})
+    x.start("inv:invoice", {"version": "2.0"})
+    x.start("inv:invoiceHeader")
+    x.leaf("inv:invoiceType", "receivedInvoice")
+    if data.get("variabilni_symbol"):
+        x.leaf("inv:symVar", data["variabilni_symbol"])
+        x.leaf("inv:originalDocument", data["variabilni_symbol"])
+    if data.get("datum_vystaveni"):
+        x.leaf("inv:date", data["datum_vystaveni"])
+    if data.get("duzp"):
+        x.leaf("inv:dateTax", data["duzp"])
+    if data.get("datum_splatnosti"):
+        x.leaf("inv:dateDue", data["datum_splatnosti"])
+    x.leaf("inv:text", f"Faktura {sup.get('nazev') or ''}".strip()[:240])
+    x.start("inv:partnerIdentity"); x.start("typ:address")
+    street, number, city, zip_code = _address(sup.get("adresa"))
+    for tag, val in (("typ:company", sup.get("nazev")), ("typ:city", city),
+                     ("typ:street", " ".join(p for p in (street, number) if p)), ("typ:zip", zip_code),
+                     ("typ:ico", sup.get("ico")), ("typ:dic", sup.get("dic"))):
+        if val:
+            x.leaf(tag, val)
+    x.end("typ:address"); x.end("inv:partnerIdentity")
+    x.start("inv:paymentType"); x.leaf("typ:paymentType", pay_type); x.end("inv:paymentType")
+    if acc_no:
+        x.start("inv:paymentAccount"); x.leaf("typ:accountNo", acc_no)
+        if bank_code:
+            x.leaf("typ:bankCode", bank_code)
+        x.end("inv:paymentAccount")
+    x.end("inv:invoiceHeader")
+
+    x.start("inv:invoiceSummary")
+    x.leaf("inv:roundingDocument", "none")
+    if currency == "CZK":
+        x.start("inv:homeCurrency")
+        if percent == 21:
+            x.leaf("typ:priceHigh", _amt(base)); x.leaf("typ:priceHighVAT", _amt(vat)); x.leaf("typ:priceHighSum", _amt(total))
+        elif percent:
+            x.leaf("typ:priceLow", _amt(base)); x.leaf("typ:priceLowVAT", _amt(vat)); x.leaf("typ:priceLowSum", _amt(total))
+        else:
+            x.leaf("typ:priceNone", _amt(total))
+        x.end("inv:homeCurrency")
+    else:
+        x.start("inv:foreignCurrency")
+        x.start("typ:currency"); x.leaf("typ:ids", currency); x.end("typ:currency")
+        x.leaf("typ:priceSum", _amt(total))
+        x.end("inv:foreignCurrency")
+    x.end("inv:invoiceSummary")
+    x.end("inv:invoice")
+    x.end("dat:dataPackItem")
+
+
+def pohoda_ico() -> str:
+    """IČO of the importing company (POHODA_ICO); Pohoda rejects a data-pack without it."""
+    ico = re.sub(r"\s", "", os.getenv("POHODA_ICO", ""))
+    if not re.fullmatch(r"\d{8}", ico):
+        raise ExportError("POHODA_ICO must be set to the 8-digit IČO of the importing company")
+    return ico
+
+
+def iter_pohoda(records: Iterable[dict]) -> Iterator[bytes]:
+    """
+    Pohoda XML data-pack with one dataPackItem per invoice. POHODA_ICO is the importing
+    company's IČO; it is checked here, before streaming starts (ExportError).
+    """
+    return _iter_pohoda(records, pohoda_ico())
+
+
+def _iter_pohoda(records: Iterable[dict], ico: str) -> Iterator[bytes]:
+    sink = _Sink()
+    x = _Xml(sink)
+    x.g.startDocument()
+    attrs = {f"xmlns:{k}": v for k, v in POHODA_NS.items()}
+    attrs.update({"id": "ExtrakceFaktur", "ico": ico, "application": "ExtrakceFaktur",
+                  "version": "2.0", "note": "Import faktur"})
+    x.start("dat:dataPack", attrs)
+    for n, rec in enumerate(records, 1):
+        _write_pohoda_item(x, normalize_record(rec), n)
+        if n % 50 == 0:
+            yield sink.drain()
+    x.end("dat:dataPack")
+    x.g.endDocument()
+    yield sink.drain()
+
+
+BULK_FORMATS = {
+    "csv": (iter_csv, "text/csv", "csv"),
+    "jsonl": (iter_jsonl, "application/x-ndjson", "jsonl"),
+    "xlsx": (iter_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "pohoda": (iter_pohoda, "application/xml", "xml"),
+    "isdoc": (iter_isdoc_zip, "application/zip", "zip"),
+}
@@ -0,0 +1,235 @@
+"""
+Vectorized (NumPy) batch variants of validate_extraction and autofill_amounts.
+
+Input is columnar: one list or array per field. Results are identical to the
+scalar functions; elements the fast path cannot decide exactly (non-ASCII
+text, "VS ..." prefixes, amounts given as strings, values next to a rounding
+tie, ...) are handed to the scalar code, so the fast path only has to be right
+for the common case. Amount columns use NaN for None.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from .utils import parse_amount
+from .validate import _is_vs, _ico_checksum, _dic_valid
+from .postprocess import _round2
+
+AMOUNT_FIELDS = ("castka_bez_dph", "dph", "castka_s_dph")
+MAX_WIDTH = 32  # longer strings go through the scalar path instead of widening the matrix
+
+
+def _codepoints(values: Sequence):
+    """Strings as a (n, width) uint32 matrix + lengths; `slow` marks rows the matrix can't represent."""
+    strs = [str(v) if v else "" for v in values]
+    lens = np.fromiter(map(len, strs), dtype=np.int64, count=len(strs))
+    slow = lens > MAX_WIDTH
+    arr = np.array([s if len(s) <= MAX_WIDTH else "" for s in strs] or [""], dtype="U")
+    cps = arr.view(np.uint32).reshape(len(arr), -1)[:len(strs)]
+    lens = np.where(slow, 0, lens)
+    # NumPy drops trailing NULs; such strings are left to the scalar code
+    slow |= np.char.str_len(arr[:len(strs)]) != lens
+    in_str = np.arange(cps.shape[1]) < lens[:, None]
+    return cps, lens, slow, in_str
+
+
+def _fill_slow(res: np.ndarray, mask: np.ndarray, values: Sequence, fn):
+    for i in np.flatnonzero(mask):
+        res[i] = fn(values[i])
+    return res
+
+
+def ico_valid(values: Sequence) -> np.ndarray:
+    """Vectorized validate._ico_checksum."""
+    cps, lens, slow, in_str = _codepoints(values)
+    slow |= ((cps >= 128) & in_str).any(1)  # Unicode digits count for \D in the scalar code
+    isdig = (cps >= 48) & (cps <= 57)
+    if cps.shape[1] < 8:
+        cps = np.pad(cps, ((0, 0), (0, 8 - cps.shape[1])))
+        isdig = np.pad(isdig, ((0, 0), (0, 8 - isdig.shape[1])))
+    order = np.argsort(~isdig, axis=1, kind="stable")[:, :8]
+    digits = np.take_along_axis(cps, order, 1).astype(np.int64) - 48
+    s = (digits[:, :7] * np.arange(8, 1, -1)).sum(1)
+    mod = s % 11
+    check = np.where(mod == 0, 1, np.where(mod == 1, 0, np.where(mod == 10, 1, 11 - mod)))
+    res = (isdig.sum(1) == 8) & (digits[:, 7] == check) & (lens > 0)
+    return _fill_slow(res, slow, values, _ico_checksum)
+
+
+def vs_valid(values: Sequence) -> np.ndarray:
+    """Vectorized validate._is_vs."""
+    cps, lens, slow, in_str = _codepoints(values)
+    printable = ((cps >= 33) & (cps <= 126)) | ~in_str
+    first = cps[:, 0]
+    # Whitespace, non-ASCII and anything that may carry a "VS"/"Variabilní symbol" prefix: scalar
+    fast = printable.all(1) & (first != ord("V")) & (first != ord("v")) & ~slow
+    allowed = ((cps >= 48) & (cps <= 57)) | ((cps >= 65) & (cps <= 90)) | ~in_str
+    res = fast & allowed.all(1) & (lens >= 2) & (lens <= 12)
+    return _fill_slow(res, ~fast & (lens > 0) | slow, values, _is_vs)
+
+
+def dic_valid(values: Sequence) -> np.ndarray:
+    """Vectorized validate._dic_valid."""
+    cps, lens, slow, in_str = _codepoints(values)
+    fast = (((cps >= 33) & (cps <= 126)) | ~in_str).all(1) & ~slow
+    up = np.where((cps >= 97) & (cps <= 122), cps - 32, cps)
+    alpha = (up >= 65) & (up <= 90)
+    alnum = alpha | ((up >= 48) & (up <= 57)) | ~in_str
+    if up.shape[1] < 2:
+        alpha = np.pad(alpha, ((0, 0), (0, 2 - alpha.shape[1])))
+    res = fast & (lens >= 10) & (lens <= 14) & alpha[:, 0] & alpha[:, 1] & alnum.all(1)
+    return _fill_slow(res, ~fast & (lens > 0) | slow, values, _dic_valid)
+
+
+def _exact_2dp(x: np.ndarray) -> np.ndarray:
+    """Floats whose str() has at most two decimals, i.e. parse_amount(x) == x."""
+    with np.errstate(invalid="ignore"):
+        return np.isfinite(x) & (np.abs(x) < 1e13) & (np.round(x, 2) == x)
+
+
+def amounts(values) -> np.ndarray:
+    """Vectorized parse_amount; NaN stands for None."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiu":
+        x = values.astype(np.float64)
+        fast = _exact_2dp(x)
+        out = np.where(fast, x, np.nan)
+        for i in np.flatnonzero(~fast & ~np.isnan(x)):
+            v = parse_amount(values[i].item())
+            out[i] = np.nan if v is None else v
+        return out
+    n = len(values)
+    out = np.full(n, np.nan)
+    num_idx, num_val, memo = [], [], {}
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        if isinstance(v, (float, int)) and not isinstance(v, bool):
+            num_idx.append(i)
+            num_val.append(v)
+            continue
+        key = v if isinstance(v, str) else None
+        if key is not None and key in memo:
+            r = memo[key]
+        else:
+            r = parse_amount(v)
+            if key is not None:
+                memo[key] = r
+        if r is not None:
+            out[i] = r
+    if num_idx:
+        idx = np.asarray(num_idx)
+        x = np.asarray(num_val, dtype=np.float64)
+        ok = _exact_2dp(x)
+        out[idx[ok]] = x[ok]
+        for j in np.flatnonzero(~ok):
+            r = parse_amount(num_val[j])
+            out[idx[j]] = np.nan if r is None else r
+    return out
+
+
+def round2(x: np.ndarray) -> np.ndarray:
+    """Vectorized postprocess._round2 (NaN stays NaN)."""
+    y = x + 1e-9
+    scaled = y * 100
+    out = np.rint(scaled) / 100
+    with np.errstate(invalid="ignore"):
+        # Near a .5 tie the float product may round differently than round(); defer to Python there
+        tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-3
+        amb = ~np.isnan(x) & (tie | (np.abs(y) >= 1e9))
+    for i in np.flatnonzero(amb):
+        out[i] = _round2(float(x[i]))
+    return out
+
+
+def sum_check(bez, dph, s_dph, tol: float = 0.03):
+    """Vectorized validate._sum_valid → (ok, known); known=False corresponds to None."""
+    b, d, s = amounts(bez), amounts(dph), amounts(s_dph)
+    known = ~np.isnan(b) & ~np.isnan(d) & ~np.isnan(s)
+    with np.errstate(invalid="ignore"):
+        ok = known & (np.abs((b + d) - s) <= tol)
+    return ok, known
+
+
+def validate_columns(cols: Dict[str, Sequence]) -> Dict[str, np.ndarray]:
+    """Batch validate_extraction; keys: variabilni_symbol, ico, dic (as in the scalar result), sum_check, sum_known."""
+    n = len(next(iter(cols.values())))
+    none = [None] * n
+    ok, known = sum_check(*(cols.get(k, none) for k in AMOUNT_FIELDS))
+    return {
+        "variabilni_symbol": vs_valid(cols.get("variabilni_symbol", none)),
+        "ico": ico_valid(cols.get("ico", none)),
+        "dic": dic_valid(cols.get("dic", none)),
+        "sum_check": ok,
+        "sum_known": known,
+    }
+
+
+def autofill_columns(cols: Dict[str, Sequence]) -> Dict[str, np.ndarray]:
+    """Batch autofill_amounts: amount arrays (NaN = None) and computed_* flags."""
+    n = len(next(iter(cols.values())))
+    none = [None] * n
+    b, d, s = (amounts(cols.get(k, none)) for k in AMOUNT_FIELDS)
+    nb, nd, ns = np.isnan(b), np.isnan(d), np.isnan(s)
+
+    c1 = ~nb & ~ns & nd
+    with np.errstate(invalid="ignore"):
+        d1 = round2(np.where(c1, s - b, np.nan))
+        d1 = np.where((d1 < 0) & (np.abs(d1) < 0.03), 0.0, d1)
+        exempt = np.abs(b - s) < 0.01
+    comp_d = c1 & ~exempt
+    d = np.where(comp_d, d1, d)
+    nd = np.isnan(d)
+
+    comp_b = ~ns & ~nd & nb
+    b = np.where(comp_b, round2(np.where(comp_b, s - d, np.nan)), b)
+    nb = np.isnan(b)
+
+    comp_s = ~nb & ~nd & ns
+    s = np.where(comp_s, round2(np.where(comp_s, b + d, np.nan)), s)
+
+    return {
+        "castka_bez_dph": round2(b), "dph": round2(d), "castka_s_dph": round2(s),
+        "computed_castka_bez_dph": comp_b, "computed_dph": comp_d, "computed_castka_s_dph": comp_s,
+    }
+
+
+# -------- record helpers --------
+def columns_from_records(records: Iterable[dict]) -> Dict[str, List]:
+    cols = {k: [] for k in ("variabilni_symbol", "ico", "dic") + AMOUNT_FIELDS}
+    for r in records:
+        sup = r.get("dodavatel")
+        if not isinstance(sup, dict):
+            sup = {}
+        cols["variabilni_symbol"].append(r.get("variabilni_symbol"))
+        cols["ico"].append(sup.get("ico"))
+        cols["dic"].append(sup.get("dic"))
+        for k in AMOUNT_FIELDS:
+            cols[k].append(r.get(k))
+    return cols
+
+
+def autofill_records(records: List[dict]) -> List[dict]:
+    """In-place batch autofill_amounts over data dicts (same result as calling it on each)."""
+    out = autofill_columns(columns_from_records(records))
+    for i, r in enumerate(records):
+        if not isinstance(r, dict):
+            continue
+        for k in AMOUNT_FIELDS:
+            v = out[k][i]
+            if not np.isnan(v):
+                r[k] = float(v)
+        flags = {k: bool(out[f"computed_{k}"][i]) for k in AMOUNT_FIELDS}
+        if any(flags.values()):
+            r["_computed"] = flags
+    return records
+
+
+def validate_records(records: List[dict]) -> List[dict]:
+    """Batch validate_extraction over data dicts; returns the same dicts the scalar function would."""
+    v = validate_columns(columns_from_records(records))
+    return [{"variabilni_symbol": bool(v["variabilni_symbol"][i]), "ico": bool(v["ico"][i]),
+             "dic": bool(v["dic"][i]),
+             "sum_check": bool(v["sum_check"][i]) if v["sum_known"][i] else None}
+            for i in range(len(records))]
@@ -0,0 +1,239 @@
+"""
+Data-driven OCR corrections applied in a single pass with an Aho–Corasick automaton.
+
+Rules come from backend/corrections/global.json, backend/corrections/suppliers/*.json
+(scoped to the supplier's IČO) and the learned-corrections file (CORRECTIONS_LEARNED,
+default data/corrections_learned.jsonl next to the registry; one JSON rule per line,
+appended from user edits that carry CORRECTIONS_TOKEN). All rules of all scopes live in
+one automaton built over case-folded keys, so the text is scanned once regardless
+of how many corrections there are; per match the longest rule that fits the scope,
+case and word-boundary constraints wins, scanning left to right.
+
+Rule: {"from": str, "to": str, "word": bool, "case": "exact"|"ignore"|"preserve", "ico": str}
+"""
+from __future__ import annotations
+
+import os
+import hmac
+import json
+import glob
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from . import metrics
+
+_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "corrections"))
+# The app's persistent data directory (data/registry.bin lives there too); mount it as a volume
+_APP_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+CASE_MODES = ("exact", "ignore", "preserve")
+
+
+@dataclass
+class Rule:
+    src: str
+    dst: str
+    word: bool = False
+    case: str = "exact"
+    ico: Optional[str] = None  # None = global
+
+
+def _fold(text: str) -> str:
+    """Lowercase without changing the length (so match offsets map back to the original)."""
+    low = text.lower()
+    if len(low) == len(text):
+        return low
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+class Automaton:
+    def __init__(self, keys: List[str]):
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for idx, key in enumerate(keys):
+            node = 0
+            for ch in key:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append([])
+                    goto[node][ch] = nxt
+                node = nxt
+            out[node].append(idx)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self.goto, self.fail, self.out, self.keys = goto, fail, out, keys
+
+    def matches(self, text: str):
+        """Yield (start, key index) for every occurrence of every key."""
+        goto, fail, out, keys = self.goto, self.fail, self.out, self.keys
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                yield i - len(keys[idx]) + 1, idx
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _apply_case(src: str, dst: str) -> str:
+    if src.isupper():
+        return dst.upper()
+    if src[:1].isupper():
+        return dst[:1].upper() + dst[1:]
+    return dst
+
+
+class CorrectionEngine:
+    def __init__(self, rules: List[Rule]):
+        # Identical keys share one automaton entry; the candidates are kept per key
+        by_key: Dict[str, List[Rule]] = {}
+        for r in rules:
+            if r.src:
+                by_key.setdefault(_fold(r.src), []).append(r)
+        self.keys = list(by_key)
+        # Supplier-scoped rules first, later (learned) rules override earlier ones
+        self.rules = [sorted(reversed(by_key[k]), key=lambda r: r.ico is None) for k in self.keys]
+        self.automaton = Automaton(self.keys)
+        self.size = len(rules)
+
+    def _pick(self, text: str, start: int, idx: int, ico: Optional[str]) -> Optional[Rule]:
+        end = start + len(self.keys[idx])
+        segment = text[start:end]
+        for r in self.rules[idx]:
+            if r.ico is not None and r.ico != ico:
+                continue
+            if r.case == "exact" and segment != r.src:
+                continue
+            if r.word and ((start > 0 and _is_word(text[start - 1])) or (end < len(text) and _is_word(text[end]))):
+                continue
+            return r
+        return None
+
+    def apply(self, text: str, ico: Optional[str] = None) -> str:
+        if not text or not self.keys:
+            return text
+        best: Dict[int, tuple] = {}  # start -> (length, rule)
+        for start, idx in self.automaton.matches(_fold(text)):
+            length = len(self.keys[idx])
+            if start in best and best[start][0] >= length:
+                continue
+            rule = self._pick(text, start, idx, ico)
+            if rule is not None:
+                best[start] = (length, rule)
+        if not best:
+            return text
+        parts, pos = [], 0
+        for start in sorted(best):
+            if start < pos:
+                continue  # overlaps an earlier replacement
+            length, rule = best[start]
+            parts.append(text[pos:start])
+            src = text[start:start + length]
+            parts.append(_apply_case(src, rule.dst) if rule.case == "preserve" else rule.dst)
+            pos = start + length
+        parts.append(text[pos:])
+        return "".join(parts)
+
+
+def _rule(d: dict, ico: Optional[str] = None) -> Optional[Rule]:
+    src, dst = d.get("from"), d.get("to")
+    if not isinstance(src, str) or not isinstance(dst, str) or not src:
+        return None
+    case = d.get("case", "exact")
+    return Rule(src, dst, bool(d.get("word", False)), case if case in CASE_MODES else "exact",
+                d.get("ico", ico) or None)
+
+
+def learned_path() -> str:
+    return os.getenv("CORRECTIONS_LEARNED") or os.path.join(_APP_DATA_DIR, "corrections_learned.jsonl")
+
+
+def token_ok(header: Optional[str]) -> bool:
+    """True if CORRECTIONS_TOKEN is set and the header carries it; learning is off without the token."""
+    token = os.getenv("CORRECTIONS_TOKEN")
+    return bool(token) and hmac.compare_digest((header or "").encode(), token.encode())
+
+
+def load_rules(data_dir: str = _DATA_DIR, learned: Optional[str] = None) -> List[Rule]:
+    rules: List[Rule] = []
+    paths = [os.path.join(data_dir, "global.json")] + sorted(glob.glob(os.path.join(data_dir, "suppliers", "*.json")))
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        ico = data.get("ico")
+        rules.extend(r for r in (_rule(d, ico) for d in data.get("rules", [])) if r)
+    learned = learned or learned_path()
+    if os.path.exists(learned):
+        with open(learned, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r = _rule(json.loads(line))
+                except ValueError:
+                    continue
+                if r:
+                    rules.append(r)
+    return rules
+
+
+_ENGINE: Optional[CorrectionEngine] = None
+_LOCK = threading.Lock()
+
+
+def get_engine() -> CorrectionEngine:
+    global _ENGINE
+    if _ENGINE is not None:
+        metrics.CACHE_HITS.inc(cache="corrections")
+        return _ENGINE
+    with _LOCK:
+        if _ENGINE is None:
+            metrics.CACHE_MISSES.inc(cache="corrections")
+            _ENGINE = CorrectionEngine(load_rules())
+    return _ENGINE
+
+
+def reload():
+    global _ENGINE
+    with _LOCK:
+        _ENGINE = None
+
+
+def learn(wrong: str, right: str, ico: Optional[str] = None, word: bool = True, case: str = "exact") -> dict:
+    """Persist a correction learned from a user edit; the automaton is rebuilt on next use."""
+    rule = {"from": wrong, "to": right, "word": bool(word), "case": case if case in CASE_MODES else "exact"}
+    if ico:
+        rule["ico"] = str(ico)
+    if _rule(rule) is None:
+        raise ValueError("Correction needs non-empty 'from' and a 'to' string")
+    path = learned_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _LOCK:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rule, ensure_ascii=False) + "\n")
+    reload()
+    return rule
+
+
+def apply(text: str, ico: Optional[str] = None) -> str:
+    return get_engine().apply(text, ico)
+
+
+def warm() -> str:
+    return f"ok ({get_engine().size} rules)"
@@ -0,0 +1,89 @@
+"""
+Per-request time budget, visible to every stage through a context variable.
+
+The budget comes from the X-Deadline-Ms header or REQUEST_DEADLINE_MS (0 = none).
+Stages ask timeout() for the seconds they may spend on a blocking call (tesseract
+subprocess, OpenAI request); once the budget is gone timeout()/check() raise
+Expired. Like progress.Cancelled it derives from BaseException so the broad
+`except Exception` fallbacks in OCR do not retry after it. The stage that catches
+it keeps what it has so far and calls mark_partial(); the response then carries
+`partial: true`.
+"""
+from __future__ import annotations
+
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+
+class Expired(BaseException):
+    """The request's time budget is used up."""
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+        self.partial = False
+        self.skipped = []  # stages left out because of the budget
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("invoice_deadline", default=None)
+
+
+def default_ms() -> int:
+    return int(os.getenv("REQUEST_DEADLINE_MS", "0") or 0)
+
+
+@contextmanager
+def track(ms: Optional[int] = None):
+    """Budget of `ms` milliseconds (default REQUEST_DEADLINE_MS) for the code inside; <= 0 means none."""
+    ms = default_ms() if ms is None else ms
+    token = _current.set(Deadline(ms / 1000.0) if ms and ms > 0 else None)
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left, None without a deadline."""
+    d = _current.get()
+    return None if d is None else d.remaining()
+
+
+def check():
+    d = _current.get()
+    if d is not None and d.remaining() <= 0:
+        raise Expired()
+
+
+def timeout(cap: Optional[float] = None) -> Optional[float]:
+    """Timeout for a blocking call: the remaining budget, at most `cap`; None when unlimited."""
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise Expired()
+    return left if cap is None else min(left, cap)
+
+
+def mark_partial(stage: Optional[str] = None):
+    d = _current.get()
+    if d is not None:
+        d.partial = True
+        if stage and stage not in d.skipped:
+            d.skipped.append(stage)
+
+
+def is_partial() -> bool:
+    d = _current.get()
+    return d is not None and d.partial
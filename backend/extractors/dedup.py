@@ -0,0 +1,266 @@
+"""
+Persistent duplicate / near-duplicate index of extracted invoices.
+
+Three ways to match an incoming document against everything seen before:
+- "file": identical bytes (SHA-256), found before OCR.
+- "near": MinHash signature of character shingles of the OCR text. LSH
+  banding (BANDS × ROWS) turns the search into a few indexed lookups, so it
+  stays sub-linear in the number of stored documents; candidates are then
+  confirmed by estimated Jaccard similarity and, because invoices of one
+  supplier share most of their text, by the stored VS and total appearing in
+  the new text as well.
+- "key": same supplier IČO, VS, total and issue date after extraction.
+
+Backed by SQLite (WAL), so the index survives restarts and can be shared by
+several worker processes. Enabled with DEDUP_ENABLED=1, stored in DEDUP_DB.
+"""
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import unicodedata
+from array import array
+from typing import List, Optional
+
+from . import metrics
+
+NUM_PERM = 64
+BANDS, ROWS = 16, 4           # P(candidate) = 1-(1-s^4)^16, ~0.5 at s=0.5, >0.99 at s=0.8
+SHINGLE = 5
+THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+_P = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+
+
+def _perms():
+    import random
+    rng = random.Random(0x1DF0)
+    return [(rng.randrange(1, _P), rng.randrange(0, _P)) for _ in range(NUM_PERM)]
+
+
+_PERMS = _perms()
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]+", " ", text)).strip()
+
+
+def shingles(text: str, k: int = SHINGLE) -> set:
+    t = normalize_text(text)
+    if len(t) <= k:
+        return {zlib.crc32(t.encode())} if t else set()
+    return {zlib.crc32(t[i:i + k].encode()) for i in range(len(t) - k + 1)}
+
+
+def signature(text: str) -> Optional[List[int]]:
+    """MinHash signature (NUM_PERM 32-bit values), None for empty text."""
+    sh = shingles(text)
+    if not sh:
+        return None
+    return [min(((a * h + b) % _P) & _MASK for h in sh) for a, b in _PERMS]
+
+
+def similarity(sig_a, sig_b) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / float(NUM_PERM)
+
+
+def _band_hashes(sig) -> List[int]:
+    out = []
+    for b in range(BANDS):
+        chunk = array("I", sig[b * ROWS:(b + 1) * ROWS]).tobytes()
+        out.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True))
+    return out
+
+
+def _digits(s: str) -> str:
+    return re.sub(r"[\s.,'\u00a0]", "", s or "")
+
+
+def confirms(stored: Optional[dict], text: str) -> bool:
+    """True when the stored result's VS and total (castka_s_dph) both occur in the new text."""
+    data = (stored or {}).get("data") or {}
+    vs = re.sub(r"\s", "", str(data.get("variabilni_symbol") or ""))
+    try:
+        total = f"{float(data.get('castka_s_dph')):.2f}"
+    except (TypeError, ValueError):
+        return False
+    if not vs:
+        return False
+    flat = _digits(text)
+    # "26 188,00 Kč", "26188.00", "26,188.00" all flatten to 2618800
+    return vs in re.sub(r"\s", "", text or "") and _digits(total) in flat
+
+
+def invoice_key(data: dict) -> Optional[str]:
+    """(IČO, VS, total, issue date) or None when any part is missing."""
+    if not isinstance(data, dict):
+        return None
+    sup = data.get("dodavatel") if isinstance(data.get("dodavatel"), dict) else {}
+    ico = re.sub(r"\D", "", str(sup.get("ico") or ""))
+    vs = re.sub(r"\s", "", str(data.get("variabilni_symbol") or ""))
+    total = data.get("castka_s_dph")
+    date = data.get("datum_vystaveni")
+    try:
+        total = f"{float(total):.2f}"
+    except (TypeError, ValueError):
+        return None
+    if not (ico and vs and date):
+        return None
+    return f"{ico}|{vs}|{total}|{date}"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    filename TEXT,
+    sha256 TEXT,
+    inv_key TEXT,
+    signature BLOB,
+    method TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS docs_sha ON docs(sha256);
+CREATE INDEX IF NOT EXISTS docs_key ON docs(inv_key);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_lookup ON bands(band, hash);
+"""
+
+
+class DedupIndex:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def _match(self, row, match: str, sim: Optional[float] = None) -> dict:
+        doc_id, filename, method, result = row
+        out = {"match": match, "of": doc_id, "filename": filename, "method": method}
+        if sim is not None:
+            out["similarity"] = round(sim, 3)
+        out["_result"] = json.loads(result) if result else None
+        return out
+
+    def find_file(self, sha: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT id, filename, method, result FROM docs WHERE sha256=? "
+                                     "ORDER BY id LIMIT 1", (sha,)).fetchone()
+        return self._match(row, "file") if row else None
+
+    def find_similar(self, sig, text: str, threshold: float = THRESHOLD) -> Optional[dict]:
+        """Most similar stored document at or above threshold whose VS and total occur in `text`."""
+        if not sig:
+            return None
+        bands = _band_hashes(sig)
+        where = " OR ".join(["(band=? AND hash=?)"] * BANDS)
+        params = [v for pair in enumerate(bands) for v in pair]
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(f"SELECT DISTINCT doc_id FROM bands WHERE {where}", params)]
+            candidates = []
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                q = (f"SELECT id, filename, method, result, signature FROM docs "
+                     f"WHERE id IN ({','.join('?' * len(chunk))}) ORDER BY id")
+                for row in self._conn.execute(q, chunk):
+                    sim = similarity(sig, array("I", row[4]))
+                    if sim >= threshold:
+                        candidates.append((sim, row[:4]))
+        # Same layout from the same supplier is similar too: only a match carrying this VS and total counts
+        for sim, row in sorted(candidates, key=lambda c: (-c[0], c[1][0])):
+            match = self._match(row, "near", sim)
+            if confirms(match["_result"], text):
+                return match
+            metrics.DUPLICATES_UNCONFIRMED.inc()
+        return None
+
+    def find_key(self, data: dict) -> Optional[dict]:
+        key = invoice_key(data)
+        if not key:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT id, filename, method, result FROM docs WHERE inv_key=? "
+                                     "ORDER BY id LIMIT 1", (key,)).fetchone()
+        return self._match(row, "key") if row else None
+
+    def add(self, filename: str, sha: str, sig, result: dict, method: str, validations: dict) -> int:
+        payload = json.dumps({"data": result, "method": method, "validations": validations},
+                             ensure_ascii=False, default=str)
+        blob = array("I", sig).tobytes() if sig else None
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO docs(created, filename, sha256, inv_key, signature, method, result) VALUES (?,?,?,?,?,?,?)",
+                (time.time(), filename, sha, invoice_key(result), blob, method, payload))
+            doc_id = cur.lastrowid
+            if sig:
+                self._conn.executemany("INSERT INTO bands(band, hash, doc_id) VALUES (?,?,?)",
+                                       [(b, h, doc_id) for b, h in enumerate(_band_hashes(sig))])
+            self._conn.commit()
+        return doc_id
+
+
+def sha256(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+_INDEX: Optional[DedupIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv("DEDUP_ENABLED", "0").lower() in ("1", "true", "yes")
+
+
+def reuse_default() -> bool:
+    return os.getenv("DEDUP_REUSE", "0").lower() in ("1", "true", "yes")
+
+
+def get_index() -> Optional[DedupIndex]:
+    """Process-wide index at DEDUP_DB (default <tmp>/invoice_dedup.sqlite); None when disabled."""
+    global _INDEX
+    if not enabled():
+        return None
+    path = os.getenv("DEDUP_DB") or os.path.join(tempfile.gettempdir(), "invoice_dedup.sqlite")
+    if _INDEX is None or _INDEX.path != path:
+        with _INDEX_LOCK:
+            if _INDEX is None or _INDEX.path != path:
+                try:
+                    _INDEX = DedupIndex(path)
+                except sqlite3.Error as e:
+                    metrics.swallowed("dedup_open", e)
+                    return None
+    return _INDEX
+
+
+def public(match: Optional[dict]) -> Optional[dict]:
+    """Match info for the API response (without the stored result)."""
+    if not match:
+        return None
+    return {k: v for k, v in match.items() if not k.startswith("_")}
@@ -0,0 +1,320 @@
+"""
+Structured e-invoices: ISDOC and ZUGFeRD / Factur-X (UN/CEFACT CII) XML, either
+uploaded directly (.isdoc, .isdocx, .xml) or embedded as a PDF attachment.
+
+When a document carries one, its values are the invoice itself: no text
+extraction, template matching or LLM call is needed. The XML is read with expat
+callbacks that keep only the mapped values, so invoices with thousands of lines
+do not build a tree in memory; a DTD anywhere in the document rejects it.
+"""
+from __future__ import annotations
+
+import io
+import re
+import zlib
+import zipfile
+from datetime import date
+from xml.parsers import expat
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from . import metrics
+from .utils import normalize_date
+from .qr import iban_to_account
+
+MAX_XML_BYTES = 50 * 2 ** 20
+XML_EXTS = (".isdoc", ".isdocx", ".xml")
+# Attachment names used by ISDOC, ZUGFeRD 1/2, Factur-X and XRechnung-CII
+_ATTACHMENT_NAMES = re.compile(r"\.isdocx?$|^(factur-x|zugferd-invoice|zugferd|xrechnung)\.xml$|\.xml$", re.I)
+
+# UN/ECE 4461 payment means → wording used elsewhere in the pipeline
+_PAYMENT_MEANS = {"10": "hotově", "20": "šekem", "48": "platební kartou", "49": "inkasem", "50": "dobírka"}
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _date(v: Optional[str]) -> Optional[str]:
+    v = (v or "").strip()
+    m = re.fullmatch(r"(\d{4})-?(\d{2})-?(\d{2})", v)  # ISO (ISDOC) or CII format 102
+    if m:
+        try:
+            return date(*map(int, m.groups())).isoformat()
+        except ValueError:
+            return None
+    return normalize_date(v) if v else None
+
+
+def _amount(v: Optional[str]) -> Optional[float]:
+    try:
+        return round(float(v), 2) if v not in (None, "") else None
+    except ValueError:
+        return None
+
+
+# Paths below the root element (local names) → field setter; the first occurrence wins
+_ISDOC_PATHS: Dict[Tuple[str, ...], str] = {
+    ("ID",): "id",
+    ("IssueDate",): "datum_vystaveni",
+    ("TaxPointDate",): "duzp",
+    ("LocalCurrencyCode",): "mena",
+    ("ForeignCurrencyCode",): "curr.mena",
+    ("AccountingSupplierParty", "Party", "PartyIdentification", "ID"): "dodavatel.ico",
+    ("AccountingSupplierParty", "Party", "PartyName", "Name"): "dodavatel.nazev",
+    ("AccountingSupplierParty", "Party", "PartyTaxScheme", "CompanyID"): "dodavatel.dic",
+    ("AccountingSupplierParty", "Party", "PostalAddress", "StreetName"): "addr.street",
+    ("AccountingSupplierParty", "Party", "PostalAddress", "BuildingNumber"): "addr.number",
+    ("AccountingSupplierParty", "Party", "PostalAddress", "PostalZone"): "addr.zip",
+    ("AccountingSupplierParty", "Party", "PostalAddress", "CityName"): "addr.city",
+    ("LegalMonetaryTotal", "TaxExclusiveAmount"): "castka_bez_dph",
+    ("LegalMonetaryTotal", "TaxInclusiveAmount"): "castka_s_dph",
+    ("LegalMonetaryTotal", "PayableAmount"): "payable",
+    ("TaxTotal", "TaxAmount"): "dph",
+    # amounts in ForeignCurrencyCode; the plain ones above are then in LocalCurrencyCode (CZK)
+    ("LegalMonetaryTotal", "TaxExclusiveAmountCurr"): "curr.castka_bez_dph",
+    ("LegalMonetaryTotal", "TaxInclusiveAmountCurr"): "curr.castka_s_dph",
+    ("LegalMonetaryTotal", "PayableAmountCurr"): "curr.payable",
+    ("TaxTotal", "TaxAmountCurr"): "curr.dph",
+    ("PaymentMeans", "Payment", "PaymentMeansCode"): "means",
+    ("PaymentMeans", "Payment", "Details", "PaymentDueDate"): "datum_splatnosti",
+    ("PaymentMeans", "Payment", "Details", "ID"): "acc.number",
+    ("PaymentMeans", "Payment", "Details", "BankCode"): "acc.bank",
+    ("PaymentMeans", "Payment", "Details", "Name"): "banka_prijemce",
+    ("PaymentMeans", "Payment", "Details", "IBAN"): "acc.iban",
+    ("PaymentMeans", "Payment", "Details", "VariableSymbol"): "variabilni_symbol",
+}
+
+_T = ("SupplyChainTradeTransaction",)
+_SELLER = _T + ("ApplicableHeaderTradeAgreement", "SellerTradeParty")
+_SETTLE = _T + ("ApplicableHeaderTradeSettlement",)
+_CII_PATHS: Dict[Tuple[str, ...], str] = {
+    ("ExchangedDocument", "ID"): "id",
+    ("ExchangedDocument", "IssueDateTime", "DateTimeString"): "datum_vystaveni",
+    _SELLER + ("Name",): "dodavatel.nazev",
+    _SELLER + ("SpecifiedLegalOrganization", "ID"): "dodavatel.ico",
+    _SELLER + ("SpecifiedTaxRegistration", "ID"): "dodavatel.dic",
+    _SELLER + ("PostalTradeAddress", "LineOne"): "addr.street",
+    _SELLER + ("PostalTradeAddress", "PostcodeCode"): "addr.zip",
+    _SELLER + ("PostalTradeAddress", "CityName"): "addr.city",
+    _T + ("ApplicableHeaderTradeDelivery", "ActualDeliverySupplyChainEvent", "OccurrenceDateTime",
+          "DateTimeString"): "duzp",
+    _SETTLE + ("PaymentReference",): "variabilni_symbol",
+    _SETTLE + ("InvoiceCurrencyCode",): "mena",
+    _SETTLE + ("SpecifiedTradeSettlementPaymentMeans", "TypeCode"): "means",
+    _SETTLE + ("SpecifiedTradeSettlementPaymentMeans", "PayeePartyCreditorFinancialAccount", "IBANID"): "acc.iban",
+    _SETTLE + ("SpecifiedTradeSettlementPaymentMeans", "PayeeSpecifiedCreditorFinancialInstitution", "BICID"): "bic",
+    _SETTLE + ("SpecifiedTradePaymentTerms", "DueDateDateTime", "DateTimeString"): "datum_splatnosti",
+    _SETTLE + ("SpecifiedTradeSettlementHeaderMonetarySummation", "TaxBasisTotalAmount"): "castka_bez_dph",
+    _SETTLE + ("SpecifiedTradeSettlementHeaderMonetarySummation", "TaxTotalAmount"): "dph",
+    _SETTLE + ("SpecifiedTradeSettlementHeaderMonetarySummation", "GrandTotalAmount"): "castka_s_dph",
+    _SETTLE + ("SpecifiedTradeSettlementHeaderMonetarySummation", "DuePayableAmount"): "payable",
+}
+
+_FORMATS = {"Invoice": ("isdoc", _ISDOC_PATHS), "CrossIndustryInvoice": ("zugferd", _CII_PATHS)}
+
+
+class _Stop(Exception):
+    """Ends the expat pass early: the root element closed, or the root is not an invoice."""
+
+
+class _DTD(Exception):
+    """The document declares a DTD or entities."""
+
+
+def _collect(xml: bytes) -> Optional[Tuple[str, Dict[str, str]]]:
+    """(format, {key: text}) from one streaming pass, or None when the root is not an invoice."""
+    if len(xml) > MAX_XML_BYTES:
+        return None
+    values: Dict[str, str] = {}
+    state = {"fmt": None, "paths": None}
+    names = []  # path below the root (local names)
+    texts = []  # per open element: its text chunks when the path is mapped, else None
+
+    def start(tag, _attrs):
+        if state["fmt"] is None:
+            if _local(tag) not in _FORMATS:
+                raise _Stop()
+            state["fmt"], state["paths"] = _FORMATS[_local(tag)]
+            return
+        names.append(_local(tag))
+        key = state["paths"].get(tuple(names))
+        texts.append([] if key and key not in values else None)
+
+    def end(_tag):
+        if not names:
+            raise _Stop()  # the root closed: anything after it is ignored
+        chunks = texts.pop()
+        if chunks:
+            text = "".join(chunks).strip()
+            key = state["paths"][tuple(names)]
+            if text and key not in values:
+                values[key] = text
+        names.pop()
+
+    def chars(data):
+        if texts and texts[-1] is not None:
+            texts[-1].append(data)
+
+    def dtd(*_args):
+        # No DTDs: invoices never need them and they enable entity expansion attacks
+        raise _DTD()
+
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.StartElementHandler, parser.EndElementHandler = start, end
+    parser.CharacterDataHandler = chars
+    parser.StartDoctypeDeclHandler = parser.EntityDeclHandler = dtd
+    try:
+        parser.Parse(xml, True)
+    except _Stop:
+        pass
+    except _DTD:
+        return None
+    except expat.ExpatError as e:
+        metrics.swallowed("einvoice_xml", e)
+        return None
+    return (state["fmt"], values) if state["fmt"] else None
+
+
+def _to_result(fmt: str, v: Dict[str, str]) -> dict:
+    if v.get("curr.mena"):  # ISDOC in a foreign currency: report it with its *Curr amounts
+        v = {**v, **{k[5:]: x for k, x in v.items() if k.startswith("curr.")}}
+    acc = None
+    if v.get("acc.number"):
+        acc = v["acc.number"] + (f"/{v['acc.bank']}" if v.get("acc.bank") else "")
+    elif v.get("acc.iban"):
+        acc = iban_to_account(v["acc.iban"])
+    street = " ".join(x for x in (v.get("addr.street"), v.get("addr.number")) if x)
+    city = " ".join(x for x in (v.get("addr.zip"), v.get("addr.city")) if x)
+    ico = v.get("dodavatel.ico")
+    if ico and not re.fullmatch(r"\d{1,8}", ico):
+        ico = None  # foreign or non-IČO legal id
+    means = v.get("means")
+    vs = re.sub(r"\s", "", v.get("variabilni_symbol") or "")  # CII PaymentReference may be any text
+    total = _amount(v.get("castka_s_dph"))
+    return {
+        "variabilni_symbol": vs if re.fullmatch(r"\d{1,10}", vs) else None,
+        "datum_vystaveni": _date(v.get("datum_vystaveni")),
+        "datum_splatnosti": _date(v.get("datum_splatnosti")),
+        "duzp": _date(v.get("duzp")),
+        "castka_bez_dph": _amount(v.get("castka_bez_dph")),
+        "dph": _amount(v.get("dph")),
+        "castka_s_dph": total if total is not None else _amount(v.get("payable")),
+        "dodavatel": {
+            "nazev": v.get("dodavatel.nazev"),
+            "ico": ico.zfill(8) if ico else None,
+            "dic": (v.get("dodavatel.dic") or "").replace(" ", "").upper() or None,
+            "adresa": ", ".join(x for x in (street, city) if x) or None,
+        },
+        "mena": (v.get("mena") or "").upper() or None,
+        "platba_zpusob": _PAYMENT_MEANS.get(means, "peněžní převod") if means or acc else None,
+        "banka_prijemce": v.get("banka_prijemce"),
+        "ucet_prijemce": acc,
+        "confidence": 1.0,
+        "_einvoice": {"format": fmt, "id": v.get("id")},
+    }
+
+
+def parse_xml(xml: bytes) -> Optional[dict]:
+    """Extraction result from ISDOC / CII XML bytes, None if it is neither."""
+    collected = _collect(xml)
+    return _to_result(*collected) if collected else None
+
+
+def _isdocx(data: bytes) -> Optional[bytes]:
+    """The .isdoc member of an ISDOCX container."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                if info.filename.lower().endswith(".isdoc") and info.file_size <= MAX_XML_BYTES:
+                    return zf.read(info)
+    except zipfile.BadZipFile:
+        pass
+    return None
+
+
+def _name_tree(node) -> Iterator[Tuple[object, object]]:
+    from pdfminer.pdftypes import resolve1
+    node = resolve1(node) or {}
+    names = resolve1(node.get("Names")) or []
+    for i in range(0, len(names) - 1, 2):
+        yield names[i], names[i + 1]
+    for kid in resolve1(node.get("Kids")) or []:
+        yield from _name_tree(kid)
+
+
+def pdf_attachments(data: bytes) -> Iterator[Tuple[str, Callable[[], bytes]]]:
+    """(file name, loader) of the files embedded in a PDF (EmbeddedFiles name tree and /AF)."""
+    # Embedded file streams cannot live in object streams, so without this marker there are none
+    if b"EmbeddedFile" not in data:
+        return
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdftypes import resolve1
+    from pdfminer.utils import decode_text
+
+    doc = PDFDocument(PDFParser(io.BytesIO(data)))
+    specs = [spec for _, spec in _name_tree((resolve1(doc.catalog.get("Names")) or {}).get("EmbeddedFiles"))]
+    specs += list(resolve1(doc.catalog.get("AF")) or [])
+    seen = set()
+    for spec in specs:
+        spec = resolve1(spec)
+        if not isinstance(spec, dict):
+            continue
+        name = resolve1(spec.get("UF") or spec.get("F") or b"")
+        name = decode_text(name) if isinstance(name, bytes) else str(name)
+        ef = resolve1(spec.get("EF")) or {}
+        stream = resolve1(ef.get("F") or ef.get("UF"))
+        if stream is None or name in seen:
+            continue
+        seen.add(name)
+        yield name, (lambda s=stream: _embedded_data(s))
+
+
+def _embedded_data(stream) -> bytes:
+    """
+    Contents of an embedded file stream, b"" when it is (or would inflate to) more than
+    MAX_XML_BYTES: the declared /Params /Size and the stored length are checked first,
+    and Flate data is inflated with a cap instead of all at once.
+    """
+    from pdfminer.pdftypes import resolve1, LITERALS_FLATE_DECODE
+    params = resolve1(stream.get("Params"))
+    size = resolve1(params.get("Size")) if isinstance(params, dict) else None
+    if stream.data is not None:  # already decoded
+        return stream.data if len(stream.data) <= MAX_XML_BYTES else b""
+    raw = stream.rawdata
+    if (isinstance(size, int) and size > MAX_XML_BYTES) or raw is None or len(raw) > MAX_XML_BYTES:
+        return b""
+    if stream.decipher:
+        raw = stream.decipher(stream.objid, stream.genno, raw, stream.attrs)
+    filters = stream.get_filters()
+    if not filters:
+        return raw
+    if len(filters) != 1 or filters[0][0] not in LITERALS_FLATE_DECODE or filters[0][1]:
+        return b""  # predictors and other filters are not used for XML attachments
+    data = zlib.decompressobj().decompress(raw, MAX_XML_BYTES + 1)
+    return data if len(data) <= MAX_XML_BYTES else b""
+
+
+def extract(filename: str, data: bytes) -> Optional[dict]:
+    """Result from a structured invoice upload or PDF attachment, None when there is none."""
+    name = (filename or "").lower()
+    try:
+        if name.endswith(".pdf"):
+            for att_name, load in pdf_attachments(data):
+                if not _ATTACHMENT_NAMES.search(att_name):
+                    continue
+                payload = load()
+                if att_name.lower().endswith(".isdocx"):
+                    payload = _isdocx(payload) or b""
+                result = parse_xml(payload)
+                if result:
+                    result["_einvoice"]["attachment"] = att_name
+                    return result
+            return None
+        if name.endswith(".isdocx"):
+            return parse_xml(_isdocx(data) or b"")
+        if name.endswith(XML_EXTS):
+            return parse_xml(data)
+    except Exception as e:  # a broken PDF / attachment falls back to the normal pipeline
+        metrics.swallowed("einvoice", e)
+    return None
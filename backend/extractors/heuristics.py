@@ -1,50 +1,71 @@
 
 
 import re
+from bisect import bisect_right
+from itertools import accumulate
 from .utils import normalize_date, parse_amount, first, pick_nearby, detect_currency
+from . import patterns
 
 DATE_PAT = r"(?:\b\d{1,2}[.\-/ ]\d{1,2}[.\-/ ]\d{2,4}\b|\b\d{4}-\d{1,2}-\d{1,2}\b)"
 # Clean regex pattern for amounts - handles Czech format with spaces as thousands separators
 AMOUNT_PAT_STRICT = r"\b\d{1,3}(?:[ \u00A0]\d{3})*(?:[,.]\d{2})\b|\b\d+(?:[ \u00A0]\d{3})*(?:[,.]\d{2})\b|\b\d+[,.]\d{2}\b|\b\d{1,3}(?:[ \u00A0]\d{3})+\b|\b\d{4,6}\b|\b\d{1,3}[ \u00A0]\d{3}\b|\b\d{1,3}[ \u00A0]\d{3},\d{2}\b"
 CURRENCY_TOKEN = r"(?:CZK|Kč|EUR|€|USD|\$|GBP|£|PLN|zł|HUF|Ft|CHF|SEK|NOK|DKK|JPY|¥|CNY|AUD|CAD)"
 
+# Named up front so the per-pattern metrics are readable; later lookups hit the registry
+patterns.compile(DATE_PAT, name="date")
+patterns.compile(DATE_PAT, re.I, name="date")
+patterns.compile(AMOUNT_PAT_STRICT, name="amount")
+patterns.compile(AMOUNT_PAT_STRICT, re.I, name="amount")
+
+def _label_lines(lines, label_re):
+    """
+    Indexes of lines where label_re matches, same as searching every line but with
+    one scan of the joined text: only lines touched by a match there are re-checked.
+    """
+    offsets = list(accumulate((len(ln) + 1 for ln in lines), initial=0))
+    hit = set()
+    for m in label_re.finditer("\n".join(lines)):
+        first_ln = bisect_right(offsets, m.start()) - 1
+        last_ln = bisect_right(offsets, max(m.start(), m.end() - 1)) - 1
+        hit.update(range(first_ln, last_ln + 1))
+    return [i for i in sorted(hit) if label_re.search(lines[i])]
+
 def _find_label_value(lines, label_keywords, value_regex, max_dist=2):
-    label_re = re.compile("|".join(label_keywords), re.I)
-    val_re = re.compile(value_regex)
+    label_re = patterns.compile("|".join(label_keywords), re.I, name="label:" + label_keywords[0])
+    val_re = patterns.compile(value_regex)
+    label_idx = _label_lines(lines, label_re)
     candidates = []
-    for i, line in enumerate(lines):
-        if label_re.search(line):
-            window = "\n".join(lines[max(0, i - max_dist): i + max_dist + 1])
-            for m in val_re.finditer(window):
-                candidates.append(m.group(1) if m.groups() else m.group(0))
+    for i in label_idx:
+        window = "\n".join(lines[max(0, i - max_dist): i + max_dist + 1])
+        for m in val_re.finditer(window):
+            candidates.append(m.group(1) if m.groups() else m.group(0))
     
     # If no candidates found with default distance, try with larger distance for amounts
     if not candidates and any("castka" in kw or "total" in kw or "amount" in kw for kw in label_keywords):
-        for i, line in enumerate(lines):
-            if label_re.search(line):
-                window = "\n".join(lines[max(0, i - 50): i + 51])  # Large window for amounts
-                for m in val_re.finditer(window):
-                    candidates.append(m.group(1) if m.groups() else m.group(0))
+        for i in label_idx:
+            window = "\n".join(lines[max(0, i - 50): i + 51])  # Large window for amounts
+            for m in val_re.finditer(window):
+                candidates.append(m.group(1) if m.groups() else m.group(0))
     
     return first(candidates)
 
 def _find_any(regex, text):
-    m = re.search(regex, text, re.I | re.M)
+    m = patterns.search(regex, text, re.I | re.M)
     return m.group(1) if (m and m.groups()) else (m.group(0) if m else None)
 
 def _clean_lines(text: str):
-    return [re.sub(r"\s+", " ", ln).strip() for ln in text.splitlines() if ln.strip()]
+    return [patterns.sub(r"\s+", " ", ln).strip() for ln in text.splitlines() if ln.strip()]
 
 def _detect_vs(text: str, lines):
     vs = _find_label_value(lines, [r"\bvariab\w* symbol\b", r"\bVS\b", r"variable symbol", r"variabilní symbol", r"variabilni symbol"], r"\b(\d{6,12})\b", 3)
     if vs:
-        return re.sub(r"\D", "", vs)
+        return patterns.sub(r"\D", "", vs)
     vs = _find_any(r"\bVS[:\s]+(\d{6,12})\b", "\n".join(lines))
     if vs:
         return vs
     candidates = []
     j = "\n".join(lines)
-    for m in re.finditer(r"\b(\d{8,10})\b(?!\s*/)", j):
+    for m in patterns.finditer(r"\b(\d{8,10})\b(?!\s*/)", j):
         left = j[max(0, m.start()-20):m.start()].lower()
         if ("ucet" in left or "účet" in left or "account" in left or "učet" in left or "úcet" in left):
             continue
@@ -61,9 +82,9 @@ def _extract_supplier(lines):
     - Prefer blocks closer to the top of the document
     - From the chosen window, infer name (a line before), IČO, DIČ and an address line
     """
-    ico_pat = re.compile(r"I[ČC]O\s*[:#-]?\s*(\d{8})", re.I)
-    dic_pat = re.compile(r"DI[ČC]\s*[:#-]?\s*([A-Z]{2}\s?\d{8,12}|\d{8,12})", re.I)
-    psc_pat = re.compile(r"\b\d{3}\s?\d{2}\b")  # Czech ZIP
+    ico_pat = patterns.compile(r"I[ČC]O\s*[:#-]?\s*(\d{8})", re.I)
+    dic_pat = patterns.compile(r"DI[ČC]\s*[:#-]?\s*([A-Z]{2}\s?\d{8,12}|\d{8,12})", re.I)
+    psc_pat = patterns.compile(r"\b\d{3}\s?\d{2}\b")  # Czech ZIP
 
     candidates = []
     for idx, line in enumerate(lines):
@@ -76,11 +97,11 @@ def _extract_supplier(lines):
         block = lines[start:end]
         block_text = "\n".join(block)
         label_score = 0
-        if re.search(r"dodavatel", block_text, re.I):
+        if patterns.search(r"dodavatel", block_text, re.I):
             label_score += 3
-        if re.search(r"odb[ěe]ratel", block_text, re.I):
+        if patterns.search(r"odb[ěe]ratel", block_text, re.I):
             label_score -= 3
-        if re.search(r"\bCZ\s?\d{8,12}\b", block_text):
+        if patterns.search(r"\bCZ\s?\d{8,12}\b", block_text):
             label_score += 2
         # Add position score: prefer earlier in document
         position_score = -idx  # Smaller index (earlier) gives higher score
@@ -94,17 +115,17 @@ def _extract_supplier(lines):
         name = None
         for up in range(idx - 1, start - 1, -1):
             ln = lines[up].strip()
-            if re.search(r"I[ČC]O|DI[ČC]|odb[ěe]ratel|dodavatel|IČO|DIČ", ln, re.I):
+            if patterns.search(r"I[ČC]O|DI[ČC]|odb[ěe]ratel|dodavatel|IČO|DIČ", ln, re.I):
                 continue
-            if len(re.sub(r"[^A-Za-zÁČĎÉĚÍŇÓŘŠŤÚŮÝŽa-záčďéěíňóřšťúůýž.& ]", "", ln)) >= 3:
+            if len(patterns.sub(r"[^A-Za-zÁČĎÉĚÍŇÓŘŠŤÚŮÝŽa-záčďéěíňóřšťúůýž.& ]", "", ln)) >= 3:
                 name = ln
                 break
 
         # Guess address as a line in the block that contains street/ZIP/city hints
         address = None
         for ln in block:
-            if psc_pat.search(ln) or re.search(r"\d+\s*[,/]*\s*[A-Za-z]", ln):
-                if not re.search(r"I[ČC]O|DI[ČC]", ln, re.I):
+            if psc_pat.search(ln) or patterns.search(r"\d+\s*[,/]*\s*[A-Za-z]", ln):
+                if not patterns.search(r"I[ČC]O|DI[ČC]", ln, re.I):
                     address = ln
                     break
 
@@ -118,7 +139,7 @@ def _extract_supplier(lines):
     return best
 
 def _amounts_from_text(text: str):
-    raw = re.findall(AMOUNT_PAT_STRICT, text)
+    raw = patterns.findall(AMOUNT_PAT_STRICT, text)
     parsed = []
     for a in raw:
         val = parse_amount(a)
@@ -140,15 +161,15 @@ def _amounts_from_text(text: str):
             score += 5
         
         # Higher score for amounts that look like Czech currency format
-        if re.search(r"\d{1,3}(?: \d{3})", original_text):
+        if patterns.search(r"\d{1,3}(?: \d{3})", original_text):
             score += 20
         
         # Even higher score for amounts that look like "44 413" (exact pattern)
-        if re.match(r"^\d{1,3} \d{3}$", original_text):
+        if patterns.match(r"^\d{1,3} \d{3}$", original_text):
             score += 30
         
         # Highest score for amounts that look like "44 413,00" (exact pattern with decimal)
-        if re.match(r"^\d{1,3} \d{3},\d{2}$", original_text):
+        if patterns.match(r"^\d{1,3} \d{3},\d{2}$", original_text):
             score += 100
         
         # Lower score for very small amounts (likely line items)
@@ -165,9 +186,9 @@ def _currency_near_amount(lines):
     joined = "\n".join(lines)
     # Enhanced Czech keywords with proper diacritics
     for lab in [r"amount due", r"grand total", r"\btotal\b", r"celkem", r"k úhradě", r"k uhrade", r"subtotal", r"bez dph", r"dph", r"celková částka", r"celkova castka", r"celková castka", r"celkova částka"]:
-        m = re.search(lab + r".{0,40}" + CURRENCY_TOKEN, joined, re.I)
+        m = patterns.search(lab + r".{0,40}" + CURRENCY_TOKEN, joined, re.I, name="currency_near:" + lab)
         if m:
-            cur = re.search(CURRENCY_TOKEN, m.group(0), re.I)
+            cur = patterns.search(CURRENCY_TOKEN, m.group(0), re.I, name="currency")
             if cur:
                 tok = cur.group(0).upper()
                 sym_map = {"€": "EUR", "$": "USD", "£": "GBP", "KČ": "CZK", "¥": "JPY"}
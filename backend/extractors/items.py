@@ -0,0 +1,278 @@
+"""
+Line items (položky) of an invoice: description, quantity, unit, unit price, VAT rate
+and line total, read from the geometry of the words on the page - pdfplumber words
+for text PDFs, tesseract word boxes for scans.
+
+A table starts at a header line naming at least three known columns, one of them
+the line total; the column boundaries lie halfway between neighbouring header
+cells, including cells of unknown or repeated columns, whose words are then
+ignored instead of spilling into their neighbours. Below it every line whose total
+cell parses as an amount is a row, a line with text in the description column only
+continues the previous row's description, and a summary line (Základ daně, Celkem
+k úhradě, ...) ends the table. Continuation pages repeat the header, which
+restarts the table there.
+
+Rows are yielded one at a time, so a telecom bill with thousands of them is never
+held in memory as a whole; Tally sums them on the way for the cross-check against
+castka_bez_dph.
+"""
+from __future__ import annotations
+
+import io
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from . import metrics, patterns, progress
+from .utils import parse_amount
+
+HEADER_MIN_COLUMNS = 3
+CELL_GAP = 1.0       # words closer than this many word heights form one header cell
+CONTINUATION_GAP = 1.8  # a description-only line this close below a row continues it
+
+IGNORE = "ignore"    # header cell that only bounds its neighbours
+
+# Header cell -> field; the first match wins, so "Cena/MJ" is a unit price, not a unit
+_COLUMNS = [
+    ("cena_za_jednotku", r"cena\s*/\s*mj|cena\s+za\s+(?:mj|jednotku|ks)|jedn(?:otková|otkova|\.)?\s*cena"
+                         r"|unit\s+price|price(?:\s*/\s*unit)?"),
+    ("bez_dph", r"(?:celkem\s+|cena\s+)?bez\s+dph|základ(?:\s+daně)?|zaklad(?:\s+dane)?|net(?:\s+amount)?"
+                r"|(?:total\s+)?excl\.?\s+vat"),
+    ("sazba_dph", r"(?:sazba\s+)?dph\s*(?:%|\[%\])|sazba(?:\s+dph)?|%\s*dph|vat\s*(?:%|rate)|%"),
+    (IGNORE, r"dph|vat|(?:částka|castka)\s+dph|vat\s+amount"),  # VAT amount of the line
+    ("celkem", r"celkem(?:\s+s\s+dph)?|cena\s+celkem|(?:line\s+)?total(?:\s+price)?"),
+    ("castka", r"částka|castka|amount"),  # the line total unless a Celkem column follows
+    ("mnozstvi", r"množství|mnozstvi|počet|pocet|qty|quantity|mn\.?"),
+    ("jednotka", r"mj|m\.j\.|jednotka|jedn\.|unit"),
+    ("popis", r"popis(?:\s+položky)?|název|nazev|položka|polozka|označení(?:\s+dodávky)?|oznaceni"
+              r"|předmět(?:\s+plnění)?|text|description|item"),
+]
+_HEADER_CELL = [(field, re.compile(rf"(?:{rx})\s*:?", re.I)) for field, rx in _COLUMNS]
+_SUMMARY = patterns.compile(
+    r"\b(?:základ\s+daně|zaklad\s+dane|celkem\s+bez\s+dph|celkem\s+k\s+úhradě|k\s+úhradě|k\s+uhrade"
+    r"|mezisoučet|rekapitulace|subtotal|total\s+excl|amount\s+due|grand\s+total)",
+    re.I, name="items:summary")
+_QTY_UNIT = re.compile(r"^\s*(-?[\d\s.,]+?)\s*([^\d\s.,]{1,6}\.?)?\s*$")
+_NOISE = re.compile(r"(?:Kč|Kc|CZK|EUR|€|USD|\$|%)", re.I)
+# One amount: "1 234,56", "1.234,56", "1,234.56", "1234.5", "-12"; two numbers in one cell
+# ("4200 242") mean words of another column ended up there
+_ONE_AMOUNT = re.compile(r"[-+]?(?:\d{1,3}(?:[ \u00a0.']\d{3})+(?:,\d+)?|\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:[.,]\d+)?)")
+
+ROWS = metrics.REGISTRY.histogram("invoice_line_items_per_document", "Line items found per document (items requested).",
+                                  buckets=(0, 1, 5, 20, 100, 500, 2000, 10000))
+CHECKS = metrics.REGISTRY.counter("invoice_line_items_check_total", "Line-item sum cross-check outcomes.", ("outcome",))
+
+
+class Word(NamedTuple):
+    text: str
+    x0: float
+    x1: float
+    top: float
+    bottom: float
+
+
+def _lines(words: Iterable[Word]) -> List[List[Word]]:
+    """Words grouped into visual lines (vertical centre within the line's extent), left to right."""
+    lines: List[List[Word]] = []
+    top = bottom = None
+    for w in sorted(words, key=lambda w: (w.top, w.x0)):
+        mid = (w.top + w.bottom) / 2.0
+        if lines and top <= mid <= bottom:
+            lines[-1].append(w)
+            bottom = max(bottom, w.bottom)
+        else:
+            lines.append([w])
+            top, bottom = w.top, w.bottom
+    return [sorted(ln, key=lambda w: w.x0) for ln in lines]
+
+
+def _cells(line: List[Word]) -> List[Word]:
+    """Adjacent words of a line merged into cells (gap below CELL_GAP word heights)."""
+    cells: List[Word] = []
+    for w in line:
+        prev = cells[-1] if cells else None
+        if prev is not None and w.x0 - prev.x1 < CELL_GAP * (w.bottom - w.top):
+            cells[-1] = Word(f"{prev.text} {w.text}", prev.x0, w.x1, min(prev.top, w.top), max(prev.bottom, w.bottom))
+        else:
+            cells.append(w)
+    return cells
+
+
+def _header(line: List[Word]):
+    """
+    [(field, x0, x1)] of every cell of a table header line, None for any other line.
+    Unknown and repeated columns get IGNORE; "Částka" is the line total only when
+    there is no "Celkem" column.
+    """
+    cols, seen = [], set()
+    for cell in _cells(line):
+        field = next((f for f, rx in _HEADER_CELL if rx.fullmatch(cell.text.strip())), None)
+        if field is None or field in seen:
+            field = IGNORE
+        elif field != IGNORE:
+            seen.add(field)
+        cols.append((field, cell.x0, cell.x1))
+    if "castka" in seen:
+        total = IGNORE if "celkem" in seen else "celkem"
+        cols = [(total if f == "castka" else f, x0, x1) for f, x0, x1 in cols]
+        seen.add(total)
+    if len(seen) < HEADER_MIN_COLUMNS or "celkem" not in seen:
+        return None
+    return cols
+
+
+def _bounds(cols) -> List[tuple]:
+    """[(field, left, right)]: each column reaches halfway to its neighbours."""
+    out = []
+    for i, (field, x0, x1) in enumerate(cols):
+        left = (cols[i - 1][2] + x0) / 2.0 if i else float("-inf")
+        right = (x1 + cols[i + 1][1]) / 2.0 if i + 1 < len(cols) else float("inf")
+        out.append((field, left, right))
+    return out
+
+
+def _split_cells(line: List[Word], bounds) -> dict:
+    cells = {}
+    for w in line:
+        mid = (w.x0 + w.x1) / 2.0
+        field = next((f for f, left, right in bounds if left <= mid < right), None)
+        if field is not None and field != IGNORE:
+            cells[field] = f"{cells[field]} {w.text}" if field in cells else w.text
+    return cells
+
+
+def _amount(cell: Optional[str]) -> Optional[float]:
+    """The amount of a numeric cell; None when it is empty or holds more than one number."""
+    s = _NOISE.sub(" ", cell or "").strip()
+    if not s or not _ONE_AMOUNT.fullmatch(s):
+        return None
+    return parse_amount(s)
+
+
+def _row(cells: dict) -> Optional[dict]:
+    total = _amount(cells.get("celkem"))
+    if total is None:
+        return None
+    qty, unit = cells.get("mnozstvi"), cells.get("jednotka")
+    m = _QTY_UNIT.match(qty or "")
+    if m and m.group(2) and not unit:
+        qty, unit = m.group(1), m.group(2)  # "2,5 ks" in a table without a unit column
+    row = {
+        "popis": (cells.get("popis") or "").strip() or None,
+        "mnozstvi": _amount(qty),
+        "jednotka": (unit or "").strip() or None,
+        "cena_za_jednotku": _amount(cells.get("cena_za_jednotku")),
+        "sazba_dph": _amount(cells.get("sazba_dph")),
+        "bez_dph": _amount(cells.get("bez_dph")),
+        "celkem": total,
+    }
+    if row["popis"] is None and row["mnozstvi"] is None and row["cena_za_jednotku"] is None:
+        return None  # a lone amount under the table (e.g. a rounding line) is not an item
+    return row
+
+
+class _Table:
+    """Row parser fed page by page; the column layout carries over to pages without a header."""
+
+    def __init__(self):
+        self.bounds = None
+        self.active = False
+
+    def feed(self, words: Iterable[Word]) -> Iterator[dict]:
+        pending, pending_bottom = None, None
+        for line in _lines(words):
+            cols = _header(line)
+            if cols is not None:
+                if pending is not None:
+                    yield pending
+                pending = None
+                self.bounds, self.active = _bounds(cols), True
+                continue
+            if not self.active:
+                continue
+            text = " ".join(w.text for w in line)
+            if _SUMMARY.search(text):
+                self.active = False
+                continue
+            cells = _split_cells(line, self.bounds)
+            row = _row(cells)
+            top = min(w.top for w in line)
+            height = max(w.bottom - w.top for w in line)
+            if row is not None:
+                if pending is not None:
+                    yield pending
+                pending, pending_bottom = row, max(w.bottom for w in line)
+            elif (pending is not None and set(cells) == {"popis"}
+                  and top - pending_bottom < CONTINUATION_GAP * height):
+                pending["popis"] = f"{pending['popis'] or ''} {cells['popis']}".strip()
+                pending_bottom = max(w.bottom for w in line)
+        if pending is not None:
+            yield pending
+
+
+def rows(word_pages: Iterable[Iterable[Word]]) -> Iterator[dict]:
+    """Line items of a document given as word boxes page by page."""
+    table = _Table()
+    for words in word_pages:
+        yield from table.feed(words)
+
+
+def pdf_word_pages(data: bytes, first: int = 0, end: Optional[int] = None) -> Iterator[List[Word]]:
+    """Words of the text layer, one page at a time (pages first..end-1), releasing each page after use."""
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages[first:end]:
+            progress.checkpoint()
+            words = page.extract_words(x_tolerance=1.5, y_tolerance=2)
+            yield [Word(w["text"], w["x0"], w["x1"], w["top"], w["bottom"]) for w in words]
+            page.close()
+
+
+def iter_items(filename: str, data: bytes, first: int = 0, end: Optional[int] = None) -> Iterator[dict]:
+    """Line items of an uploaded PDF (pages first..end-1) or scan; nothing for other uploads."""
+    from . import ocr
+    name = (filename or "").lower()
+    if name.endswith(".pdf"):
+        yield from rows(pdf_word_pages(data, first, end))
+    elif ocr.is_image(name):
+        yield from rows([[Word(*w) for w in ocr.image_words(data)]])
+
+
+class Tally:
+    """Passes rows through while counting and summing them for check()."""
+
+    def __init__(self, items: Iterable[dict]):
+        self.items = items
+        self.count = 0
+        self.total = 0.0
+        self.base = 0.0       # sum of the "bez DPH" column
+        self.base_rows = 0    # rows that have one
+
+    def __iter__(self) -> Iterator[dict]:
+        for row in self.items:
+            self.count += 1
+            self.total += row["celkem"]
+            if row.get("bez_dph") is not None:
+                self.base += row["bez_dph"]
+                self.base_rows += 1
+            yield row
+
+    def summary(self, data: Optional[dict]) -> dict:
+        """
+        {"pocet", "soucet", "kontrola"}: kontrola says whether the line totals add up to
+        castka_bez_dph (or, for tables priced with VAT, castka_s_dph; a "bez DPH" column
+        on every row is compared with castka_bez_dph as well); None when there are no
+        rows or no header amounts to compare with.
+        """
+        data = data or {}
+        soucet = round(self.total, 2)
+        tol = 0.03 + 0.005 * self.count  # line totals are rounded one by one
+        base = parse_amount(data.get("castka_bez_dph"))
+        amounts = [a for a in (base, parse_amount(data.get("castka_s_dph"))) if a is not None]
+        ok = None
+        if self.count and amounts:
+            ok = any(abs(soucet - a) <= tol for a in amounts)
+            if not ok and base is not None and self.base_rows == self.count:
+                ok = abs(round(self.base, 2) - base) <= tol
+        ROWS.observe(self.count)
+        CHECKS.inc(outcome="none" if ok is None else ("ok" if ok else "mismatch"))
+        return {"pocet": self.count, "soucet": soucet, "kontrola": ok}
@@ -1,13 +1,37 @@
 
-import os, json, re
-from .utils import normalize_date, parse_amount, fix_czech_chars, validate_ico, fix_variabilni_symbol
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
+import os, json, re, importlib.util
+from .utils import normalize_date, parse_amount, validate_ico, fix_variabilni_symbol
+from . import metrics, deadline
+
+# The openai SDK takes ~0.5 s to import; it is loaded on the first LLM call (or by warm()).
+OpenAI = None
+
+def _openai():
+    global OpenAI
+    if OpenAI is None:
+        from openai import OpenAI as _OpenAI
+        OpenAI = _OpenAI
+    return OpenAI
+
+def _client():
+    """
+    OpenAI client whose requests end with the request deadline (at most OPENAI_TIMEOUT
+    seconds, default 60); retries only when there is no deadline to run into.
+    """
+    timeout = deadline.timeout(float(os.getenv("OPENAI_TIMEOUT", "60")))
+    retries = 2 if deadline.current() is None else 0
+    return _openai()(api_key=os.getenv("OPENAI_API_KEY"), timeout=timeout, max_retries=retries)
 
 def llm_available() -> bool:
-    return OpenAI is not None and bool(os.getenv("OPENAI_API_KEY"))
+    if not os.getenv("OPENAI_API_KEY"):
+        return False
+    return OpenAI is not None or importlib.util.find_spec("openai") is not None
+
+def warm() -> str:
+    if importlib.util.find_spec("openai") is None:
+        return "unavailable"
+    _openai()
+    return "ok"
 
 def _prompt(text: str) -> str:
     return f"""
@@ -76,7 +100,7 @@ TEXT:
 
 def _extract_with_focus_on_supplier(text: str) -> dict:
     """Secondary extraction focused specifically on supplier identification"""
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = _client()
     model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     
     focused_prompt = f"""
@@ -121,16 +145,17 @@ TEXT:
     return {}
 
 def extract_fields_llm(text: str) -> dict:
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = _client()
     model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You are a precise information extraction assistant."},
-            {"role": "user", "content": _prompt(text)},
-        ],
-        temperature=0.2,
-    )
+    with metrics.timed("llm_call"):
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a precise information extraction assistant."},
+                {"role": "user", "content": _prompt(text)},
+            ],
+            temperature=0.2,
+        )
     raw = resp.choices[0].message.content.strip()
     m = re.search(r"\{.*\}", raw, re.S)
     if m: raw = m.group(0)
@@ -236,10 +261,10 @@ def extract_fields_llm(text: str) -> dict:
             if isinstance(val, (list, dict)):
                 supplier[key] = json.dumps(val, ensure_ascii=False)
     data["dodavatel"] = {
-        "nazev": fix_czech_chars(supplier.get("nazev")),
+        "nazev": supplier.get("nazev"),
         "ico": supplier.get("ico"),
         "dic": supplier.get("dic"),
-        "adresa": fix_czech_chars(supplier.get("adresa")),
+        "adresa": supplier.get("adresa"),
     }
     
     # Normalize currency - convert "Kč" to "CZK"
@@ -266,11 +291,6 @@ def extract_fields_llm(text: str) -> dict:
         dph is not None and abs(float(dph)) < 0.01):
         data["dph"] = None
     
-    # Fix Czech characters in text fields and handle missing payment method
-    for k in ["platba_zpusob", "banka_prijemce"]:
-        if data.get(k):
-            data[k] = fix_czech_chars(data[k])
-    
     # If payment method is missing but we have bank account, assume bank transfer
     if not data.get("platba_zpusob") and data.get("ucet_prijemce"):
         data["platba_zpusob"] = "peněžní převod"
@@ -0,0 +1,232 @@
+"""
+Memory accounting for image decoding and OCR preprocessing.
+
+Before anything is decoded, estimate() works out a document's peak memory from its
+header alone (PIL opens images lazily): the decoded pixels after the planned
+downscale plus the grayscale and binarized (possibly upscaled) working copies that
+live while tesseract runs. Images above MAX_IMAGE_PIXELS, or scanned above
+OCR_TARGET_DPI, are downscaled on decode; images above REFUSE_IMAGE_PIXELS are
+refused. The worker admits a document only while the sum of the estimates of the
+documents in progress fits MEMORY_BUDGET_MB; otherwise it waits up to
+ADMISSION_TIMEOUT_S and then turns the request away.
+
+track_peak() measures what a document really used: the highest resident set size
+sampled while it was processed, minus the RSS when it started. Documents running
+at the same time in one worker count towards each other's peak.
+"""
+from __future__ import annotations
+
+import io
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from . import metrics
+
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "40000000"))
+REFUSE_PIXELS = int(os.getenv("REFUSE_IMAGE_PIXELS", "200000000"))
+TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+MEMORY_BUDGET = int(os.getenv("MEMORY_BUDGET_MB", "1024")) * 2 ** 20
+ADMISSION_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT_S", "30"))
+
+UPSCALE_MIN_SIDE = 1000  # _preprocess_for_ocr upscales images whose shorter side is below this
+UPSCALE_MAX = 3
+ROTATE_GROWTH = 1.35     # a page deskewed by up to 10° grows by this much (expand=True)
+PDF_FACTOR = 4           # parsed PDF objects relative to the file size
+PDF_RASTER = 1654 * 2339 * 3  # one A4 page at 200 dpi (QR scan)
+
+_BYTES_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "LA": 2, "I;16": 2, "RGB": 3, "YCbCr": 3, "LAB": 3, "HSV": 3,
+                    "RGBA": 4, "CMYK": 4, "I": 4, "F": 4}
+
+DOCUMENT_BYTES = metrics.REGISTRY.histogram(
+    "invoice_document_memory_bytes", "Estimated peak memory per document.",
+    buckets=tuple(2 ** 20 * m for m in (1, 4, 16, 64, 128, 256, 512, 1024, 2048)))
+DOCUMENT_PEAK_BYTES = metrics.REGISTRY.histogram(
+    "invoice_document_peak_bytes", "Measured peak memory per document (RSS high-water minus RSS at start).",
+    buckets=tuple(2 ** 20 * m for m in (1, 4, 16, 64, 128, 256, 512, 1024, 2048)))
+PEAK_INTERVAL = float(os.getenv("MEMORY_PEAK_INTERVAL_MS", "10")) / 1000.0
+ADMISSION = metrics.REGISTRY.counter("invoice_admission_total", "Admission decisions by outcome.", ("outcome",))
+ADMITTED_BYTES = metrics.REGISTRY.gauge("invoice_memory_admitted_bytes", "Estimated memory of documents in progress.")
+DOWNSCALED = metrics.REGISTRY.counter("invoice_images_downscaled_total", "Images downscaled on decode.")
+
+
+class Rejected(Exception):
+    """The document is too large to process at all (HTTP 413)."""
+
+
+def target_size(size: Tuple[int, int], dpi=None) -> Optional[Tuple[int, int]]:
+    """Size to decode the image at, or None to keep it: at most OCR_TARGET_DPI and MAX_IMAGE_PIXELS."""
+    w, h = size
+    scale = 1.0
+    try:
+        d = float(dpi[0] if isinstance(dpi, (tuple, list)) else dpi) if dpi else 0.0
+    except (TypeError, ValueError):
+        d = 0.0
+    if d > TARGET_DPI:
+        scale = TARGET_DPI / d
+    if w * h * scale * scale > MAX_IMAGE_PIXELS:
+        scale = math.sqrt(MAX_IMAGE_PIXELS / float(w * h))
+    if scale >= 1.0:
+        return None
+    return max(1, int(w * scale)), max(1, int(h * scale))
+
+
+def upscale_factor(size: Tuple[int, int]) -> int:
+    """Integer upscale of _preprocess_for_ocr, capped so the result stays within MAX_IMAGE_PIXELS."""
+    min_dim = min(size)
+    if min_dim <= 0 or min_dim >= UPSCALE_MIN_SIDE:
+        return 1
+    scale = min(UPSCALE_MAX, max(1, (UPSCALE_MIN_SIDE + min_dim - 1) // min_dim))
+    fit = int(math.sqrt(MAX_IMAGE_PIXELS / float(size[0] * size[1])))
+    return max(1, min(scale, fit))
+
+
+def max_scale(size: Tuple[int, int]) -> float:
+    """Largest OCR resize factor for the image: UPSCALE_MAX, less if MAX_IMAGE_PIXELS would be exceeded."""
+    return max(1.0, min(float(UPSCALE_MAX), math.sqrt(MAX_IMAGE_PIXELS / float(max(1, size[0] * size[1])))))
+
+
+def image_bytes(size: Tuple[int, int], mode: str, dpi=None) -> int:
+    """Peak bytes of OCR on an image: decoded copy, deskewed grayscale copy, filtered and binarized working copies."""
+    size = target_size(size, dpi) or size
+    w, h = size
+    s = max_scale(size)  # worst case of the text-height rescale
+    return w * h * _BYTES_PER_PIXEL.get(mode, 4) + int(ROTATE_GROWTH * w * h) + int(3 * w * h * s * s)
+
+
+def _is_image(filename: str) -> bool:
+    return any((filename or "").lower().endswith(ext) for ext in (".jpg", ".jpeg", ".png", ".tiff", ".bmp"))
+
+
+def estimate(filename: str, content: bytes) -> int:
+    """Estimated peak bytes for the document, from headers only; raises Rejected for oversized images."""
+    name = (filename or "").lower()
+    if _is_image(name):
+        from PIL import Image
+        Image.MAX_IMAGE_PIXELS = REFUSE_PIXELS  # our own check below refuses first
+        try:
+            with Image.open(io.BytesIO(content)) as img:
+                size, mode, dpi = img.size, img.mode, img.info.get("dpi")
+        except Image.DecompressionBombError as e:
+            ADMISSION.inc(outcome="too_large")
+            raise Rejected(str(e)) from e
+        except Exception as e:  # unreadable: OCR will give up quickly
+            metrics.swallowed("memory_estimate", e)
+            return len(content)
+        if size[0] * size[1] > REFUSE_PIXELS:
+            ADMISSION.inc(outcome="too_large")
+            raise Rejected(f"Image of {size[0]}x{size[1]} pixels exceeds REFUSE_IMAGE_PIXELS")
+        need = len(content) + image_bytes(size, mode, dpi)
+    elif name.endswith(".pdf"):
+        need = len(content) * PDF_FACTOR + PDF_RASTER
+    else:
+        need = len(content) * 2
+    DOCUMENT_BYTES.observe(need)
+    return need
+
+
+class Budget:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes: int, timeout: Optional[float] = None) -> bool:
+        """
+        Reserve nbytes, waiting up to `timeout` seconds for running documents to
+        finish. A document larger than the whole budget is admitted only when it
+        would run alone.
+        """
+        nbytes = min(nbytes, self.limit)
+        with self._cond:
+            waited = self.used + nbytes > self.limit
+            if not self._cond.wait_for(lambda: self.used + nbytes <= self.limit, timeout):
+                ADMISSION.inc(outcome="rejected")
+                return False
+            self.used += nbytes
+            ADMITTED_BYTES.set(self.used)
+        ADMISSION.inc(outcome="waited" if waited else "admitted")
+        return True
+
+    def release(self, nbytes: int):
+        nbytes = min(nbytes, self.limit)
+        with self._cond:
+            self.used = max(0, self.used - nbytes)
+            ADMITTED_BYTES.set(self.used)
+            self._cond.notify_all()
+
+
+BUDGET = Budget(MEMORY_BUDGET)
+
+
+def rss() -> Optional[int]:
+    """Current resident set size in bytes (Linux /proc), or None where it cannot be read."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _PeakSampler:
+    """One thread sampling RSS every PEAK_INTERVAL while any document is tracked."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._peaks = {}  # tracker id -> highest RSS seen
+        self._thread = None
+
+    def _run(self):
+        while True:
+            value = rss()
+            with self._lock:
+                if not self._peaks:
+                    self._thread = None
+                    return
+                if value is not None:
+                    for key, peak in self._peaks.items():
+                        if value > peak:
+                            self._peaks[key] = value
+            time.sleep(PEAK_INTERVAL)
+
+    def add(self, key, start: int):
+        with self._lock:
+            self._peaks[key] = start
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="memory-peak", daemon=True)
+                self._thread.start()
+
+    def pop(self, key) -> int:
+        with self._lock:
+            return self._peaks.pop(key)
+
+
+_SAMPLER = _PeakSampler()
+
+
+@contextmanager
+def track_peak():
+    """
+    Measure the memory a document really uses (next to the estimate() made before
+    decoding): observed in invoice_document_peak_bytes and noted as memory_peak_bytes
+    in the request timings. The yielded dict gets "bytes" on exit.
+    """
+    out = {}
+    start = rss()
+    if start is None:
+        yield out
+        return
+    key = object()
+    _SAMPLER.add(key, start)
+    try:
+        yield out
+    finally:
+        peak = max(_SAMPLER.pop(key), rss() or 0)
+        out["bytes"] = max(0, peak - start)
+        DOCUMENT_PEAK_BYTES.observe(out["bytes"])
+        rec = metrics.current()
+        if rec is not None:
+            rec.note("memory_peak_bytes", out["bytes"])
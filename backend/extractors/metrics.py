@@ -0,0 +1,257 @@
+import os, threading, time, contextvars
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Latency buckets in seconds - from fast regex work up to slow multi-page OCR
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = ()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        return self._values.get(key, 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_fmt_labels(self.labels, key)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        for line in super().render():
+            yield line.replace(" counter", " gauge") if line.startswith("# TYPE") else line
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in items:
+            cumulative = 0
+            for i, b in enumerate(self.buckets):
+                cumulative += row[i]
+                le = 'le="%s"' % _fmt_value(b)
+                yield f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_value(row[-2])}"
+            yield f"{self.name}_count{_fmt_labels(self.labels, key)} {row[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, doc, labels=()):
+        m = Counter(name, doc, labels); self._metrics.append(m); return m
+
+    def gauge(self, name, doc, labels=()):
+        m = Gauge(name, doc, labels); self._metrics.append(m); return m
+
+    def histogram(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        m = Histogram(name, doc, labels, buckets); self._metrics.append(m); return m
+
+    def collector(self, fn):
+        """Register a callable producing exposition lines at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        for fn in self._collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("invoice_stage_seconds", "Latency of individual pipeline stages.", ("stage",))
+EXTRACT_SECONDS = REGISTRY.histogram("invoice_extract_seconds", "End-to-end latency of /api/extract.")
+METHOD_TOTAL = REGISTRY.counter("invoice_extract_method_total", "Extraction outcomes by method.", ("method",))
+CACHE_HITS = REGISTRY.counter("invoice_cache_hits_total", "Cache hits.", ("cache",))
+CACHE_MISSES = REGISTRY.counter("invoice_cache_misses_total", "Cache misses.", ("cache",))
+SWALLOWED = REGISTRY.counter("invoice_swallowed_exceptions_total", "Exceptions caught and suppressed by the pipeline.", ("where", "exception"))
+DUPLICATES = REGISTRY.counter("invoice_duplicates_total", "Documents matched in the duplicate index.", ("match", "reused"))
+DUPLICATES_UNCONFIRMED = REGISTRY.counter("invoice_duplicates_unconfirmed_total",
+                                          "Similar documents rejected because their VS / total are not in the new text.")
+QR_CODES = REGISTRY.counter("invoice_qr_codes_total", "QR payment code scans by outcome.", ("outcome",))
+QR_OCR = REGISTRY.counter("invoice_qr_ocr_total", "OCR work done for documents with a QR payment code.", ("ocr",))
+SPLIT_INVOICES = REGISTRY.histogram("invoice_split_invoices_per_document", "Invoices found in PDFs checked for splitting.",
+                                    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+TESSERACT_CALLS = REGISTRY.counter("invoice_tesseract_calls_total", "Tesseract invocations.")
+SKEW_DEGREES = REGISTRY.histogram("invoice_ocr_skew_degrees", "Absolute skew detected on OCR'd images.",
+                                  buckets=(0.3, 0.5, 1, 2, 3, 5, 10))
+OCR_VARIANT = REGISTRY.counter("invoice_ocr_variant_total", "Preprocessing variant OCR'd per image, and whether the confidence fallback ran.",
+                               ("variant", "fallback"))
+ORIENTATION = REGISTRY.counter("invoice_ocr_rotations_total", "Images turned upright before OCR, by clockwise angle.", ("rotate",))
+PARTIAL = REGISTRY.counter("invoice_partial_results_total", "Extractions cut short by the request deadline.")
+DEADLINE_SKIPPED = REGISTRY.counter("invoice_deadline_skipped_total", "Stages skipped for lack of remaining budget.", ("stage",))
+INFLIGHT = REGISTRY.gauge("invoice_inflight_requests", "Extractions currently in progress.")
+TESSERACT_PER_DOC = REGISTRY.histogram("invoice_tesseract_calls_per_document", "Tesseract invocations per extracted document.",
+                                       buckets=(0, 1, 2, 4, 8, 16, 32, 64))
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        # ru_maxrss is the peak, in kB on Linux - better than nothing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+
+@REGISTRY.collector
+def _process_metrics():
+    if resource is None:
+        return
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    yield "# HELP process_cpu_seconds_total Total user and system CPU time spent in seconds."
+    yield "# TYPE process_cpu_seconds_total counter"
+    yield f"process_cpu_seconds_total {_fmt_value(ru.ru_utime + ru.ru_stime)}"
+    yield "# HELP process_resident_memory_bytes Resident memory size in bytes."
+    yield "# TYPE process_resident_memory_bytes gauge"
+    yield f"process_resident_memory_bytes {_rss_bytes()}"
+    yield "# HELP process_max_resident_memory_bytes Peak resident memory size in bytes."
+    yield "# TYPE process_max_resident_memory_bytes gauge"
+    yield f"process_max_resident_memory_bytes {ru.ru_maxrss * 1024}"
+
+
+class RequestTimings:
+    """Per-request collector of stage timings, for diagnosing slow documents."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, list] = {}  # stage -> [seconds, calls]
+        self.notes: Dict[str, object] = {}  # per-document facts worth keeping with the timings (e.g. skew)
+        self.on_stage = None  # optional fn(stage, seconds), e.g. the SSE progress reporter
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            row = self.stages.setdefault(stage, [0.0, 0])
+            row[0] += seconds
+            row[1] += 1
+        if self.on_stage is not None:
+            self.on_stage(stage, seconds)
+
+    def note(self, key: str, value):
+        with self._lock:
+            self.notes[key] = value
+
+    def calls(self, stage: str) -> int:
+        row = self.stages.get(stage)
+        return row[1] if row else 0
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            stages = {k: {"ms": round(v[0] * 1000, 2), "calls": v[1]} for k, v in self.stages.items()}
+            notes = dict(self.notes)
+        out = {"total_ms": round((time.perf_counter() - self.started) * 1000, 2), "stages": stages}
+        if notes:
+            out["notes"] = notes
+        return out
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("invoice_timings", default=None)
+
+
+def current() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def track_request():
+    rec = RequestTimings()
+    token = _current.set(rec)
+    INFLIGHT.inc()
+    try:
+        yield rec
+    finally:
+        INFLIGHT.inc(-1)
+        _current.reset(token)
+        EXTRACT_SECONDS.observe(time.perf_counter() - rec.started)
+        TESSERACT_PER_DOC.observe(rec.calls("tesseract"))
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - start
+        STAGE_SECONDS.observe(dt, stage=stage)
+        rec = _current.get()
+        if rec is not None:
+            rec.add(stage, dt)
+
+
+def swallowed(where: str, exc: BaseException):
+    SWALLOWED.inc(where=where, exception=type(exc).__name__)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -1,19 +1,62 @@
 
+from __future__ import annotations
 import io
-import pdfplumber
-from PIL import Image, ImageOps, ImageFilter, ImageEnhance
-import pytesseract
+import os
 import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterator
+from . import metrics, progress, deadline, memory
 
-def _pdf_text(data: bytes) -> str:
+logger = logging.getLogger(__name__)
+
+# pdfplumber, PIL and pytesseract are imported on the code paths that need them so
+# importing the app stays cheap; warm() pays that cost in the start-up hook instead.
+
+# Height of a text line (row-profile run, roughly ascender to baseline) tesseract reads best at
+TEXT_HEIGHT = float(os.getenv("OCR_TEXT_HEIGHT", "30"))
+PROFILE_ROWS = 2000   # text height is measured on a copy at most this tall
+PROFILE_STRIPS = 4    # vertical strips, so a slight skew does not merge neighbouring lines
+MAX_SKEW = float(os.getenv("OCR_MAX_SKEW", "10"))  # degrees searched either way
+MIN_SKEW = 0.3        # smaller angles are not worth a rotation
+SKEW_SIDE = 1000      # skew is searched on a copy with this longer side
+OSD_ENABLED = os.getenv("OCR_OSD", "1").lower() not in ("0", "false", "no")
+_OSD_AVAILABLE = None  # unknown until the first attempt
+# Variant selection: only the predicted better of the grayscale / binarized images is
+# OCR'd; the other one only when the mean word confidence stays below OCR_MIN_CONF.
+MIN_CONF = float(os.getenv("OCR_MIN_CONF", "60"))
+STATS_SIDE = 1000     # image statistics are taken on a copy with at most this longer side
+STATS_BAND = 200      # rows of the full-resolution band the stroke width is measured on
+MIN_SEPARATION = 0.85 # Otsu between-class / total variance below this: uneven background
+MAX_NOISE = 6.0       # mean gray-level residual of a 3x3 box blur on the paper
+MIN_STROKE = 2.0      # thinner strokes (px) break up when thresholded
+# Word boxes of the last OCR'd scans, so line items reuse the text pass instead of running tesseract again
+WORDS_CACHE = int(os.getenv("OCR_WORDS_CACHE", "8"))
+_WORDS: "OrderedDict[str, list]" = OrderedDict()
+_WORDS_LOCK = threading.Lock()
+
+def _pdf_pages(data: bytes) -> list:
+    import pdfplumber
     text_parts = []
-    with pdfplumber.open(io.BytesIO(data)) as pdf:
-        for page in pdf.pages:
+    with metrics.timed("pdf_text"), pdfplumber.open(io.BytesIO(data)) as pdf:
+        for k, page in enumerate(pdf.pages, 1):
+            left = deadline.remaining()
+            if left is not None and left <= 0:
+                deadline.mark_partial("pdf_text")  # keep the pages read so far
+                break
             t = page.extract_text(x_tolerance=1, y_tolerance=1) or ""
             text_parts.append(t)
-    return "\n".join(text_parts)
+            progress.emit("page", page=k, pages=len(pdf.pages), source="text")
+    return text_parts
+
+def _pdf_text(data: bytes) -> str:
+    return "\n".join(_pdf_pages(data))
 
 def _resampling():
+    from PIL import Image
     try:
         return Image.Resampling.LANCZOS  # Pillow >= 10
     except Exception:
@@ -43,14 +86,183 @@ def _otsu_threshold(gray: Image.Image) -> int:
             threshold = t
     return threshold
 
+def _ink(small: Image.Image) -> Image.Image:
+    """Binarized copy with ink as 255 (for row profiles)."""
+    from PIL import ImageFilter
+    # A 3x3 box blur keeps scanner noise from pulling the Otsu threshold into the background
+    small = small.filter(ImageFilter.BoxBlur(1))
+    thr = _otsu_threshold(small)
+    return small.point(lambda x: 255 if x <= thr else 0)
+
+def _profile_sharpness(ink: Image.Image, angle: float) -> int:
+    """Sum of squared differences of the row profile after rotating by angle; peaks when lines are level."""
+    from PIL import Image
+    r = ink.rotate(angle, resample=Image.NEAREST, fillcolor=0) if angle else ink
+    p = r.resize((1, r.size[1]), Image.BOX).tobytes()
+    return sum((a - b) ** 2 for a, b in zip(p, p[1:]))
+
+def _skew_angle(g: Image.Image) -> float:
+    """
+    Counter-clockwise rotation in degrees (|angle| <= OCR_MAX_SKEW) that levels the text
+    lines: projection-profile search on a downsampled copy, 1° steps then 0.1° around
+    the best one.
+    """
+    k = max(1, -(-max(g.size) // SKEW_SIDE))
+    ink = _ink(g.reduce(k) if k > 1 else g)
+    steps = int(MAX_SKEW)
+    best = max(range(-steps, steps + 1), key=lambda a: _profile_sharpness(ink, float(a)))
+    fine = [best + i / 10.0 for i in range(-9, 10)]
+    return round(max(fine, key=lambda a: _profile_sharpness(ink, a)), 1)
+
+def _osd_rotation(g: Image.Image) -> int:
+    """Clockwise rotation (0/90/180/270) tesseract OSD recommends; 0 when OSD is unavailable or unsure."""
+    global _OSD_AVAILABLE
+    if not OSD_ENABLED or _OSD_AVAILABLE is False:
+        return 0
+    import pytesseract
+    small = g.copy()
+    small.thumbnail((SKEW_SIDE * 2, SKEW_SIDE * 2))
+    try:
+        metrics.TESSERACT_CALLS.inc()
+        out = pytesseract.image_to_osd(small, config="--psm 0", timeout=deadline.timeout() or 0)
+        _OSD_AVAILABLE = True
+    except pytesseract.TesseractNotFoundError as e:
+        _OSD_AVAILABLE = False
+        metrics.swallowed("osd", e)
+        return 0
+    except RuntimeError as e:  # too few characters, osd.traineddata missing, timeout
+        metrics.swallowed("osd", e)
+        return 0
+    m = re.search(r"Rotate:\s*(\d+)", out)
+    return int(m.group(1)) % 360 if m else 0
+
+def _deskew(g: Image.Image) -> Image.Image:
+    """
+    Upright, level copy of a grayscale page: OSD orientation (90/180/270) and then the
+    projection-profile skew, applied as one rotation of the full image. The result is
+    reported in the request timings (notes "rotate", "skew"), the "deskew" stage and
+    invoice_ocr_skew_degrees.
+    """
+    from PIL import Image
+    with metrics.timed("deskew"):
+        rotate = _osd_rotation(g)
+        upright = g.rotate(-rotate, expand=True) if rotate else g
+        skew = _skew_angle(upright)
+        angle = -rotate + (skew if abs(skew) >= MIN_SKEW else 0.0)
+        if angle:
+            g = g.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    metrics.SKEW_DEGREES.observe(abs(skew))
+    if rotate:
+        metrics.ORIENTATION.inc(rotate=rotate)
+    rec = metrics.current()
+    if rec is not None:
+        rec.note("rotate", rotate)
+        rec.note("skew", skew)
+    progress.emit("deskew", rotate=rotate, skew=skew)
+    return g
+
+def _image_stats(g: Image.Image) -> dict:
+    """
+    Cheap quality statistics of a preprocessed grayscale page: contrast between the ink
+    and paper classes (0-1), Otsu separation (between-class / total variance), noise
+    (gray levels, box-blur residual on the paper away from ink) and stroke width in
+    pixels. All but the stroke width come from a thumbnail; the stroke width needs the
+    full resolution and is measured on the band of rows with the most ink.
+    """
+    from PIL import Image, ImageChops, ImageFilter, ImageStat
+    k = max(1, -(-max(g.size) // STATS_SIDE))
+    small = g.reduce(k) if k > 1 else g
+    hist = small.histogram()
+    n = float(sum(hist)) or 1.0
+    thr = _otsu_threshold(small)
+    ink_n = sum(hist[:thr + 1])
+    paper_n = n - ink_n
+    mean = sum(i * c for i, c in enumerate(hist)) / n
+    var = sum((i - mean) ** 2 * c for i, c in enumerate(hist)) / n
+    mean_ink = sum(i * hist[i] for i in range(thr + 1)) / max(1, ink_n)
+    mean_paper = sum(i * hist[i] for i in range(thr + 1, 256)) / max(1, paper_n)
+    between = ink_n * paper_n / (n * n) * (mean_paper - mean_ink) ** 2
+    blurred = small.filter(ImageFilter.BoxBlur(1))
+    clear = (thr + mean_paper) / 2.0  # paper with no ink in the 3x3 neighbourhood
+    paper = blurred.point(lambda x: 255 if x > clear else 0)
+    resid = ImageChops.difference(small, blurred)
+    noise = ImageStat.Stat(resid, paper).mean[0] if paper.getbbox() else 0.0
+    # Stroke width from how much ink one 3x3 erosion removes (both sides of every stroke)
+    ink = small.point(lambda x: 255 if x <= thr else 0)
+    row = max(range(ink.size[1]), key=ink.resize((1, ink.size[1]), Image.BOX).tobytes().__getitem__)
+    top = max(0, row * k - STATS_BAND // 2)
+    band = g.crop((0, top, g.size[0], min(g.size[1], top + STATS_BAND))).point(lambda x: 255 if x <= thr else 0)
+    band_ink = band.histogram()[255]
+    # A 3x3 box mean is 255 only where the whole neighbourhood is ink: that is the erosion
+    kept = band.filter(ImageFilter.BoxBlur(1)).histogram()[255]
+    stroke = 2.0 * band_ink / (band_ink - kept) if band_ink > kept else 0.0
+    return {"contrast": round((mean_paper - mean_ink) / 255.0, 3),
+            "separation": round(between / var, 3) if var else 0.0,
+            "noise": round(noise, 2), "stroke": round(stroke, 2), "ink": round(ink_n / n, 4)}
+
+def _choose_variant(stats: dict) -> str:
+    """
+    "binary" for clean, bimodal pages with strokes thick enough to survive a global
+    threshold; "gray" for shaded or noisy scans and thin strokes, where thresholding
+    loses characters tesseract's own binarization keeps.
+    """
+    if stats["separation"] < MIN_SEPARATION or stats["noise"] > MAX_NOISE or stats["stroke"] < MIN_STROKE:
+        return "gray"
+    return "binary"
+
+def _text_height(g: Image.Image):
+    """
+    Median height in pixels of the text lines of a grayscale page, or None when no
+    lines are found. Uses the row profile (ink per row) of an Otsu-binarized copy,
+    reduced to at most PROFILE_ROWS rows and split into vertical strips.
+    """
+    from PIL import Image
+    k = max(1, -(-g.size[1] // PROFILE_ROWS))
+    ink = _ink(g.reduce(k) if k > 1 else g)
+    w, h = ink.size
+    runs = []
+    for i in range(PROFILE_STRIPS):
+        strip = ink.crop((w * i // PROFILE_STRIPS, 0, w * (i + 1) // PROFILE_STRIPS, h))
+        profile = list(strip.resize((1, h), Image.BOX).tobytes())
+        level = max(2, max(profile) // 10)  # rows with at least 10 % of the densest row's ink
+        start = None
+        for y, v in enumerate(profile + [0]):
+            if v >= level and start is None:
+                start = y
+            elif v < level and start is not None:
+                if y - start >= 2:
+                    runs.append(y - start)
+                start = None
+    if len(runs) < 3:
+        return None
+    runs.sort()
+    return runs[len(runs) // 2] * k
+
+def _ocr_scale(g: Image.Image) -> float:
+    """
+    Resize factor bringing the text to TEXT_HEIGHT, up or down (0.35-3, at most
+    what MAX_IMAGE_PIXELS allows); 1 when it is already close. Falls back to
+    the minimum-dimension rule when no text lines are found.
+    """
+    height = _text_height(g)
+    if not height:
+        return float(memory.upscale_factor(g.size))
+    scale = min(max(TEXT_HEIGHT / height, 0.35), memory.max_scale(g.size))
+    return 1.0 if 0.8 <= scale <= 1.25 else scale
+
 def _preprocess_for_ocr(img: Image.Image) -> tuple[Image.Image, Image.Image]:
+    from PIL import ImageOps, ImageFilter, ImageEnhance
     # Convert to grayscale
     g = img.convert("L")
-    # Upscale small images to improve text size for Tesseract, but limit scale to 3 to avoid slowness
+    # Upright and level before measuring and binarizing, so recognition runs once on straight lines
+    g = _deskew(g)
+    # Rescale so the text has the height tesseract works best at (instead of upscaling
+    # every image with a short side below 1000 px)
     min_dim = min(g.size)
-    if min_dim < 1000:
-        scale = min(3, max(1, (1000 + min_dim - 1) // min_dim))
-        new_size = (g.size[0] * scale, g.size[1] * scale)
+    with metrics.timed("text_height"):
+        scale = _ocr_scale(g)
+    if scale != 1.0:
+        new_size = (max(1, round(g.size[0] * scale)), max(1, round(g.size[1] * scale)))
         g = g.resize(new_size, _resampling())
     # Autocontrast and slight sharpening only if image is not too large
     if min_dim < 2000:
@@ -62,7 +274,50 @@ def _preprocess_for_ocr(img: Image.Image) -> tuple[Image.Image, Image.Image]:
     b = g.point(lambda x: 255 if x > thr else 0, mode='1').convert('L')
     return g, b
 
-def _tesseract(img: Image.Image) -> str:
+def _data_text(data: dict):
+    """Text (one line per tesseract line, blank line between blocks) and mean word confidence of image_to_data output."""
+    lines, confs, key, block = [], [], None, None
+    for i, word in enumerate(data.get("text", [])):
+        conf = float(data["conf"][i])
+        if conf < 0 or not (word or "").strip():
+            continue
+        confs.append(conf)
+        k = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if k != key:
+            if block is not None and k[0] != block:
+                lines.append("")
+            lines.append(word)
+            key, block = k, k[0]
+        else:
+            lines[-1] += " " + word
+    return "\n".join(lines), (sum(confs) / len(confs) if confs else None)
+
+def _run_tesseract(img: Image.Image, lang, config: str, score: dict = None) -> str:
+    """Text of one tesseract run; with `score` the run goes through image_to_data and stores the mean word confidence in score["conf"]."""
+    import pytesseract
+    progress.checkpoint()
+    # pytesseract kills the subprocess when the timeout passes (0 = no limit)
+    timeout = deadline.timeout() or 0
+    metrics.TESSERACT_CALLS.inc()
+    kw = {"lang": lang} if lang else {}
+    if score is not None:
+        score.clear()  # a failed or rejected earlier attempt must not leave its confidence/boxes behind
+    with metrics.timed("tesseract"):
+        try:
+            if score is None:
+                return pytesseract.image_to_string(img, config=config, timeout=timeout, **kw)
+            data = pytesseract.image_to_data(img, config=config, timeout=timeout,
+                                             output_type=pytesseract.Output.DICT, **kw)
+            text, score["conf"] = _data_text(data)
+            score["data"] = data
+            return text
+        except RuntimeError as e:
+            if timeout and "timeout" in str(e).lower():
+                metrics.swallowed("tesseract_timeout", e)
+                raise deadline.Expired() from e
+            raise
+
+def _tesseract(img: Image.Image, score: dict = None) -> str:
     # Try Czech + English first, fallback to default if the language pack is missing
     # Enhanced configuration for better Czech text recognition
     cfg = "--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzáčďéěíňóřšťúůýžÁČĎÉĚÍŇÓŘŠŤÚŮÝŽ0123456789.,:-/()[] "
@@ -75,46 +330,194 @@ def _tesseract(img: Image.Image) -> str:
         
         for lang in ["ces+eng", "eng+ces", None]:
             try:
-                txt = pytesseract.image_to_string(img, lang=lang, config=current_cfg) if lang else pytesseract.image_to_string(img, config=current_cfg)
+                txt = _run_tesseract(img, lang, current_cfg, score)
                 # Heuristic: ignore clearly broken results
                 if txt and len(re.findall(r"[A-Za-z0-9áčďéěíňóřšťúůýžÁČĎÉĚÍŇÓŘŠŤÚŮÝŽ]", txt)) >= 5:
                     return txt
-            except Exception:
+            except Exception as e:
+                metrics.swallowed("tesseract", e)
                 continue
     
     # Fallback without character whitelist
     for lang in ["ces+eng", "eng+ces", None]:
         try:
-            txt = pytesseract.image_to_string(img, lang=lang, config="--oem 3 --psm 6") if lang else pytesseract.image_to_string(img, config="--oem 3 --psm 6")
+            txt = _run_tesseract(img, lang, "--oem 3 --psm 6", score)
             if txt and len(re.findall(r"[A-Za-z0-9]", txt)) >= 5:
                 return txt
-        except Exception:
+        except Exception as e:
+            metrics.swallowed("tesseract", e)
             continue
+    if score is not None:
+        score.clear()
     return ""
 
-def _image_text(data: bytes) -> str:
+def _boxes(d: dict) -> list:
+    """(text, x0, x1, top, bottom) of the recognised words of image_to_data output."""
+    return [(t, d["left"][i], d["left"][i] + d["width"][i], d["top"][i], d["top"][i] + d["height"][i])
+            for i, t in enumerate(d.get("text", [])) if (t or "").strip() and float(d["conf"][i]) >= 0]
+
+def _words_key(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def _remember_words(data: bytes, score: dict):
+    """Keep the word boxes of the pass whose text is used, for image_words."""
+    if not WORDS_CACHE or not score.get("data"):
+        return
+    key, words = _words_key(data), _boxes(score["data"])
+    with _WORDS_LOCK:
+        _WORDS[key] = words
+        _WORDS.move_to_end(key)
+        while len(_WORDS) > WORDS_CACHE:
+            _WORDS.popitem(last=False)
+
+def _open_image(data: bytes):
+    """Decode an upload, downscaled to OCR_TARGET_DPI / MAX_IMAGE_PIXELS when it is larger."""
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = memory.REFUSE_PIXELS  # PIL's decompression-bomb guard
+    img = Image.open(io.BytesIO(data))
+    size = memory.target_size(img.size, img.info.get("dpi"))
+    if size:
+        # thumbnail() lets JPEG decode at a reduced scale (draft), so the full image never exists
+        memory.DOWNSCALED.inc()
+        img.thumbnail(size, _resampling())
+    return img
+
+def _log_variant(decision: dict):
+    """Decision statistics, for tuning the thresholds on a corpus (log + request timings notes)."""
+    metrics.OCR_VARIANT.inc(variant=decision["used"], fallback=str(decision["fallback"]).lower())
+    rec = metrics.current()
+    if rec is not None:
+        rec.note("ocr_variant", decision)
+    logger.info("OCR variant %s", json.dumps(decision, sort_keys=True))
+
+def image_text_passes(data: bytes) -> Iterator[str]:
+    """
+    OCR of an image in two steps: yields the text of the preprocessing variant
+    _choose_variant predicts to read better (enough for a template match), then,
+    when resumed, the final text - the other variant is OCR'd only if the mean word
+    confidence is below OCR_MIN_CONF. Callers satisfied with the first text close
+    the generator and the fallback pass never runs.
+    """
     try:
-        img = Image.open(io.BytesIO(data))
-    except Exception:
-        return ""
+        img = _open_image(data)
+    except Exception as e:
+        metrics.swallowed("image_open", e)
+        yield ""
+        yield ""
+        return
+    text = ""
+    decision = None
     try:
-        g, b = _preprocess_for_ocr(img)
-        t1 = _tesseract(g)
-        t2 = _tesseract(b)
-        return t1 if len(t1) >= len(t2) else t2
-    except Exception:
+        with metrics.timed("ocr_preprocess"):
+            g, b = _preprocess_for_ocr(img)
+        with metrics.timed("ocr_variant"):
+            stats = _image_stats(g)
+        choice = _choose_variant(stats)
+        first, second = (b, g) if choice == "binary" else (g, b)
+        score = {}
+        text = _tesseract(first, score)
+        decision = {**stats, "chosen": choice, "used": choice, "conf": score.get("conf"), "fallback": False}
+        _remember_words(data, score)
+        yield text
+        conf = score.get("conf")
+        if conf is None or conf < MIN_CONF:
+            decision["fallback"] = True
+            other = {}
+            text2 = _tesseract(second, other)
+            decision["conf_other"] = other.get("conf")
+            if (other.get("conf") or -1) > (conf or -1):
+                text = text2
+                decision["used"] = "gray" if choice == "binary" else "binary"
+                _remember_words(data, other)
+        progress.emit("page", page=1, pages=1, source="ocr")
+        yield text
+    except deadline.Expired:
+        deadline.mark_partial("ocr")  # out of time: the first pass (if done) is all we get
+        yield text
+        yield text
+    except Exception as e:
+        metrics.swallowed("ocr", e)
         try:
-            return _tesseract(img)
-        except Exception:
-            return ""
+            if decision is None:  # nothing read yet: plain tesseract on the decoded image
+                text = _tesseract(img)
+        except deadline.Expired:
+            deadline.mark_partial("ocr")
+            text = ""
+        except Exception as e2:
+            metrics.swallowed("tesseract", e2)
+            text = ""
+        yield text
+        yield text
+    finally:
+        if decision is not None:
+            _log_variant(decision)
+
+def _image_text(data: bytes, quick: bool = False) -> str:
+    """OCR of an image; quick=True stops after the predicted variant (see image_text_passes)."""
+    passes = image_text_passes(data)
+    try:
+        text = next(passes)
+        return text if quick else next(passes, text)
+    finally:
+        passes.close()
+
+def image_words(data: bytes) -> list:
+    """
+    Word boxes (text, x0, x1, top, bottom) of a scan for table extraction, in pixels of
+    the preprocessed image. The boxes of the text pass (image_text_passes) are reused;
+    only a scan not OCR'd recently gets one tesseract run on the variant _choose_variant picks.
+    """
+    with _WORDS_LOCK:
+        words = _WORDS.get(_words_key(data))
+    if words is not None:
+        metrics.CACHE_HITS.inc(cache="ocr_words")
+        return list(words)
+    metrics.CACHE_MISSES.inc(cache="ocr_words")
+    try:
+        img = _open_image(data)
+        with metrics.timed("ocr_preprocess"):
+            g, b = _preprocess_for_ocr(img)
+        page = b if _choose_variant(_image_stats(g)) == "binary" else g
+        score = {}
+        _tesseract(page, score)
+    except deadline.Expired:
+        deadline.mark_partial("items")
+        return []
+    except Exception as e:
+        metrics.swallowed("image_words", e)
+        return []
+    _remember_words(data, score)
+    return _boxes(score.get("data") or {})
 
-def extract_text_from_file(filename: str, data: bytes) -> str:
+def warm() -> str:
+    """Import OCR dependencies and run tesseract once so language data is loaded before the first request."""
+    import pdfplumber  # noqa: F401
+    from PIL import Image, ImageDraw
+    img = Image.new("L", (240, 60), 255)
+    ImageDraw.Draw(img).text((10, 20), "Faktura 2024 IČO", fill=0)
+    try:
+        _run_tesseract(img, "ces+eng", "--oem 3 --psm 6")
+        return "ok"
+    except Exception as e:
+        metrics.swallowed("ocr_warmup", e)
+        return f"unavailable ({type(e).__name__})"
+
+def is_image(filename: str) -> bool:
+    return any((filename or "").lower().endswith(ext) for ext in [".jpg", ".jpeg", ".png", ".tiff", ".bmp"])
+
+def extract_text_from_file(filename: str, data: bytes, quick: bool = False) -> str:
     name = (filename or "").lower()
     if name.endswith(".pdf"):
         return _pdf_text(data)
-    if any(name.endswith(ext) for ext in [".jpg", ".jpeg", ".png", ".tiff", ".bmp"]):
-        return _image_text(data)
+    if is_image(name):
+        return _image_text(data, quick)
     try:
         return data.decode("utf-8", errors="ignore")
     except Exception:
         return ""
+
+def extract_pages_from_file(filename: str, data: bytes) -> list:
+    """Text per page: PDF pages separately, anything else as a single page."""
+    if (filename or "").lower().endswith(".pdf"):
+        return _pdf_pages(data)
+    return [extract_text_from_file(filename, data)]
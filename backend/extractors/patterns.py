@@ -0,0 +1,221 @@
+"""
+Registry of extractor regexes: compiled once with the `regex` module, checked for
+catastrophic-backtracking hazards, matched with a per-call timeout and timed per pattern.
+
+Template fields and heuristic patterns run over arbitrary (garbled, adversarial) OCR
+text; a single exponential pattern would otherwise stall a worker. A match that
+exceeds REGEX_TIMEOUT_MS counts as "no match" and is reported in
+invoice_regex_timeouts_total. Per pattern, call count and total/max time are
+exported as invoice_regex_calls_total / _seconds_total / _seconds_max, and calls
+slower than REGEX_SLOW_MS also go into the invoice_regex_slow_seconds histogram.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import regex
+
+try:
+    from re import _parser as _sre_parse, _constants as _sre
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse, sre_constants as _sre
+
+from . import metrics
+
+TIMEOUT = float(os.getenv("REGEX_TIMEOUT_MS", "200")) / 1000.0
+SLOW = float(os.getenv("REGEX_SLOW_MS", "1")) / 1000.0
+error = regex.error
+
+SLOW_SECONDS = metrics.REGISTRY.histogram(
+    "invoice_regex_slow_seconds", "Regex calls slower than REGEX_SLOW_MS, by pattern.", ("pattern",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0))
+TIMEOUTS = metrics.REGISTRY.counter("invoice_regex_timeouts_total", "Regex calls aborted by the timeout.", ("pattern",))
+
+_REPEATS = (_sre.MAX_REPEAT, _sre.MIN_REPEAT)
+# No backtracking into these (Python 3.11+), so nothing below them can blow up
+_ATOMIC = tuple(getattr(_sre, n) for n in ("ATOMIC_GROUP", "POSSESSIVE_REPEAT") if hasattr(_sre, n))
+_UNBOUNDED = 64  # {n,m} with m above this backtracks like * / +
+
+
+class UnsafePattern(ValueError):
+    """Pattern rejected by the static backtracking check."""
+
+
+def _children(av):
+    if isinstance(av, _sre_parse.SubPattern):
+        yield av
+    elif isinstance(av, (tuple, list)):
+        for x in av:
+            yield from _children(x)
+
+
+def _walk(p, skip=()):
+    for op, av in p:
+        yield op, av
+        if op in skip:
+            continue
+        for child in _children(av):
+            yield from _walk(child, skip)
+
+
+def hazard(pattern: str, flags: int = 0) -> Optional[str]:
+    """
+    Reason why the pattern can backtrack exponentially, or None.
+
+    Flags an unbounded repetition whose body contains another variable-length
+    repetition ("(\\d+\\s?)+") or alternatives of different length or with a
+    common first item ("(a|aa)+"), i.e. bodies that can split the same text in
+    many ways. Possessive quantifiers and atomic groups are never flagged.
+    Patterns using syntax that only the `regex` module understands are not checked.
+    """
+    try:
+        tree = _sre_parse.parse(pattern, flags & (re.I | re.M | re.S | re.X | re.A | re.U))
+    except Exception:
+        return None
+    for op, av in _walk(tree, _ATOMIC):
+        if op not in _REPEATS or (av[1] != _sre.MAXREPEAT and av[1] <= _UNBOUNDED):
+            continue
+        for inner_op, inner_av in _walk(av[2], _ATOMIC):
+            if inner_op in _REPEATS and inner_av[0] != inner_av[1]:
+                return "nested quantifier"
+            if inner_op == _sre.BRANCH:
+                alts = inner_av[1]
+                heads = [list(alt)[:1] for alt in alts]
+                if len({alt.getwidth() for alt in alts}) > 1 or any(h and heads.count(h) > 1 for h in heads):
+                    return "ambiguous alternatives under a quantifier"
+    return None
+
+
+class SafePattern:
+    __slots__ = ("pattern", "flags", "name", "timeout", "_rx", "calls", "seconds", "slowest")
+
+    def __init__(self, pattern: str, flags: int = 0, name: Optional[str] = None, timeout: Optional[float] = None):
+        self.pattern, self.flags = pattern, flags
+        self.name = name or (pattern if len(pattern) <= 60 else pattern[:57] + "...")
+        self.timeout = TIMEOUT if timeout is None else timeout
+        self._rx = regex.compile(pattern, flags)
+        # Plain attributes instead of a locked histogram per call: heuristics make
+        # ~1000 calls per document. Updates may race between threads; fine for metrics.
+        self.calls, self.seconds, self.slowest = 0, 0.0, 0.0
+
+    def __repr__(self):
+        return f"SafePattern({self.name!r})"
+
+    def _record(self, dt: float):
+        self.calls += 1
+        self.seconds += dt
+        if dt > self.slowest:
+            self.slowest = dt
+        if dt >= SLOW:
+            SLOW_SECONDS.observe(dt, pattern=self.name)
+
+    def _run(self, fn, args, default):
+        start = time.perf_counter()
+        try:
+            return fn(*args, timeout=self.timeout)
+        except TimeoutError:
+            TIMEOUTS.inc(pattern=self.name)
+            return default
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def search(self, text: str):
+        # Hot path (label scans in heuristics), inlined _run
+        start = time.perf_counter()
+        try:
+            return self._rx.search(text, timeout=self.timeout)
+        except TimeoutError:
+            TIMEOUTS.inc(pattern=self.name)
+            return None
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def match(self, text: str):
+        return self._run(self._rx.match, (text,), None)
+
+    def fullmatch(self, text: str):
+        return self._run(self._rx.fullmatch, (text,), None)
+
+    def findall(self, text: str) -> list:
+        return self._run(self._rx.findall, (text,), [])
+
+    def sub(self, repl, text: str) -> str:
+        return self._run(self._rx.sub, (repl, text), text)
+
+    def finditer(self, text: str) -> List:
+        """All matches as a list; on timeout the matches found so far."""
+        found = []
+        start = time.perf_counter()
+        try:
+            for m in self._rx.finditer(text, timeout=self.timeout):
+                found.append(m)
+        except TimeoutError:
+            TIMEOUTS.inc(pattern=self.name)
+        finally:
+            self._record(time.perf_counter() - start)
+        return found
+
+
+_PATTERNS: Dict[Tuple[str, int], SafePattern] = {}
+_LOCK = threading.Lock()
+
+
+def compile(pattern: str, flags: int = 0, name: Optional[str] = None) -> SafePattern:
+    """Compiled, checked pattern from the registry; raises UnsafePattern or regex.error."""
+    key = (pattern, flags)
+    p = _PATTERNS.get(key)
+    if p is not None:
+        return p
+    reason = hazard(pattern, flags)
+    if reason:
+        raise UnsafePattern(f"{reason}: {pattern!r}")
+    p = SafePattern(pattern, flags, name)
+    with _LOCK:
+        return _PATTERNS.setdefault(key, p)
+
+
+def search(pattern: str, text: str, flags: int = 0, name: Optional[str] = None):
+    return compile(pattern, flags, name).search(text)
+
+
+def match(pattern: str, text: str, flags: int = 0, name: Optional[str] = None):
+    return compile(pattern, flags, name).match(text)
+
+
+def findall(pattern: str, text: str, flags: int = 0, name: Optional[str] = None) -> list:
+    return compile(pattern, flags, name).findall(text)
+
+
+def finditer(pattern: str, text: str, flags: int = 0, name: Optional[str] = None) -> List:
+    return compile(pattern, flags, name).finditer(text)
+
+
+def sub(pattern: str, repl, text: str, flags: int = 0, name: Optional[str] = None) -> str:
+    return compile(pattern, flags, name).sub(repl, text)
+
+
+def registered() -> List[SafePattern]:
+    return list(_PATTERNS.values())
+
+
+@metrics.REGISTRY.collector
+def _render_stats():
+    stats: Dict[str, list] = {}
+    for p in registered():
+        row = stats.setdefault(p.name, [0, 0.0, 0.0])
+        row[0] += p.calls
+        row[1] += p.seconds
+        row[2] = max(row[2], p.slowest)
+    for i, (suffix, kind, doc) in enumerate((
+            ("calls_total", "counter", "Regex calls by pattern."),
+            ("seconds_total", "counter", "Time spent in regex calls by pattern."),
+            ("seconds_max", "gauge", "Slowest single regex call by pattern."))):
+        name = f"invoice_regex_{suffix}"
+        yield f"# HELP {name} {doc}"
+        yield f"# TYPE {name} {kind}"
+        for pattern, row in sorted(stats.items()):
+            yield f"{name}{metrics._fmt_labels(('pattern',), (pattern,))} {metrics._fmt_value(row[i])}"
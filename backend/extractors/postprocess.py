@@ -1,5 +1,5 @@
 
-from .utils import parse_amount
+from .utils import parse_amount, fix_czech_chars
 
 def _round2(x):
     return None if x is None else round(float(x) + 1e-9, 2)
@@ -51,3 +51,21 @@ def autofill_amounts(data: dict) -> dict:
         data["_computed"] = computed
 
     return data
+
+def fix_text_fields(data: dict) -> dict:
+    """
+    OCR opravy (globální, dodavatelské podle IČO a naučené) v textových polích,
+    stejně pro šablonu, LLM i heuristiku.
+    """
+    if not isinstance(data, dict):
+        return data or {}
+    sup = data.get("dodavatel")
+    ico = sup.get("ico") if isinstance(sup, dict) else None
+    if isinstance(sup, dict):
+        for k in ("nazev", "adresa"):
+            if isinstance(sup.get(k), str):
+                sup[k] = fix_czech_chars(sup[k], ico)
+    for k in ("platba_zpusob", "banka_prijemce"):
+        if isinstance(data.get(k), str):
+            data[k] = fix_czech_chars(data[k], ico)
+    return data
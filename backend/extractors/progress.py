@@ -0,0 +1,74 @@
+"""
+Progress events of the extraction running in the current context, for the SSE
+stream (/api/extract/stream).
+
+The pipeline calls emit() at its milestones (page k/N, template matched, LLM
+started/finished); without a reporter in the context these are no-ops. emit()
+and checkpoint() are also the cancellation points: once the client is gone the
+reporter is cancelled and the next one raises Cancelled, which derives from
+BaseException so the pipeline's broad `except Exception` fallbacks do not
+swallow it.
+"""
+from __future__ import annotations
+
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class Cancelled(BaseException):
+    """The client of a streamed extraction disconnected."""
+
+
+class Reporter:
+    def __init__(self, sink: Callable[[dict], None]):
+        self.started = time.perf_counter()
+        self.sink = sink
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def emit(self, event: str, **data):
+        if self.cancelled:
+            raise Cancelled()
+        self.sink({"event": event, "elapsed_ms": self._elapsed_ms(), **data})
+
+    def stage(self, stage: str, seconds: float):
+        """Listener for metrics.timed: one "stage" event per finished pipeline stage."""
+        if not self.cancelled:
+            self.sink({"event": "stage", "elapsed_ms": self._elapsed_ms(), "stage": stage,
+                       "ms": round(seconds * 1000, 2)})
+
+
+_current: contextvars.ContextVar[Optional[Reporter]] = contextvars.ContextVar("invoice_progress", default=None)
+
+
+@contextmanager
+def track(reporter: Reporter):
+    token = _current.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _current.reset(token)
+
+
+def emit(event: str, **data):
+    reporter = _current.get()
+    if reporter is not None:
+        reporter.emit(event, **data)
+
+
+def checkpoint():
+    reporter = _current.get()
+    if reporter is not None and reporter.cancelled:
+        raise Cancelled()
@@ -0,0 +1,253 @@
+"""
+QR Platba (SPAYD, "SPD*1.0*...") and QR Faktura ("SID*1.0*...") payment codes.
+
+Decoding needs one of the optional decoders (pyzbar + zbar, or opencv-python);
+without them scan() returns None and the pipeline runs OCR as before. Parsing
+is pure Python. Values from a code with a valid (or absent) CRC32 are
+authoritative: merge() overrides what OCR/templates/LLM produced.
+"""
+from __future__ import annotations
+
+import io
+import os
+import re
+import math
+import zlib
+from datetime import date
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+
+from . import metrics
+from .ocr import is_image
+
+# Fields that have to be known for a document to need no further OCR
+REQUIRED_FIELDS = ("variabilni_symbol", "datum_vystaveni", "datum_splatnosti", "castka_s_dph",
+                   "mena", "ucet_prijemce", "dodavatel.ico")
+MAX_SIDE = 2000      # decoders get a downscaled copy of big photos
+PDF_DPI = 200
+
+_HEADER = re.compile(r"^(SPD|SID)\*(\d+\.\d+)\*")
+
+
+def enabled() -> bool:
+    return os.getenv("QR_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+# -------- parsing --------
+def _attributes(body: str) -> Dict[str, str]:
+    """KEY:value pairs, values still %-encoded as in the code."""
+    attrs = {}
+    for part in body.split("*"):
+        key, sep, value = part.partition(":")
+        if sep and key:
+            attrs[key.upper()] = value
+    return attrs
+
+
+def _crc_ok(kind: str, version: str, encoded: Dict[str, str]) -> Optional[bool]:
+    """CRC32 over the canonical form (attributes sorted by key, without CRC32); None if absent."""
+    crc = encoded.get("CRC32")
+    if not crc:
+        return None
+    canonical = "*".join([kind, version] + [f"{k}:{encoded[k]}" for k in sorted(encoded) if k != "CRC32"])
+    return f"{zlib.crc32(canonical.encode('utf-8')):08X}" == crc.upper()
+
+
+def _date(v: Optional[str]) -> Optional[str]:
+    if not v or not re.fullmatch(r"\d{8}", v):
+        return None
+    try:
+        return date(int(v[:4]), int(v[4:6]), int(v[6:])).isoformat()
+    except ValueError:
+        return None
+
+
+def _amount(v: Optional[str]) -> Optional[float]:
+    try:
+        x = float(v) if v else None
+    except ValueError:
+        return None
+    return round(x, 2) if x is not None and math.isfinite(x) else None
+
+
+def iban_to_account(iban: str) -> str:
+    """Czech IBAN → "prefix-number/bank" as printed on invoices; other IBANs unchanged."""
+    iban = re.sub(r"\s", "", iban or "").upper()
+    m = re.fullmatch(r"CZ\d{2}(\d{4})(\d{6})(\d{10})", iban)
+    if not m:
+        return iban
+    bank, prefix, number = m.group(1), m.group(2).lstrip("0"), m.group(3).lstrip("0") or "0"
+    return f"{prefix}-{number}/{bank}" if prefix else f"{number}/{bank}"
+
+
+def parse_spayd(payload: str) -> Optional[dict]:
+    """
+    Parse a QR Platba / QR Faktura string into extraction-schema fields.
+
+    Returns {"type", "version", "crc", "fields": {...}, "raw": {...}} or None when the
+    string is not a payment code. A QR Faktura embedded in QR Platba (X-INV) is merged in.
+    """
+    m = _HEADER.match((payload or "").strip())
+    if not m:
+        return None
+    kind, version = m.group(1), m.group(2)
+    encoded = _attributes(payload.strip()[m.end():])
+    crc = _crc_ok(kind, version, encoded)
+    raw = {k: unquote(v) for k, v in encoded.items()}
+    attrs = dict(raw)
+    inner = parse_spayd(attrs.get("X-INV", "")) if kind == "SPD" else None
+    if inner:
+        for k, v in inner["raw"].items():
+            attrs.setdefault(k, v)
+
+    acc = attrs.get("ACC", "").split("+")[0]
+    fields = {
+        "ucet_prijemce": iban_to_account(acc) if acc else None,
+        "castka_s_dph": _amount(attrs.get("AM")),
+        "mena": attrs.get("CC", "").upper() or None,
+        "variabilni_symbol": re.sub(r"\D", "", attrs.get("X-VS") or attrs.get("VS") or "") or None,
+        "datum_splatnosti": _date(attrs.get("DT")),
+        "datum_vystaveni": _date(attrs.get("DD")),
+        "duzp": _date(attrs.get("DUZP")),
+    }
+    if any(k in attrs for k in ("TB0", "TB1", "TB2", "NTB")):
+        base = sum(_amount(attrs.get(k)) or 0.0 for k in ("TB0", "TB1", "TB2", "NTB"))
+        vat = sum(_amount(attrs.get(k)) or 0.0 for k in ("T0", "T1", "T2"))
+        fields["castka_bez_dph"], fields["dph"] = round(base, 2), round(vat, 2)
+    ico = re.sub(r"\D", "", attrs.get("INI", ""))
+    dic = re.sub(r"\s", "", attrs.get("VII", "")).upper()
+    if ico or dic:
+        fields["dodavatel"] = {"ico": ico.zfill(8) if ico else None, "dic": dic or None}
+    fields = {k: v for k, v in fields.items() if v is not None}
+    return {"type": kind, "version": version, "crc": crc, "fields": fields, "raw": raw}
+
+
+def _get(data: dict, path: str):
+    for part in path.split("."):
+        data = data.get(part) if isinstance(data, dict) else None
+    return data
+
+
+def complete(data: dict, required=REQUIRED_FIELDS) -> bool:
+    return all(_get(data, f) not in (None, "") for f in required)
+
+
+def merge(data: dict, payment: dict) -> dict:
+    """
+    QR values override the extracted ones (only fill gaps when the CRC does not
+    match). The outcome is stored in data["_qr"].
+    """
+    if not payment:
+        return data
+    authoritative = payment.get("crc") is not False
+    changed = []
+    for key, value in payment["fields"].items():
+        if key == "dodavatel":
+            sup = data.get("dodavatel") if isinstance(data.get("dodavatel"), dict) else {}
+            for k, v in value.items():
+                if v and sup.get(k) != v and (authoritative or not sup.get(k)):
+                    sup[k] = v
+                    changed.append(f"dodavatel.{k}")
+            data["dodavatel"] = sup
+        elif data.get(key) != value and (authoritative or data.get(key) in (None, "")):
+            data[key] = value
+            changed.append(key)
+    data["_qr"] = {"type": payment["type"], "crc": payment.get("crc"), "fields": changed}
+    return data
+
+
+def to_result(payment: dict) -> dict:
+    """Extraction result built from the QR code alone (OCR skipped)."""
+    data = {k: None for k in ("variabilni_symbol", "datum_vystaveni", "datum_splatnosti", "duzp", "castka_bez_dph",
+                              "dph", "castka_s_dph", "mena", "platba_zpusob", "banka_prijemce", "ucet_prijemce")}
+    data["dodavatel"] = {"nazev": None, "ico": None, "dic": None, "adresa": None}
+    data["confidence"] = 0.95
+    return merge(data, payment)
+
+
+# -------- decoding --------
+_DECODER = None
+
+
+def _decoder():
+    """First available QR decoder as fn(PIL image) -> [str], or False."""
+    global _DECODER
+    if _DECODER is not None:
+        return _DECODER
+    try:
+        from pyzbar import pyzbar
+
+        def decode(img):
+            return [s.data.decode("utf-8", "replace") for s in pyzbar.decode(img.convert("L"))
+                    if s.type == "QRCODE"]
+        _DECODER = decode
+        return _DECODER
+    except Exception:  # ImportError, or the zbar shared library missing
+        pass
+    try:
+        import cv2
+        import numpy as np
+
+        def decode(img):
+            # Detector instances are not thread-safe; creating one is cheap
+            ok, texts, _, _ = cv2.QRCodeDetector().detectAndDecodeMulti(np.asarray(img.convert("L")))
+            return [t for t in texts if t] if ok else []
+        _DECODER = decode
+    except ImportError:
+        _DECODER = False
+    return _DECODER
+
+
+def available() -> bool:
+    return bool(_decoder())
+
+
+def _images(filename: str, data: bytes, pages: int):
+    from PIL import Image
+    name = (filename or "").lower()
+    if name.endswith(".pdf"):
+        import pdfplumber
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            for page in pdf.pages[:pages]:
+                yield page.to_image(resolution=PDF_DPI).original
+    elif is_image(name):
+        img = Image.open(io.BytesIO(data))
+        if max(img.size) > MAX_SIDE:
+            img = img.copy()
+            img.thumbnail((MAX_SIDE, MAX_SIDE))
+        yield img
+
+
+def decode(filename: str, data: bytes, pages: Optional[int] = None) -> List[str]:
+    """Raw strings of all QR codes on the image / first PDF pages (QR_PDF_PAGES, default 1)."""
+    dec = _decoder()
+    if not dec:
+        return []
+    pages = pages or int(os.getenv("QR_PDF_PAGES", "1"))
+    out = []
+    for img in _images(filename, data, pages):
+        out.extend(dec(img))
+    return out
+
+
+def scan(filename: str, data: bytes) -> Optional[dict]:
+    """Parsed payment code of the document, or None (no code, no decoder, disabled)."""
+    if not enabled() or not available():
+        return None
+    with metrics.timed("qr"):
+        try:
+            codes = decode(filename, data)
+        except Exception as e:
+            metrics.swallowed("qr", e)
+            return None
+    parsed = [p for p in map(parse_spayd, codes) if p]
+    # Prefer QR Faktura (more fields), then codes whose CRC checks out
+    parsed.sort(key=lambda p: (p["type"] != "SID", p["crc"] is False))
+    metrics.QR_CODES.inc(outcome="found" if parsed else ("other" if codes else "none"))
+    return parsed[0] if parsed else None
+
+
+def warm() -> str:
+    if not enabled():
+        return "disabled"
+    return "ok" if available() else "no decoder"
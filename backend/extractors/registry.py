@@ -0,0 +1,197 @@
+"""
+Offline company registry (IČO → název, DIČ, adresa) built from the ARES/RES bulk dump.
+
+File layout (little endian):
+    header   8s magic, I count, Q heap offset
+    index    count × (I ico, Q offset, I length), sorted by ico
+    heap     UTF-8 "name\\x1fdic\\x1faddress" entries
+
+The file is opened with mmap (read only), so every worker process shares the
+same page-cache pages instead of loading a copy, and opening costs only the
+header read. Lookups are a binary search over the fixed-width index.
+"""
+from __future__ import annotations
+
+import os
+import re
+import mmap
+import struct
+import bisect
+import difflib
+import threading
+import unicodedata
+from array import array
+from typing import Iterable, Optional, Tuple
+
+from . import metrics
+
+MAGIC = b"ICOREG1\0"
+_HEADER = struct.Struct("<8sIQ")
+_ENTRY = struct.Struct("<IQI")
+_SEP = "\x1f"
+
+
+class _Keys:
+    """Sequence view of the sorted IČO column for bisect."""
+    def __init__(self, mm, count):
+        self.mm, self.count = mm, count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return struct.unpack_from("<I", self.mm, _HEADER.size + i * _ENTRY.size)[0]
+
+
+class Registry:
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self._heap = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a registry index: {path}")
+        self._keys = _Keys(self._mm, self.count)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def lookup(self, ico) -> Optional[dict]:
+        ico = re.sub(r"\D", "", str(ico or ""))
+        if not ico or len(ico) > 8:
+            return None
+        key = int(ico)
+        i = bisect.bisect_left(self._keys, key)
+        if i >= self.count or self._keys[i] != key:
+            return None
+        _, off, length = _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+        start = self._heap + off
+        name, dic, address = bytes(self._mm[start:start + length]).decode("utf-8").split(_SEP)
+        return {"ico": f"{key:08d}", "nazev": name or None, "dic": dic or None, "adresa": address or None}
+
+
+def build(rows: Iterable[Tuple[str, str, str, str]], path: str) -> int:
+    """Write an index from (ico, name, dic, address) rows; returns the number of entries.
+
+    The heap is streamed to a temp file; only the (ico, offset, length) columns are
+    kept in memory for sorting. Duplicate IČOs keep the last row.
+    """
+    icos, offs, lens = array("I"), array("Q"), array("I")
+    heap_path = path + ".heap"
+    pos = 0
+    with open(heap_path, "wb") as heap:
+        for ico, name, dic, address in rows:
+            ico = re.sub(r"\D", "", str(ico or ""))
+            if not ico or len(ico) > 8:
+                continue
+            blob = _SEP.join(((name or "").strip(), (dic or "").strip(), (address or "").strip())).encode("utf-8")
+            heap.write(blob)
+            icos.append(int(ico)); offs.append(pos); lens.append(len(blob))
+            pos += len(blob)
+    order = sorted(range(len(icos)), key=lambda i: (icos[i], i))
+    uniq = [i for n, i in enumerate(order) if n + 1 == len(order) or icos[order[n + 1]] != icos[i]]
+    heap_start = _HEADER.size + len(uniq) * _ENTRY.size
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as out:
+        out.write(_HEADER.pack(MAGIC, len(uniq), heap_start))
+        for i in uniq:
+            out.write(_ENTRY.pack(icos[i], offs[i], lens[i]))
+        with open(heap_path, "rb") as heap:
+            while True:
+                block = heap.read(1 << 20)
+                if not block:
+                    break
+                out.write(block)
+    os.replace(tmp, path)
+    os.remove(heap_path)
+    return len(uniq)
+
+
+_REGISTRY: Optional[Registry] = None
+_LOADED_PATH: Optional[str] = None
+_LOCK = threading.Lock()
+
+
+def get_registry() -> Optional[Registry]:
+    """Registry at REGISTRY_PATH, opened once per process; None if not configured."""
+    global _REGISTRY, _LOADED_PATH
+    path = os.getenv("REGISTRY_PATH")
+    if _LOADED_PATH == path:
+        return _REGISTRY
+    with _LOCK:
+        if _LOADED_PATH != path:
+            reg = None
+            if path and os.path.exists(path):
+                try:
+                    reg = Registry(path)
+                except (OSError, ValueError) as e:
+                    metrics.swallowed("registry_open", e)
+            _REGISTRY, _LOADED_PATH = reg, path
+    return _REGISTRY
+
+
+def _norm(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", s).strip()
+
+
+def name_similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, _norm(a), _norm(b)).ratio()
+
+
+def apply_to_supplier(data: dict, text: str = "", registry: Optional[Registry] = None) -> dict:
+    """
+    Confirm or correct the supplier block against the registry.
+
+    - IČO found and the extracted name is close (OCR garbling) or missing → name,
+      DIČ and address are filled/overridden from the registry ("confirmed"/"corrected").
+    - IČO found but the name is unrelated and the registry name is not in the text →
+      nothing is changed, the mismatch is reported (likely a misread IČO).
+    The outcome is stored in data["_registry"].
+    """
+    reg = registry if registry is not None else get_registry()
+    sup = data.get("dodavatel") if isinstance(data, dict) else None
+    if reg is None or not isinstance(sup, dict):
+        return data
+    with metrics.timed("registry"):
+        ico = sup.get("ico")
+        if not ico and sup.get("dic"):
+            m = re.fullmatch(r"CZ(\d{8})", re.sub(r"\s", "", str(sup["dic"])).upper())
+            ico = m.group(1) if m else None
+        entry = reg.lookup(ico) if ico else None
+        if entry is None:
+            data["_registry"] = {"status": "not_found" if ico else "no_ico"}
+            return data
+        name = sup.get("nazev") or ""
+        sim = name_similarity(name, entry["nazev"] or "") if name else 0.0
+        in_text = bool(text) and _norm(entry["nazev"] or "") in _norm(text)
+        if name and sim < 0.6 and not in_text:
+            data["_registry"] = {"status": "mismatch", "nazev": entry["nazev"], "similarity": round(sim, 2)}
+            return data
+        changed = []
+        for key in ("ico", "nazev", "dic", "adresa"):
+            if entry.get(key) and sup.get(key) != entry[key]:
+                if key == "adresa" and sup.get(key) and name_similarity(sup[key], entry[key]) >= 0.9:
+                    continue  # formatting differences only
+                sup[key] = entry[key]
+                changed.append(key)
+        data["_registry"] = {"status": "corrected" if changed else "confirmed"}
+        if changed:
+            data["_registry"]["fields"] = changed
+    return data
+
+
+def warm() -> str:
+    reg = get_registry()
+    if reg is None:
+        return "not configured" if not os.getenv("REGISTRY_PATH") else "unavailable"
+    reg.lookup("00000000")
+    return f"ok ({len(reg)} entries)"
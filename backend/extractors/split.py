@@ -0,0 +1,102 @@
+"""
+Boundary detection for PDFs that bundle several invoices (utility bills, collective
+invoicing): decides per page whether it starts a new invoice, using only the page
+texts that were extracted anyway.
+
+Signals, strongest first:
+- page-count marker ("Strana 1 z 3", "Str. 2/3", "Page 1 of 2"): page 1 starts an
+  invoice, any other page continues one;
+- invoice number differing from the one of the current segment, or, when either
+  page lacks an invoice number, the VS differing (an invoice number is never
+  compared with a VS);
+- a "Faktura" / "Daňový doklad" header at the top of a page without an identifier,
+  once the current segment already has its amount due.
+Pages without any signal (terms and conditions, blank pages) stay with the
+previous invoice.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from . import patterns
+
+HEADER_LINES = 8  # a header must appear in the first lines of the page
+
+_MARKER = patterns.compile(r"\b(?:strana|str\.|page|list)\s*(\d{1,3})\s*(?:z|/|of|ze)\s*(\d{1,3})\b",
+                           re.I, name="split:page_marker")
+_INVOICE_NO = patterns.compile(
+    r"(?:č[ií]slo\s+(?:faktury|dokladu)|faktura\s*(?:č\.|č[ií]slo)|invoice\s+(?:no\.?|number))"
+    r"\s*[:#.]?\s*([A-Z0-9][A-Z0-9/\-]{2,19})\b", re.I, name="split:invoice_no")
+_VS = patterns.compile(r"(?:\bvariab\w*\s+symbol|\bVS\b)\s*[:.]?\s*(\d{2,10})\b", re.I, name="split:vs")
+_HEADER = patterns.compile(r"\b(?:faktura|daňový\s+doklad|danovy\s+doklad|invoice)\b", re.I, name="split:header")
+_TOTAL = patterns.compile(r"(?:celkem\s+k\s+úhradě|k\s+úhradě|celkem\s+k\s+uhrade|k\s+zaplacení|total\s+due|amount\s+due)",
+                          re.I, name="split:total")
+
+
+@dataclass
+class PageSignals:
+    invoice_no: Optional[str] = None
+    vs: Optional[str] = None
+    header: bool = False
+    page_no: Optional[int] = None
+    page_total: Optional[int] = None
+    total: bool = False               # amount-due line present
+    blank: bool = False
+
+
+def page_signals(text: str) -> PageSignals:
+    text = text or ""
+    if not text.strip():
+        return PageSignals(blank=True)
+    s = PageSignals()
+    m = _MARKER.search(text)
+    if m and 0 < int(m.group(1)) <= int(m.group(2)):
+        s.page_no, s.page_total = int(m.group(1)), int(m.group(2))
+    m = _INVOICE_NO.search(text)
+    if m:
+        s.invoice_no = m.group(1).upper()
+    m = _VS.search(text)
+    if m:
+        s.vs = m.group(1)
+    top = "\n".join(ln for ln in text.splitlines() if ln.strip())
+    top = "\n".join(top.splitlines()[:HEADER_LINES])
+    s.header = _HEADER.search(top) is not None
+    s.total = _TOTAL.search(text) is not None
+    return s
+
+
+def boundaries(pages: List[str]) -> List[int]:
+    """Indexes of the pages that start an invoice (always includes 0 for a non-empty list)."""
+    if not pages:
+        return []
+    starts = [0]
+    first = page_signals(pages[0])
+    seg_no, seg_vs, seg_total = first.invoice_no, first.vs, first.total
+    for i in range(1, len(pages)):
+        s = page_signals(pages[i])
+        if s.blank:
+            continue
+        if s.page_no is not None:
+            new = s.page_no == 1
+        elif s.invoice_no is not None and seg_no is not None:
+            new = s.invoice_no != seg_no
+        elif s.vs is not None and seg_vs is not None:
+            new = s.vs != seg_vs
+        else:
+            new = s.header and seg_total
+        if new:
+            starts.append(i)
+            seg_no, seg_vs, seg_total = s.invoice_no, s.vs, s.total
+        else:
+            seg_no = seg_no or s.invoice_no
+            seg_vs = seg_vs or s.vs
+            seg_total = seg_total or s.total
+    return starts
+
+
+def segments(pages: List[str]) -> List[Tuple[int, int]]:
+    """(first page, end page exclusive) of every invoice in the document."""
+    starts = boundaries(pages)
+    return list(zip(starts, starts[1:] + [len(pages)]))
@@ -1,8 +1,11 @@
 
-import re, os, json, glob
-from dataclasses import dataclass
+import re, os, json, glob, logging
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 from .utils import normalize_date, parse_amount, detect_currency
+from . import metrics, patterns
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class Template:
@@ -11,6 +14,20 @@ class Template:
     optional_keywords: List[str]
     fields: Dict[str, str]
     supplier_defaults: Dict[str, Optional[str]]
+    compiled: Dict[str, patterns.SafePattern] = field(default_factory=dict)
+    keywords: Dict[str, patterns.SafePattern] = field(default_factory=dict)
+    rejected: Dict[str, str] = field(default_factory=dict)
+
+def _compile_fields(tpl: Template):
+    for k, rx in tpl.fields.items():
+        try:
+            tpl.compiled[k] = patterns.compile(rx, re.I | re.M | re.S, name=f"{tpl.name}:{k}")
+        except (patterns.error, patterns.UnsafePattern) as e:
+            # Invalid or backtracking-prone field: the template works without it
+            tpl.rejected[k] = str(e)
+            logger.warning("Template %s: field %s rejected (%s)", tpl.name, k, e)
+    for kw in tpl.required_keywords + tpl.optional_keywords:
+        tpl.keywords[kw] = patterns.compile(re.escape(kw), re.I, name=f"{tpl.name}:keyword")
 
 def _load_templates(dirpath: str):
     tpls = []
@@ -24,6 +41,7 @@ def _load_templates(dirpath: str):
             fields=data.get("fields", {}),
             supplier_defaults=data.get("supplier_defaults", {"nazev": None, "ico": None, "dic": None, "adresa": None})
         ))
+        _compile_fields(tpls[-1])
     return tpls
 
 _TEMPLATES = None
@@ -31,21 +49,30 @@ _TEMPLATES = None
 def _ensure_loaded():
     import os
     global _TEMPLATES
-    if _TEMPLATES is not None: return
+    if _TEMPLATES is not None:
+        metrics.CACHE_HITS.inc(cache="templates")
+        return
+    metrics.CACHE_MISSES.inc(cache="templates")
     dirpath = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "templates"))
     _TEMPLATES = _load_templates(dirpath)
 
+def warm() -> str:
+    """Load templates and compile their patterns before the first request."""
+    _ensure_loaded()
+    return f"ok ({len(_TEMPLATES or [])} templates)"
+
 def _score(tpl: Template, text: str) -> int:
     score = 0
     for kw in tpl.required_keywords:
-        if re.search(re.escape(kw), text, re.I): score += 3
+        if tpl.keywords[kw].search(text): score += 3
         else: return -999
     for kw in tpl.optional_keywords:
-        if re.search(re.escape(kw), text, re.I): score += 1
+        if tpl.keywords[kw].search(text): score += 1
     return score
 
-def _cap(pattern: str, text: str):
-    m = re.search(pattern, text, re.I | re.M | re.S)
+def _cap(pattern: Optional[patterns.SafePattern], text: str):
+    if pattern is None: return None
+    m = pattern.search(text)
     if not m: return None
     return (m.group(1) if m.groups() else m.group(0)).strip()
 
@@ -53,12 +80,14 @@ def extract_fields_template(text: str) -> Optional[dict]:
     _ensure_loaded()
     if not _TEMPLATES: return None
     best, best_sc = None, -1000
-    for t in _TEMPLATES:
-        sc = _score(t, text)
-        if sc > best_sc: best, best_sc = t, sc
+    with metrics.timed("template_score"):
+        for t in _TEMPLATES:
+            sc = _score(t, text)
+            if sc > best_sc: best, best_sc = t, sc
     if not best or best_sc < 0: return None
 
-    vals = {k: _cap(rx, text) for k, rx in best.fields.items()}
+    with metrics.timed("template_fields"):
+        vals = {k: _cap(best.compiled.get(k), text) for k in best.fields}
     for k in ["datum_vystaveni","datum_splatnosti","duzp"]:
         vals[k] = normalize_date(vals.get(k))
     for k in ["castka_bez_dph","dph","castka_s_dph"]:
@@ -1,15 +1,40 @@
 
 import re
 from datetime import datetime
-from dateutil import parser as dateparser
+from functools import lru_cache
+from . import patterns
 
 def first(seq):
     return seq[0] if seq else None
 
+# Fast paths for the common Czech/EN formats; everything they don't recognise goes
+# through the original (slow) parsers, so results are unchanged. Both are memoized.
+_CACHE_SIZE = 8192
+_DMY = re.compile(r"^([0-9]{1,2})([./-] ?)([0-9]{1,2})\2([0-9]{4})$")
+
 def normalize_date(s):
+    if not s:
+        return None
+    return _normalize_date_str(str(s).strip())
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _normalize_date_str(s: str):
+    m = _DMY.match(s)
+    if m:
+        d, mth, y = int(m.group(1)), int(m.group(3)), int(m.group(4))
+        # dateutil swaps day/month when month > 12; leave those (and invalid dates) to it
+        if 1 <= mth <= 12 and 1900 <= y <= 2199:
+            try:
+                return datetime(y, mth, d).strftime("%Y-%m-%d")
+            except ValueError:
+                pass
+    return _normalize_date_slow(s)
+
+def _normalize_date_slow(s):
     if not s:
         return None
     s = str(s).strip()
+    from dateutil import parser as dateparser
     try:
         dt = dateparser.parse(s, dayfirst=True, yearfirst=False)
         return dt.strftime("%Y-%m-%d")
@@ -26,7 +51,40 @@ def normalize_date(s):
             return None
     return None
 
+_CURRENCY_TOKEN = r"(?:Kč|CZK|EUR|€|USD|\$|GBP|£|PLN|zł|HUF|Ft|CHF|SEK|NOK|DKK|JPY|¥|CNY|AUD|CAD)"
+_FAST_AMOUNT = re.compile(
+    rf"^[ \u00A0]*(?:{_CURRENCY_TOKEN}[ \u00A0]*)?"
+    r"(-?)(?:([0-9]{1,3}(?:[ \u00A0][0-9]{3})+|[0-9]+)(?:[.,]([0-9]{1,2}))?"   # 1 234,50 / 1234.5 / 1234
+    r"|([0-9]{1,3}(?:,[0-9]{3})+)\.([0-9]{1,2}))"                              # 1,234.50
+    rf"[ \u00A0]*(?:{_CURRENCY_TOKEN}[ \u00A0]*)?$", re.I)
+
 def parse_amount(s):
+    if s is None:
+        return None
+    t = type(s)
+    if t is int:
+        return float(s)
+    if t is float:
+        if abs(s) < 1e13 and round(s, 2) == s:
+            return s
+        return _parse_amount_slow(s)
+    if t is str:
+        return _parse_amount_str(s)
+    return _parse_amount_slow(s)
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _parse_amount_str(s: str):
+    m = _FAST_AMOUNT.match(s)
+    if m:
+        sign, whole, dec, en_whole, en_dec = m.groups()
+        if whole is not None:
+            whole = whole.replace(" ", "").replace("\u00A0", "")
+        else:
+            whole, dec = en_whole.replace(",", ""), en_dec
+        return float(f"{sign}{whole}.{dec}" if dec else f"{sign}{whole}")
+    return _parse_amount_slow(s)
+
+def _parse_amount_slow(s):
     if s is None:
         return None
     s = str(s)
@@ -105,7 +163,7 @@ def detect_currency(text: str):
     votes = {}
     for code, pats in _CURRENCY_MAP:
         for p in pats:
-            if re.search(p, text, re.I):
+            if patterns.search(p, text, re.I, name="currency:" + code):
                 votes[code] = votes.get(code, 0) + 1
     if not votes:
         return None
@@ -113,11 +171,11 @@ def detect_currency(text: str):
 
 def pick_nearby(text, keywords, value_regex, window=200):
     for kw in keywords:
-        for m in re.finditer(kw, text, re.I):
+        for m in patterns.finditer(kw, text, re.I, name="nearby:" + kw):
             start = max(0, m.start()-window//2)
             end = min(len(text), m.end()+window//2)
             sub = text[start:end]
-            vm = re.search(value_regex, sub, re.I)
+            vm = patterns.search(value_regex, sub, re.I)
             if vm:
                 return vm.group(0)
     return None
@@ -152,119 +210,35 @@ def validate_ico(ico: str) -> bool:
     except (ValueError, IndexError):
         return False
 
-def fix_czech_chars(text: str) -> str:
+def fix_czech_chars(text: str, supplier_ico: str = None) -> str:
     """
-    Opravuje běžné chyby v českých znacích a diakritice
+    Opravuje běžné chyby v českých znacích a diakritice.
+
+    Opravy jsou data (backend/corrections/*.json, dodavatelské v suppliers/,
+    naučené z uživatelských oprav) a aplikují se jedním průchodem textu,
+    viz extractors/corrections.py.
     """
     if not text:
         return text
-    
-    # Slovník běžných chyb a jejich oprav
-    czech_fixes = {
-        # Běžné chyby v diakritice
-        "Komeréni": "Komerční",
-        "Komeréni banka": "Komerční banka",
-        "Komeréni banka, a.s.": "Komerční banka, a.s.",
-        
-        # Města a místa
-        "Pizen": "Plzeň",
-        "Pizen,": "Plzeň,",
-        "Pizen.": "Plzeň.",
-        
-        # Běžné chyby v názvech
-        "Novak": "Novák",
-        "Novak,": "Novák,",
-        "Novak.": "Novák.",
-        
-        # Opravy pro adresy - běžné chyby OCR
-        "Hopsinkove": "Hopisníkova",
-        "Hopisnkove": "Hopisníkova",
-        "Hopisnkova": "Hopisníkova",
-        "Hopsinkova": "Hopisníkova",
-        
-        # Běžné chyby v jménech
-        "Borivoj": "Bořivoj",
-        "Hejsek": "Hejsek",  # Toto je správně
-        "Firmas.r.o..": "Firma s.r.o.",
-        
-        # Opravy názvů firem - odstraň nadbytečné tečky
-        "s.r.o..": "s.r.o.",
-        "a.s..": "a.s.",
-        "spol. s r.o..": "spol. s r.o.",
-        
-        # Opravy pro konkrétní firmy
-        "CreativeSpark Design": "CreativeSpark Design s.r.o.",
-        "CreativeSpark Design s.r.o..": "CreativeSpark Design s.r.o.",
-        
-        # Opravy adres
-        "Praha,": "Praha 1,",
-        "110 00 Praha,": "110 00 Praha 1,",
-        
-        # Běžné chyby v bankovních názvech
-        "Ceska sporitelna": "Česká spořitelna",
-        "Ceska sporitelna, a.s.": "Česká spořitelna, a.s.",
-        "Ceska narodni banka": "Česká národní banka",
-        "Ceska narodni banka, a.s.": "Česká národní banka, a.s.",
-        
-        # Běžné chyby v platebních metodách
-        "prevodem": "převodem",
-        "Prevodem": "Převodem", 
-        "PREVODEM": "PŘEVODEM",
-        "Cekova": "peněžní převod",
-        "bankovní převod": "peněžní převod",  # Standardizace na "peněžní převod"
-        "bankovnim prevodem": "peněžní převod",
-        "Bankovní převod": "peněžní převod",
-        
-        # Běžné chyby v názvech firem
-        "Ooberate": "s.r.o.",
-        "Oaberatel": "s.r.o.",
-        "S.r.0.": "s.r.o.",
-        "S.r.o": "s.r.o.",
-        "s.r.0.": "s.r.o.",
-        "s.r.o": "s.r.o.",
-        
-        # Běžné chyby v měnách
-        "Kc": "Kč",
-        "kc": "kč",
-        "KC": "KČ",
-    }
-    
-    result = text
-    
-    # Aplikuj opravy
-    for wrong, correct in czech_fixes.items():
-        result = result.replace(wrong, correct)
-    
-    # Opravy pomocí regex pro složitější případy
-    result = re.sub(r'\bKomeréni\b', 'Komerční', result)
-    result = re.sub(r'\bPizen\b', 'Plzeň', result)
-    result = re.sub(r'\bNovak\b', 'Novák', result)
-    result = re.sub(r'\bCekova\b', 'peněžní převod', result)
-    result = re.sub(r'\bOoberate\b', 's.r.o.', result)
-    result = re.sub(r'\bOaberatel\b', 's.r.o.', result)
-    result = re.sub(r'\bS\.r\.0\.\b', 's.r.o.', result)
-    
-    # Oprava nadbytečných teček v názvech firem - více agresivní
-    result = re.sub(r's\.r\.o\.\.', 's.r.o.', result)  # Bez word boundary
-    result = re.sub(r'a\.s\.\.', 'a.s.', result)  # Bez word boundary
-    result = re.sub(r'spol\.\s*s\s*r\.o\.\.', 'spol. s r.o.', result)
-    result = re.sub(r'\.\.', '.', result)  # Obecně odstraň dvojité tečky
-    
+
+    from .corrections import apply as apply_corrections
+    result = apply_corrections(text, supplier_ico)
+
     # Detekce chybějících firemních přípon - pokud název obsahuje "Design", "Creative", "Tech" apod.
     # a nemá příponu, pravděpodobně je to firma
     business_keywords = ['Design', 'Creative', 'Tech', 'Solutions', 'Services', 'Group', 'Company', 'Corp']
     has_business_keyword = any(keyword.lower() in result.lower() for keyword in business_keywords)
     has_business_suffix = any(suffix in result for suffix in ['s.r.o.', 'a.s.', 'spol.', 'Ltd.', 'Inc.', 'GmbH'])
-    
+
     if has_business_keyword and not has_business_suffix and len(result.split()) >= 2:
         # Pravděpodobně chybí s.r.o.
         result += ' s.r.o.'
-    
+
     # Dodatečná oprava pro smíchané názvy - pokud obsahuje více s.r.o., vezmi první
     if result.count('s.r.o.') > 1:
         parts = result.split('s.r.o.')
         result = parts[0] + 's.r.o.' + ' '.join(parts[1:]).strip()  # Spoj zbylé, ale priorizuj první
-    
+
     return result
 
 def fix_variabilni_symbol(vs: str, text: str = "") -> str:
@@ -0,0 +1,158 @@
+import os, sys, json, time, glob, hmac, hashlib, threading, tempfile, re
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Opt-in profiling of single /api/extract calls.
+# Enable with PROFILING_ENABLED=1; if PROFILING_TOKEN is set, the X-Profile header must carry it.
+
+_NAME_RE = re.compile(r"^[0-9T_\-a-f]+$")
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+
+
+def profile_dir() -> str:
+    return os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "invoice_profiles")
+
+
+def profile_max() -> int:
+    try:
+        return max(1, int(os.getenv("PROFILE_MAX", "50")))
+    except ValueError:
+        return 50
+
+
+def is_requested(header: Optional[str], query: bool) -> bool:
+    """True if the caller asked for a profile and configuration allows it."""
+    if not profiling_enabled():
+        return False
+    if os.getenv("PROFILING_TOKEN"):
+        return has_token(header)
+    return bool(query) or (header or "").lower() in ("1", "true", "yes")
+
+
+def has_token(header: Optional[str]) -> bool:
+    """True if PROFILING_TOKEN is set and the header carries it."""
+    token = os.getenv("PROFILING_TOKEN")
+    return bool(token) and hmac.compare_digest((header or "").encode(), token.encode())
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread every `interval` seconds and aggregates
+    the samples into collapsed stacks ("root;child;leaf count") that can be fed
+    directly to flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.name = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        co = frame.f_code
+        return f"{os.path.basename(co.co_filename)}:{co.co_name}:{co.co_firstlineno}"
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        parts = []
+        while frame is not None:
+            parts.append(self._frame_label(frame))
+            frame = frame.f_back
+        key = ";".join(reversed(parts))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="invoice-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.stacks.items()))
+
+
+def _prune(dirpath: str, keep: int):
+    files = sorted(glob.glob(os.path.join(dirpath, "*.collapsed")))
+    for path in files[:-keep] if len(files) > keep else []:
+        for p in (path, path[:-len(".collapsed")] + ".json"):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+
+def save_profile(prof: SamplingProfiler, data: bytes, filename: str, duration: float) -> str:
+    dirpath = profile_dir()
+    os.makedirs(dirpath, exist_ok=True)
+    doc_hash = hashlib.sha256(data or b"").hexdigest()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"_{int((time.time() % 1) * 1e6):06d}"
+    name = f"{stamp}_{doc_hash[:16]}"
+    with open(os.path.join(dirpath, name + ".collapsed"), "w", encoding="utf-8") as f:
+        f.write(prof.collapsed())
+    meta = {
+        "name": name,
+        "sha256": doc_hash,
+        "filename": filename,
+        "duration_ms": round(duration * 1000, 2),
+        "samples": prof.samples,
+        "interval_ms": prof.interval * 1000,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(os.path.join(dirpath, name + ".json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    _prune(dirpath, profile_max())
+    return name
+
+
+@contextmanager
+def profile(data: bytes, filename: str):
+    try:
+        interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+    except ValueError:
+        interval = 0.005
+    prof = SamplingProfiler(interval=interval)
+    start = time.perf_counter()
+    prof.start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        prof.name = save_profile(prof, data, filename, time.perf_counter() - start)
+
+
+def list_profiles() -> List[dict]:
+    out = []
+    for path in sorted(glob.glob(os.path.join(profile_dir(), "*.json")), reverse=True):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                out.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def read_profile(name: str) -> Optional[str]:
+    if not _NAME_RE.match(name or ""):
+        return None
+    path = os.path.join(profile_dir(), name + ".collapsed")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
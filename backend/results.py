@@ -0,0 +1,48 @@
+import os, re, json, tempfile, threading
+from typing import Iterator, Optional
+
+# Append-only JSONL store of extraction results grouped by batch id.
+# /api/extract?batch=<id> appends, bulk exports stream a batch back from disk.
+
+_BATCH_RE = re.compile(r"^[A-Za-z0-9_.\-]{1,64}$")
+_LOCK = threading.Lock()
+
+
+def results_dir() -> str:
+    return os.getenv("RESULTS_DIR") or os.path.join(tempfile.gettempdir(), "invoice_results")
+
+
+def valid_batch_id(batch_id: Optional[str]) -> bool:
+    return bool(batch_id) and bool(_BATCH_RE.match(batch_id)) and batch_id not in (".", "..")
+
+
+def _path(batch_id: str) -> str:
+    if not valid_batch_id(batch_id):
+        raise ValueError(f"Invalid batch id: {batch_id!r}")
+    return os.path.join(results_dir(), f"{batch_id}.jsonl")
+
+
+def append(batch_id: str, record: dict):
+    path = _path(batch_id)
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _LOCK:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def exists(batch_id: str) -> bool:
+    return valid_batch_id(batch_id) and os.path.exists(_path(batch_id))
+
+
+def iter_records(batch_id: str) -> Iterator[dict]:
+    """Yield the records of a batch one at a time (constant memory)."""
+    with open(_path(batch_id), "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
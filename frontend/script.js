@@ -105,6 +105,60 @@ function rowWithCopy(label, value, computed) {
   return tr;
 }
 
+// Text v loading overlay podle průběhu (SSE z /api/extract/stream)
+function progressText(event, d) {
+  const s = d.elapsed_ms != null ? ` (${(d.elapsed_ms / 1000).toFixed(1)} s)` : '';
+  switch (event) {
+    case 'upload': return `Soubor přijat${s}`;
+    case 'page': return `${d.source === 'ocr' ? 'OCR' : 'Text'} stránky ${d.page}/${d.pages}${s}`;
+    case 'template': return d.matched ? `Nalezena šablona ${d.template || ''}${s}` : `Šablona nenalezena${s}`;
+    case 'llm': return d.status === 'started' ? `Vytěžování pomocí LLM…${s}` : `LLM dokončeno${s}`;
+    default: return null;
+  }
+}
+
+// POST na /api/extract/stream; průběh se zobrazuje v overlay, vrací finální výsledek
+async function extractStream(fd, method) {
+  const res = await fetch(`/api/extract/stream?method=${encodeURIComponent(method)}`, {
+    method: 'POST',
+    body: fd
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`HTTP error! status: ${res.status}`);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  const loadingText = document.querySelector('#loadingOverlay .loading-text');
+  let buf = '';
+  let result = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buf.indexOf('\n\n')) >= 0) {
+      const chunk = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      let event = 'message', data = '';
+      chunk.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      const d = data ? JSON.parse(data) : {};
+      if (event === 'result') {
+        result = d;
+      } else if (loadingText) {
+        const text = progressText(event, d);
+        if (text) loadingText.textContent = text;
+      }
+    }
+  }
+  if (!result) {
+    throw new Error('Stream skončil bez výsledku');
+  }
+  return result;
+}
+
 async function extract() {
   const file = document.getElementById('file').files[0];
   const method = document.getElementById('method').value;
@@ -126,14 +180,7 @@ async function extract() {
   fd.append('file', file);
 
   try {
-    const res = await fetch(`/api/extract?method=${encodeURIComponent(method)}`, {
-      method: 'POST',
-      body: fd
-    });
-    if (!res.ok) { 
-      throw new Error(`HTTP error! status: ${res.status}`);
-    }
-    const data = await res.json();
+    const data = await extractStream(fd, method);
     lastData = data;
     const resultEl = document.getElementById('result');
     if (resultEl) resultEl.classList.remove('hidden');
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark dávkové validace a dopočtu částek (NumPy) proti skalárním funkcím.
+
+Vygeneruje N záznamů ve sloupcové podobě, změří vektorové varianty nad všemi
+a skalární validate_extraction + autofill_amounts nad vzorkem (výsledek se
+extrapoluje, --scalar-sample 0 = všechny). Ověří i shodu výsledků na vzorku.
+
+    python scripts/bench_batch.py --records 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import numpy as np  # noqa: E402
+
+from extractors import batch  # noqa: E402
+from extractors.validate import validate_extraction  # noqa: E402
+from extractors.postprocess import autofill_amounts  # noqa: E402
+
+
+def _ico(rng):
+    base = [rng.randrange(10) for _ in range(7)]
+    s = sum(d * (8 - i) for i, d in enumerate(base)) % 11
+    return "".join(map(str, base)) + str({0: 1, 1: 0, 10: 1}.get(s, 11 - s))
+
+
+def make_columns(n, seed):
+    """Archive-like columns: amounts as float arrays (NaN = missing), identifiers as strings."""
+    rng = np.random.default_rng(seed)
+    prng = random.Random(seed)
+    base = np.round(rng.uniform(10, 200000, n), 2)
+    vat = np.round(base * rng.choice([0.21, 0.12, 0.0], n), 2)
+    total = np.round(base + vat, 2)
+    for col in (base, vat, total):
+        col[rng.random(n) < 0.15] = np.nan
+    return {
+        "variabilni_symbol": [str(v) for v in rng.integers(10 ** 5, 10 ** 10, n)],
+        "ico": [_ico(prng) for _ in range(n)],
+        "dic": ["CZ" + prng.choice(["27082440", "45274649", "6019333"]) for _ in range(n)],
+        "castka_bez_dph": base, "dph": vat, "castka_s_dph": total,
+    }
+
+
+def to_records(cols, idx):
+    def val(k, i):
+        v = cols[k][i]
+        return None if isinstance(v, float) and v != v else (float(v) if isinstance(v, np.floating) else v)
+    return [{"variabilni_symbol": cols["variabilni_symbol"][i], "castka_bez_dph": val("castka_bez_dph", i),
+             "dph": val("dph", i), "castka_s_dph": val("castka_s_dph", i),
+             "dodavatel": {"ico": cols["ico"][i], "dic": cols["dic"][i]}} for i in idx]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Vectorized vs scalar validation/autofill benchmark.")
+    ap.add_argument("--records", type=int, default=1_000_000)
+    ap.add_argument("--scalar-sample", type=int, default=100_000, help="0 = run the scalar path on all records")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    t = time.perf_counter()
+    cols = make_columns(args.records, args.seed)
+    print(f"generated {args.records} records in {time.perf_counter() - t:.1f}s")
+
+    t = time.perf_counter()
+    filled = batch.autofill_columns(cols)
+    t_fill = time.perf_counter() - t
+    cols_v = dict(cols, **{k: filled[k] for k in batch.AMOUNT_FIELDS})
+    t = time.perf_counter()
+    valid = batch.validate_columns(cols_v)
+    t_valid = time.perf_counter() - t
+    vec = t_fill + t_valid
+
+    n_s = args.scalar_sample or args.records
+    idx = random.Random(args.seed).sample(range(args.records), min(n_s, args.records))
+    recs = to_records(cols, idx)
+    t = time.perf_counter()
+    scalar_valid = [validate_extraction(autofill_amounts(r)) for r in recs]
+    scalar = (time.perf_counter() - t) * args.records / len(recs)
+
+    mismatches = 0
+    for r, sv, i in zip(recs, scalar_valid, idx):
+        vv = {"variabilni_symbol": bool(valid["variabilni_symbol"][i]), "ico": bool(valid["ico"][i]),
+              "dic": bool(valid["dic"][i]),
+              "sum_check": bool(valid["sum_check"][i]) if valid["sum_known"][i] else None}
+        for k in batch.AMOUNT_FIELDS:
+            v = filled[k][i]
+            if (r.get(k) is None) != bool(np.isnan(v)) or (r.get(k) is not None and r[k] != v):
+                mismatches += 1
+        mismatches += vv != sv
+
+    print(f"vectorized: autofill {t_fill:.2f}s + validate {t_valid:.2f}s = {vec:.2f}s "
+          f"({args.records / vec / 1e6:.2f} M records/s)")
+    print(f"scalar:     {scalar:.1f}s{' (extrapolated from %d)' % len(recs) if len(recs) < args.records else ''}")
+    print(f"speedup:    {scalar / vec:.1f}x   mismatches on sample: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark rychlých parserů částek a dat (utils.parse_amount / normalize_date)
+proti původní implementaci (_parse_amount_slow / _normalize_date_slow).
+
+Měří unikátní vstupy (studená cache), opakované vstupy (teplá cache)
+a heuristickou extrakci celého dokladu s původními parsery a s novými.
+
+    python scripts/bench_parsers.py --n 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from extractors import utils, heuristics  # noqa: E402
+
+
+def amounts(rng, n):
+    out = []
+    for _ in range(n):
+        v = rng.uniform(0, 10 ** rng.randrange(1, 7))
+        whole = f"{int(v):,}".replace(",", rng.choice([" ", " ", ""]))
+        s = rng.choice([f"{whole},{int(v * 100) % 100:02d}", f"{int(v)}.{int(v * 100) % 100:02d}", whole,
+                        f"{int(v):,}.{int(v * 100) % 100:02d}"])
+        out.append(s + rng.choice(["", " Kč", " CZK", " EUR", ""]))
+    return out
+
+
+def dates(rng, n):
+    out = []
+    for _ in range(n):
+        sep = rng.choice([".", ". ", "/"])
+        out.append(f"{rng.randrange(1, 29):0{rng.choice([1, 2])}d}{sep}{rng.randrange(1, 13):02d}{sep}{rng.randrange(2015, 2030)}")
+    return out
+
+
+DOCUMENT = """Faktura - daňový doklad č. 2025001234
+Dodavatel: Příklad s.r.o., Hlavní 12, 110 00 Praha 1, IČO: 27082440, DIČ: CZ27082440
+Odběratel: Zákazník a.s., Dlouhá 5, 602 00 Brno, IČO: 45274649
+Variabilní symbol: 2025001234
+Datum vystavení: 12.06.2025  Datum splatnosti: 26.06.2025  DUZP: 12.06.2025
+Položka                      Množství   Cena/ks      Celkem
+Konzultace                   12         1 500,00     18 000,00
+Licence                      3          4 990,00     14 970,00
+Doprava                      1          250,00       250,00
+Základ daně: 33 220,00 Kč   DPH 21 %: 6 976,20 Kč
+Celkem k úhradě: 40 196,20 Kč
+Způsob úhrady: převodem  Banka: Komerční banka  Číslo účtu: 123456789/0100
+"""
+
+
+def timed(fn, items):
+    t = time.perf_counter()
+    for s in items:
+        fn(s)
+    return (time.perf_counter() - t) / len(items) * 1e6
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fast vs original amount/date parsers.")
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    am = amounts(rng, args.n)
+    dt = dates(rng, args.n)
+    print(f"{'':24}{'original us':>12}{'cold us':>10}{'warm us':>10}{'speedup':>9}")
+    for name, slow, fast, clear, items in (
+            ("parse_amount", utils._parse_amount_slow, utils.parse_amount, utils._parse_amount_str.cache_clear, am),
+            ("normalize_date", utils._normalize_date_slow, utils.normalize_date, utils._normalize_date_str.cache_clear, dt)):
+        t_slow = timed(slow, items)
+        clear()
+        t_cold = timed(fast, items)
+        warm = items[:2000] * (len(items) // 2000)
+        timed(fast, warm[:2000])
+        t_warm = timed(fast, warm)
+        print(f"{name:24}{t_slow:>12.2f}{t_cold:>10.2f}{t_warm:>10.2f}{t_slow / t_cold:>8.1f}x")
+
+    text = DOCUMENT
+    runs = 300
+    heuristics.parse_amount, heuristics.normalize_date = utils._parse_amount_slow, utils._normalize_date_slow
+    t_old = timed(heuristics.extract_fields_heuristic, [text] * runs)
+    heuristics.parse_amount, heuristics.normalize_date = utils.parse_amount, utils.normalize_date
+    t_new = timed(heuristics.extract_fields_heuristic, [text] * runs)
+    print(f"{'extract_fields_heuristic':24}{t_old:>12.1f}{t_new:>10.1f}{'':>10}{t_old / t_new:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
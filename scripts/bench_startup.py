@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Měření studeného startu: čas importu backend.app a latence první extrakce
+se zahřátím (start-up hook) a bez něj. Každé měření běží v čerstvém procesu.
+
+    python scripts/bench_startup.py --runs 5 --out startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_CHILD = r"""
+import io, json, sys, time
+t0 = time.perf_counter()
+import backend.app as app
+t_import = time.perf_counter() - t0
+warm_ms = None
+if sys.argv[1] == "warm":
+    t = time.perf_counter()
+    app._warm_up()
+    warm_ms = (time.perf_counter() - t) * 1000
+from reportlab.pdfgen import canvas
+buf = io.BytesIO()
+c = canvas.Canvas(buf, invariant=1)
+for i, ln in enumerate(app._WARMUP_TEXT.splitlines()):
+    c.drawString(50, 800 - 14 * i, ln)
+c.showPage(); c.save()
+out = {"import_ms": t_import * 1000, "warmup_ms": warm_ms}
+for name, data in (("txt", app._WARMUP_TEXT.encode("utf-8")), ("pdf", buf.getvalue())):
+    t = time.perf_counter()
+    app._run_pipeline("sample." + name, data, "auto")
+    out["first_" + name + "_ms"] = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    app._run_pipeline("sample." + name, data, "auto")
+    out["second_" + name + "_ms"] = (time.perf_counter() - t) * 1000
+out["ready_to_first_result_ms"] = out["import_ms"] + (warm_ms or 0) + out["first_txt_ms"]
+print(json.dumps(out))
+"""
+
+
+def _measure(mode: str, runs: int):
+    rows = []
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="0")
+    env.pop("OPENAI_API_KEY", None)  # no network calls in the measurement
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, "-c", _CHILD, mode], cwd=ROOT, env=env)
+        rows.append(json.loads(out.decode().strip().splitlines()[-1]))
+    keys = [k for k in rows[0] if rows[0][k] is not None]
+    return {k: round(statistics.median(r[k] for r in rows), 1) for k in keys}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cold start / first extraction latency.")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--out")
+    args = ap.parse_args(argv)
+
+    res = {"cold": _measure("cold", args.runs), "warm": _measure("warm", args.runs), "runs": args.runs}
+    for mode in ("cold", "warm"):
+        print(mode, " ".join(f"{k}={v}" for k, v in res[mode].items()))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Benchmark extrakčních fází nad korpusem s ground truth (viz generate_corpus.py).
+
+Měří propustnost (dokumenty/s), percentily latence jednotlivých fází, špičku
+paměti a přesnost/úplnost (precision/recall) pro každé výstupní pole. Výsledek
+se ukládá jako JSON; s --compare se porovná s jiným během a při překročení
+prahů (benchmark_thresholds.json) skončí s návratovým kódem 1.
+
+    python scripts/benchmark.py --corpus samples/corpus --out bench.json
+    python scripts/benchmark.py --corpus samples/corpus --out new.json --compare bench.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from backend.extractors import llm as llm_mod  # noqa: E402
+from backend.extractors.ocr import extract_text_from_file  # noqa: E402
+from backend.extractors.templates import extract_fields_template  # noqa: E402
+from backend.extractors.heuristics import extract_fields_heuristic  # noqa: E402
+from backend.extractors.postprocess import autofill_amounts  # noqa: E402
+
+FIELDS = [
+    "variabilni_symbol", "datum_vystaveni", "datum_splatnosti", "duzp",
+    "castka_bez_dph", "dph", "castka_s_dph",
+    "dodavatel.nazev", "dodavatel.ico", "dodavatel.dic", "dodavatel.adresa",
+    "mena", "platba_zpusob", "banka_prijemce", "ucet_prijemce",
+]
+AMOUNT_FIELDS = {"castka_bez_dph", "dph", "castka_s_dph"}
+STAGES = ["text", "template", "heuristic", "llm"]
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "benchmark_thresholds.json")
+
+
+# --- Mock LLM: answers with the ground truth, so only our post-processing is measured ---
+
+class _MockCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, **kwargs):
+        if self.owner.latency:
+            time.sleep(self.owner.latency)
+        content = json.dumps(self.owner.answer or {}, ensure_ascii=False)
+        msg = type("Message", (), {"content": content})()
+        return type("Response", (), {"choices": [type("Choice", (), {"message": msg})()]})()
+
+
+class MockOpenAI:
+    answer = None
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.chat = type("Chat", (), {"completions": _MockCompletions(MockOpenAI)})()
+
+
+# --- Helpers ---
+
+def _get(d, path):
+    cur = d
+    for part in path.split("."):
+        if not isinstance(cur, dict):
+            return None
+        cur = cur.get(part)
+    return cur
+
+
+def _norm(field, v):
+    if v is None or v == "":
+        return None
+    if field in AMOUNT_FIELDS:
+        try:
+            return round(float(v), 2)
+        except (TypeError, ValueError):
+            return str(v)
+    return " ".join(str(v).split()).lower()
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    s = sorted(values)
+
+    def pct(p):
+        return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+    return {"p50_ms": round(pct(50) * 1000, 3), "p90_ms": round(pct(90) * 1000, 3),
+            "p99_ms": round(pct(99) * 1000, 3), "max_ms": round(s[-1] * 1000, 3),
+            "mean_ms": round(sum(s) / len(s) * 1000, 3), "count": len(s)}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def load_corpus(corpus, limit=None):
+    docs = []
+    for path in sorted(glob.glob(os.path.join(corpus, "*.json"))):
+        if os.path.basename(path) == "manifest.json":
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            truth = json.load(f)
+        fname = (truth.get("_meta") or {}).get("file")
+        if not fname or not os.path.exists(os.path.join(corpus, fname)):
+            continue
+        docs.append((os.path.join(corpus, fname), truth.get("data") or {}))
+        if limit and len(docs) >= limit:
+            break
+    return docs
+
+
+class FieldScore:
+    def __init__(self):
+        self.counts = {f: [0, 0, 0] for f in FIELDS}  # tp, fp, fn
+
+    def add(self, pred, truth):
+        for f in FIELDS:
+            p, t = _norm(f, _get(pred, f)), _norm(f, _get(truth, f))
+            row = self.counts[f]
+            if p is not None and p == t:
+                row[0] += 1
+            else:
+                if p is not None:
+                    row[1] += 1
+                if t is not None:
+                    row[2] += 1
+
+    def as_dict(self):
+        out, total = {}, [0, 0, 0]
+        for f, (tp, fp, fn) in self.counts.items():
+            out[f] = _scores(tp, fp, fn)
+            total = [total[0] + tp, total[1] + fp, total[2] + fn]
+        out["_micro"] = _scores(*total)
+        return out
+
+
+def _scores(tp, fp, fn):
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+            "tp": tp, "fp": fp, "fn": fn}
+
+
+def run(docs, stages, llm_latency=0.0, trace_memory=False):
+    llm_mod.OpenAI = MockOpenAI
+    MockOpenAI.latency = llm_latency
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-mock")
+
+    times = {s: [] for s in ["read"] + stages}
+    scores = {s: FieldScore() for s in stages if s != "text"}
+    peaks = {s: 0 for s in times}
+    errors = {s: 0 for s in times}
+    empty_text = 0
+
+    if trace_memory:
+        tracemalloc.start()
+
+    def timed(stage, fn, *args):
+        if trace_memory:
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception:
+            errors[stage] += 1
+            return None
+        finally:
+            times[stage].append(time.perf_counter() - t0)
+            if trace_memory:
+                peaks[stage] = max(peaks[stage], tracemalloc.get_traced_memory()[1])
+
+    wall0 = time.perf_counter()
+    for path, truth in docs:
+        with open(path, "rb") as f:
+            t0 = time.perf_counter()
+            data = f.read()
+            times["read"].append(time.perf_counter() - t0)
+        text = timed("text", extract_text_from_file, os.path.basename(path), data) or ""
+        if not text.strip():
+            empty_text += 1
+        if "template" in stages:
+            res = timed("template", extract_fields_template, text)
+            scores["template"].add(autofill_amounts(res) if res else {}, truth)
+        if "heuristic" in stages:
+            res = timed("heuristic", extract_fields_heuristic, text)
+            scores["heuristic"].add(autofill_amounts(res) if res else {}, truth)
+        if "llm" in stages:
+            MockOpenAI.answer = truth
+            res = timed("llm", llm_mod.extract_fields_llm, text)
+            scores["llm"].add(autofill_amounts(res) if res else {}, truth)
+    wall = time.perf_counter() - wall0
+
+    if trace_memory:
+        tracemalloc.stop()
+
+    stage_stats = {}
+    for s, vals in times.items():
+        stats = _percentiles(vals)
+        total = sum(vals)
+        stats["docs_per_s"] = round(len(vals) / total, 2) if total else None
+        stats["errors"] = errors[s]
+        if trace_memory:
+            stats["peak_tracemalloc_bytes"] = peaks[s]
+        stage_stats[s] = stats
+
+    return {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "docs": len(docs),
+            "stages": stages,
+            "llm_latency_ms": llm_latency * 1000,
+            "empty_text": empty_text,
+        },
+        "throughput": {"docs_per_s": round(len(docs) / wall, 2) if wall else None, "wall_s": round(wall, 3)},
+        "memory": {"max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss},
+        "stages": stage_stats,
+        "accuracy": {s: sc.as_dict() for s, sc in scores.items()},
+    }
+
+
+def compare(new, old, thresholds):
+    """Vrátí seznam regresí (prázdný = OK)."""
+    problems = []
+    max_tp_drop = thresholds.get("max_throughput_drop", 0.15)
+    nt, ot = new["throughput"].get("docs_per_s"), old["throughput"].get("docs_per_s")
+    if nt and ot and nt < ot * (1 - max_tp_drop):
+        problems.append(f"throughput {ot} -> {nt} docs/s (>{max_tp_drop:.0%} drop)")
+
+    max_lat = thresholds.get("max_latency_increase", 0.25)
+    for stage, stats in new["stages"].items():
+        old_stats = old["stages"].get(stage) or {}
+        for key in thresholds.get("latency_keys", ["p50_ms", "p90_ms"]):
+            n, o = stats.get(key), old_stats.get(key)
+            # Ignore sub-millisecond noise
+            if n is not None and o and n > 1.0 and n > o * (1 + max_lat):
+                problems.append(f"{stage} {key} {o} -> {n} (>{max_lat:.0%} slower)")
+
+    max_acc = thresholds.get("max_accuracy_drop", 0.01)
+    for extractor, fields in new.get("accuracy", {}).items():
+        old_fields = old.get("accuracy", {}).get(extractor) or {}
+        for field, sc in fields.items():
+            o = old_fields.get(field)
+            if not o:
+                continue
+            for key in ("precision", "recall"):
+                if sc[key] < o[key] - max_acc:
+                    problems.append(f"{extractor}.{field} {key} {o[key]} -> {sc[key]}")
+
+    max_rss = thresholds.get("max_memory_increase", 0.25)
+    nm, om = new["memory"].get("max_rss_kb"), old["memory"].get("max_rss_kb")
+    if nm and om and nm > om * (1 + max_rss):
+        problems.append(f"max RSS {om} -> {nm} kB (>{max_rss:.0%} increase)")
+    return problems
+
+
+def _print_summary(res):
+    print(f"docs: {res['meta']['docs']}  throughput: {res['throughput']['docs_per_s']} docs/s  "
+          f"max RSS: {res['memory']['max_rss_kb']} kB")
+    for s, st in res["stages"].items():
+        print(f"  {s:<10} p50 {st.get('p50_ms')} ms  p90 {st.get('p90_ms')} ms  p99 {st.get('p99_ms')} ms  "
+              f"{st.get('docs_per_s')} docs/s  errors {st.get('errors')}")
+    for ex, fields in res["accuracy"].items():
+        m = fields["_micro"]
+        print(f"  {ex:<10} precision {m['precision']}  recall {m['recall']}  f1 {m['f1']}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark invoice extractors over a labelled corpus.")
+    ap.add_argument("--corpus", default=os.path.join(ROOT, "samples", "corpus"))
+    ap.add_argument("--limit", type=int)
+    ap.add_argument("--stages", default=",".join(STAGES), help="comma separated subset of " + ",".join(STAGES))
+    ap.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated latency of the mock LLM")
+    ap.add_argument("--memory", action="store_true", help="trace per-stage peak memory (slower)")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", help="baseline results JSON; exit 1 on regression")
+    ap.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    args = ap.parse_args(argv)
+
+    stages = [s for s in args.stages.split(",") if s]
+    if "text" not in stages:
+        stages.insert(0, "text")
+    docs = load_corpus(args.corpus, args.limit)
+    if not docs:
+        print(f"No labelled documents in {args.corpus} (run scripts/generate_corpus.py first)")
+        return 2
+
+    res = run(docs, stages, args.llm_latency_ms / 1000.0, args.memory)
+    _print_summary(res)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        thresholds = {}
+        if args.thresholds and os.path.exists(args.thresholds):
+            with open(args.thresholds, "r", encoding="utf-8") as f:
+                thresholds = json.load(f)
+        problems = compare(res, old, thresholds)
+        if problems:
+            print("REGRESSIONS:")
+            for p in problems:
+                print(f"  ✗ {p}")
+            return 1
+        print("No regressions against", args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Sestavení offline registru firem (IČO → název, DIČ, adresa) z hromadného CSV exportu ARES/RES.
+
+Názvy sloupců se hledají automaticky (ICO, FIRMA/obchodniJmeno/nazev, DIC,
+TEXTOVA_ADRESA/adresa); lze je přepsat parametry. Výsledný soubor nastav
+backendu přes REGISTRY_PATH.
+
+    python scripts/build_registry.py res_data.csv --out data/registry.bin --encoding cp1250
+    REGISTRY_PATH=data/registry.bin uvicorn backend.app:app
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from extractors import registry  # noqa: E402
+
+CANDIDATES = {
+    "ico": ("ico", "ičo", "ic"),
+    "name": ("firma", "obchodnijmeno", "obchodni_jmeno", "nazev", "název", "name"),
+    "dic": ("dic", "dič"),
+    "address": ("textova_adresa", "textovaadresa", "adresa", "sidlo", "address"),
+}
+
+
+def _pick(header, wanted, explicit):
+    if explicit:
+        if explicit not in header:
+            sys.exit(f"Column {explicit!r} not in {header}")
+        return header.index(explicit)
+    low = [h.strip().lower() for h in header]
+    for cand in wanted:
+        if cand in low:
+            return low.index(cand)
+    return None
+
+
+def rows(path, encoding, delimiter, cols):
+    with open(path, "r", encoding=encoding, newline="") as f:
+        if not delimiter:
+            sample = f.read(64 * 1024)
+            f.seek(0)
+            delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader)
+        idx = {k: _pick(header, CANDIDATES[k], cols.get(k)) for k in CANDIDATES}
+        if idx["ico"] is None or idx["name"] is None:
+            sys.exit(f"Cannot find IČO/name columns in {header}")
+        get = lambda row, k: row[idx[k]] if idx[k] is not None and idx[k] < len(row) else ""
+        for row in reader:
+            yield get(row, "ico"), get(row, "name"), get(row, "dic"), get(row, "address")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build the memory-mapped IČO registry index.")
+    ap.add_argument("csv", help="ARES/RES bulk CSV")
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--encoding", default="utf-8-sig")
+    ap.add_argument("--delimiter", help="default: sniffed")
+    ap.add_argument("--ico-col"); ap.add_argument("--name-col")
+    ap.add_argument("--dic-col"); ap.add_argument("--address-col")
+    args = ap.parse_args(argv)
+
+    cols = {"ico": args.ico_col, "name": args.name_col, "dic": args.dic_col, "address": args.address_col}
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    t = time.perf_counter()
+    n = registry.build(rows(args.csv, args.encoding, args.delimiter, cols), args.out)
+    print(f"{n} entries -> {args.out} ({os.path.getsize(args.out) / 2 ** 20:.1f} MiB, {time.perf_counter() - t:.1f}s)")
+
+    t = time.perf_counter()
+    reg = registry.Registry(args.out)
+    print(f"open {1000 * (time.perf_counter() - t):.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
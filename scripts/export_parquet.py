@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Export výsledků extrakce do Parquetu pro analytiku (vyžaduje `pip install pyarrow`).
+
+Zdroj: dávka z úložiště výsledků (--batch), JSONL soubory nebo adresář
+s JSON sidecary korpusu. Zapisuje se po row groupách, paměť je omezená.
+
+    python scripts/export_parquet.py --batch nightly --out faktury.parquet --timings-out timings.parquet
+    python scripts/export_parquet.py samples/corpus --out corpus.parquet
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+import columnar  # noqa: E402
+import results   # noqa: E402
+
+
+def _inputs(args):
+    if args.batch:
+        if not results.exists(args.batch):
+            sys.exit(f"Batch not found: {args.batch} (RESULTS_DIR={results.results_dir()})")
+        return lambda: results.iter_records(args.batch)
+    paths = []
+    for src in args.inputs:
+        if os.path.isdir(src):
+            paths += sorted(p for p in glob.glob(os.path.join(src, "*.json")) if not p.endswith("manifest.json"))
+            paths += sorted(glob.glob(os.path.join(src, "*.jsonl")))
+        else:
+            paths.append(src)
+    if not paths:
+        sys.exit("No input records")
+    return lambda: columnar.read_records(paths)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export extraction results to Parquet.")
+    ap.add_argument("inputs", nargs="*", help="JSONL files, JSON sidecars or directories")
+    ap.add_argument("--batch", help="batch id from the results store (/api/extract?batch=...)")
+    ap.add_argument("--out", required=True, help="output .parquet file")
+    ap.add_argument("--timings-out", help="also write per-stage timings (one row per document and stage)")
+    ap.add_argument("--row-group-size", type=int, default=columnar.DEFAULT_ROW_GROUP)
+    ap.add_argument("--compression", default="zstd")
+    args = ap.parse_args(argv)
+    if not columnar.available():
+        sys.exit("pyarrow is not installed (pip install pyarrow)")
+
+    source = _inputs(args)
+    t = time.perf_counter()
+    # The source can be read twice: take the timing columns from every record, not just the first row group
+    stages = columnar.timing_stages(source())
+    rows = columnar.write_parquet(source(), args.out, args.row_group_size, args.compression, stages)
+    print(f"{rows} rows -> {args.out} ({os.path.getsize(args.out) / 1024:.1f} KiB, {time.perf_counter() - t:.2f}s)")
+    if args.timings_out:
+        n = columnar.write_timings_parquet(source(), args.timings_out, args.row_group_size)
+        print(f"{n} timing rows -> {args.timings_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
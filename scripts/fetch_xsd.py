@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Stažení oficiálních XSD (ISDOC 6.0.2, Pohoda data-pack) do tests/xsd/.
+
+test_export.py validuje export proti oficiálnímu schématu, pokud je v tests/xsd/;
+jinak proti přiloženému výřezu (*-subset.xsd, tests/xsd/pohoda/) se stejnými
+elementy, pořadím a typy. Pohoda schémata se stahují i s importy.
+
+    python scripts/fetch_xsd.py
+"""
+
+import os
+import re
+import sys
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+XSD_DIR = os.path.join(ROOT, "tests", "xsd")
+
+ISDOC_URL = "https://isdoc.cz/6.0.2/xsd/isdoc-invoice-6.0.2.xsd"
+POHODA_URL = "https://www.stormware.cz/schema/version_2/data.xsd"
+
+
+def _fetch(url: str, dest: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        body = resp.read()
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest, "wb") as f:
+        f.write(body)
+    print(f"{url} -> {os.path.relpath(dest, ROOT)}")
+    return body
+
+
+def _fetch_with_imports(url: str, dest_dir: str, seen: set):
+    """A schema and every schema it imports/includes by a relative schemaLocation."""
+    name = url.rsplit("/", 1)[1]
+    if name in seen:
+        return
+    seen.add(name)
+    body = _fetch(url, os.path.join(dest_dir, name))
+    base = url.rsplit("/", 1)[0]
+    for loc in re.findall(rb'schemaLocation="([^"/:]+\.xsd)"', body):
+        _fetch_with_imports(f"{base}/{loc.decode()}", dest_dir, seen)
+
+
+def main():
+    try:
+        _fetch(ISDOC_URL, os.path.join(XSD_DIR, "isdoc-invoice-6.0.2.xsd"))
+        _fetch_with_imports(POHODA_URL, os.path.join(XSD_DIR, "pohoda", "official"), set())
+    except OSError as e:
+        sys.exit(f"Download failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Generátor syntetického korpusu faktur pro benchmarky.
+
+Každý doklad dostane ground-truth JSON se stejným schématem jako odpověď
+/api/extract (data, method, validations) a blok _meta s parametry generování.
+Výstup je deterministický pro dané --seed bez ohledu na počet workerů.
+
+    python scripts/generate_corpus.py --count 5000 --seed 42 --out samples/corpus --workers 8
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import unicodedata
+from datetime import date, timedelta
+from multiprocessing import Pool
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from backend.extractors.validate import validate_extraction  # noqa: E402
+
+PAGE_W, PAGE_H = 595.0, 842.0  # A4 in points
+BOTTOM_MARGIN = 90.0
+
+# TTF fonts with full Czech coverage; without one the text is folded to ASCII
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+LABELS = {
+    "cs": {
+        "title": ["FAKTURA - DAŇOVÝ DOKLAD", "Faktura", "Daňový doklad", "FAKTURA"],
+        "supplier": ["Dodavatel", "Dodavatel:"],
+        "customer": ["Odběratel", "Odběratel:"],
+        "ico": ["IČO:", "IČO", "IČ:"],
+        "dic": ["DIČ:", "DIČ"],
+        "vs": ["Variabilní symbol:", "VS:"],
+        "issued": ["Datum vystavení:", "Vystaveno:"],
+        "due": ["Datum splatnosti:", "Splatnost:"],
+        "duzp": ["DUZP:", "Datum uskutečnění zdanitelného plnění:"],
+        "base": ["Základ daně:", "Celkem bez DPH:"],
+        "vat": ["DPH {rate} %:", "DPH:"],
+        "total": ["Celkem k úhradě:", "K úhradě:"],
+        "exempt": ["Nejsem plátce DPH.", "Dodavatel není plátcem DPH."],
+        "payment": ["Způsob úhrady:", "Způsob platby:"],
+        "pay_values": ["převodem", "peněžní převod", "bankovní převod"],
+        "bank": ["Banka:", "Název banky:"],
+        "account": ["Číslo účtu:", "Číslo účtu"],
+        "items": ["Popis", "Množství", "Cena/MJ", "DPH %", "Celkem"],
+        "page": "Strana {p}/{n}",
+        "descriptions": ["Konzultace", "Servisní práce", "Licence software", "Dodávka zboží", "Doprava",
+                         "Školení", "Správa serverů", "Grafický návrh", "Pronájem techniky", "Údržba"],
+    },
+    "en": {
+        "title": ["INVOICE", "Tax invoice", "Invoice"],
+        "supplier": ["Supplier", "Supplier:"],
+        "customer": ["Customer", "Bill to:"],
+        "ico": ["Company ID:", "Reg. No.:"],
+        "dic": ["VAT:", "VAT ID:"],
+        "vs": ["Variable symbol:", "VS:"],
+        "issued": ["Issue date:", "Date of issue:"],
+        "due": ["Due date:", "Payment due:"],
+        "duzp": ["Tax point:", "Date of taxable supply:"],
+        "base": ["Subtotal:", "Total excl. VAT:"],
+        "vat": ["VAT {rate}%:", "VAT:"],
+        "total": ["Amount due:", "Grand total:"],
+        "exempt": ["Not a VAT payer.", "VAT exempt."],
+        "payment": ["Payment method:"],
+        "pay_values": ["bank transfer", "wire transfer"],
+        "bank": ["Bank name:", "Bank:"],
+        "account": ["Account number:", "IBAN:"],
+        "items": ["Description", "Qty", "Unit price", "VAT %", "Total"],
+        "page": "Page {p} of {n}",
+        "descriptions": ["Consulting", "Service work", "Software licence", "Goods delivery", "Shipping",
+                         "Training", "Server management", "Graphic design", "Equipment rental", "Maintenance"],
+    },
+}
+
+NAME_A = ["Alfa", "Beta", "Nova", "Sever", "Jih", "Modrá", "Zelený", "Rychlý", "Praktik", "Datový", "Creative", "Tech"]
+NAME_B = ["Servis", "Systémy", "Stavby", "Design", "Obchod", "Logistika", "Solutions", "Group", "Energie", "Média"]
+SUFFIX = ["s.r.o.", "a.s.", "spol. s r.o.", "v.o.s."]
+PERSONS = ["Jan Novák", "Petra Dvořáková", "Tomáš Černý", "Helena Vocásková", "Bořivoj Hejsek", "Eva Svobodová"]
+STREETS = ["Hlavní", "Nádražní", "Školní", "Husova", "Masarykova", "Vinohradská", "Hopisníkova", "Korunní"]
+CITIES = [("110 00", "Praha 1"), ("602 00", "Brno"), ("301 00", "Plzeň"), ("779 00", "Olomouc"),
+          ("702 00", "Ostrava"), ("370 01", "České Budějovice"), ("460 01", "Liberec")]
+BANKS = [("Komerční banka, a.s.", "0100"), ("Česká spořitelna, a.s.", "0800"), ("ČSOB, a.s.", "0300"),
+         ("Fio banka, a.s.", "2010"), ("Raiffeisenbank a.s.", "5500")]
+CURRENCIES = [("CZK", 0.7), ("EUR", 0.2), ("USD", 0.1)]
+VAT_RATES = [(21, 0.6), (12, 0.2), (None, 0.2)]  # None = neplátce DPH
+LAYOUTS = ["classic", "two_column", "compact"]
+
+
+def _weighted(rng, choices):
+    r = rng.random()
+    acc = 0.0
+    for value, w in choices:
+        acc += w
+        if r <= acc:
+            return value
+    return choices[-1][0]
+
+
+def _make_ico(rng) -> str:
+    # Same checksum rule as validate._ico_checksum
+    digits = [rng.randint(0, 9) for _ in range(7)]
+    mod = sum(d * (8 - i) for i, d in enumerate(digits)) % 11
+    c = 1 if mod in (0, 10) else (0 if mod == 1 else 11 - mod)
+    return "".join(map(str, digits)) + str(c)
+
+
+def _template_suppliers():
+    out = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "backend", "templates", "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            tpl = json.load(f)
+        defaults = tpl.get("supplier_defaults") or {}
+        if not defaults.get("nazev"):
+            continue
+        out.append({"nazev": defaults["nazev"], "ico": defaults.get("ico"), "dic": defaults.get("dic"),
+                    "keywords": tpl.get("required_keywords", []), "template": tpl.get("name")})
+    return out
+
+
+def _address(rng) -> str:
+    psc, city = rng.choice(CITIES)
+    return f"{rng.choice(STREETS)} {rng.randint(1, 250)}, {psc} {city}"
+
+
+def _party(rng, tpl_suppliers=None):
+    if tpl_suppliers and rng.random() < 0.3:
+        s = rng.choice(tpl_suppliers)
+        ico = s["ico"] or _make_ico(rng)
+        return {"nazev": s["nazev"], "ico": ico, "dic": s["dic"] or f"CZ{ico}", "adresa": _address(rng),
+                "keywords": s["keywords"], "template": s["template"]}
+    if rng.random() < 0.2:
+        name = rng.choice(PERSONS)
+    else:
+        name = f"{rng.choice(NAME_A)} {rng.choice(NAME_B)} {rng.choice(SUFFIX)}"
+    ico = _make_ico(rng)
+    return {"nazev": name, "ico": ico, "dic": f"CZ{ico}", "adresa": _address(rng), "keywords": [], "template": None}
+
+
+def _fmt_amount(value: float, lang: str, cur: str, style: int) -> str:
+    whole, frac = f"{value:,.2f}".split(".")
+    if lang == "cs":
+        num = whole.replace(",", " ") + "," + frac
+        return f"{num} {'Kč' if cur == 'CZK' and style == 0 else cur}"
+    return f"{whole}.{frac} {cur}"
+
+
+def _fmt_date(d: date, lang: str, style: int) -> str:
+    if lang == "cs":
+        return d.strftime("%d.%m.%Y") if style == 0 else f"{d.day}.{d.month}.{d.year}"
+    return d.isoformat() if style == 0 else d.strftime("%d/%m/%Y")
+
+
+def _ascii(s):
+    if s is None or not isinstance(s, str):
+        return s
+    return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+
+
+def build_invoice(index: int, seed: int, scanned_ratio: float, max_items: int):
+    """Sestaví obsah jednoho dokladu: ground truth + seznam textových operací po stránkách."""
+    rng = random.Random(f"{seed}:{index}")
+    lang = "cs" if rng.random() < 0.75 else "en"
+    L = LABELS[lang]
+    cur = _weighted(rng, CURRENCIES)
+    rate = _weighted(rng, VAT_RATES)
+    layout = rng.choice(LAYOUTS)
+    scanned = rng.random() < scanned_ratio
+    amount_style = rng.randint(0, 1)
+    date_style = rng.randint(0, 1)
+
+    supplier = _party(rng, _template_suppliers())
+    customer = _party(rng)
+    issued = date(2023, 1, 1) + timedelta(days=rng.randint(0, 900))
+    due = issued + timedelta(days=rng.choice([7, 14, 15, 30]))
+    vs = str(rng.randint(10 ** 7, 10 ** 10 - 1))
+    bank_name, bank_code = rng.choice(BANKS)
+    account = f"{rng.randint(100000, 9999999999)}/{bank_code}"
+    if rng.random() < 0.3:
+        account = f"{rng.randint(10, 999999)}-{account}"
+    pay = rng.choice(L["pay_values"])
+
+    n_items = rng.randint(1, 12 if scanned else max_items)
+    items, base = [], 0.0
+    for _ in range(n_items):
+        qty = rng.randint(1, 20)
+        price = round(rng.uniform(10, 5000), 2)
+        total = round(qty * price, 2)
+        base = round(base + total, 2)
+        items.append((rng.choice(L["descriptions"]), qty, price, total))
+    vat = round(base * rate / 100.0, 2) if rate else None
+    grand = round(base + (vat or 0.0), 2)
+
+    amt = lambda v: _fmt_amount(v, lang, cur, amount_style)  # noqa: E731
+    dt = lambda d: _fmt_date(d, lang, date_style)  # noqa: E731
+
+    pages = [[]]
+    state = {"y": PAGE_H - 50}
+
+    def put(x, text, size=10, bold=False, dy=14):
+        pages[-1].append((x, state["y"], text, size, bold))
+        state["y"] -= dy
+
+    def block(x, title, lines):
+        put(x, title, 11, True, 16)
+        for ln in lines:
+            put(x, ln)
+        state["y"] -= 8
+
+    title = rng.choice(L["title"])
+    put(50 if layout != "compact" else 360, f"{title} {vs if rng.random() < 0.5 else ''}".strip(), 16, True, 30)
+    for kw in supplier["keywords"]:
+        # Template suppliers must carry their identifying keywords (e.g. "IČO 27232425")
+        if kw not in (supplier["nazev"], "IČO", "ICO", "VAT:"):
+            put(50, kw, 9, False, 12)
+
+    sup_lines = [supplier["nazev"], supplier["adresa"], f"{rng.choice(L['ico'])} {supplier['ico']}",
+                 f"{rng.choice(L['dic'])} {supplier['dic']}"]
+    cus_lines = [customer["nazev"], customer["adresa"], f"{L['ico'][0]} {customer['ico']}"]
+    pay_lines = [f"{rng.choice(L['vs'])} {vs}", f"{rng.choice(L['payment'])} {pay}",
+                 f"{rng.choice(L['bank'])} {bank_name}", f"{rng.choice(L['account'])} {account}"]
+    date_lines = [f"{rng.choice(L['issued'])} {dt(issued)}", f"{rng.choice(L['due'])} {dt(due)}"]
+    if rate:
+        date_lines.append(f"{rng.choice(L['duzp'])} {dt(issued)}")
+
+    if layout == "two_column":
+        top = state["y"]
+        block(50, rng.choice(L["supplier"]), sup_lines)
+        left_end = state["y"]
+        state["y"] = top
+        block(320, rng.choice(L["customer"]), cus_lines)
+        state["y"] = min(left_end, state["y"])
+        top = state["y"]
+        block(50, " ", pay_lines)
+        left_end = state["y"]
+        state["y"] = top
+        block(320, " ", date_lines)
+        state["y"] = min(left_end, state["y"])
+    elif layout == "compact":
+        block(50, rng.choice(L["supplier"]), sup_lines + pay_lines)
+        block(50, rng.choice(L["customer"]), cus_lines + date_lines)
+    else:
+        block(50, rng.choice(L["supplier"]), sup_lines)
+        block(50, rng.choice(L["customer"]), cus_lines)
+        block(50, " ", pay_lines)
+        block(50, " ", date_lines)
+
+    cols = [50, 280, 340, 420, 480]
+
+    def header_row():
+        for x, h in zip(cols, L["items"]):
+            pages[-1].append((x, state["y"], h, 9, True))
+        state["y"] -= 14
+
+    header_row()
+    for desc, qty, price, total in items:
+        if state["y"] < BOTTOM_MARGIN:
+            pages.append([])
+            state["y"] = PAGE_H - 60
+            header_row()
+        for x, v in zip(cols, [desc, str(qty), amt(price), str(rate or 0), amt(total)]):
+            pages[-1].append((x, state["y"], v, 9, False))
+        state["y"] -= 13
+
+    if state["y"] < BOTTOM_MARGIN + 70:
+        pages.append([])
+        state["y"] = PAGE_H - 60
+    state["y"] -= 10
+    tx = 320 if layout != "classic" else 50
+    if rate:
+        put(tx, f"{rng.choice(L['base'])} {amt(base)}")
+        put(tx, f"{rng.choice(L['vat']).format(rate=rate)} {amt(vat)}")
+    else:
+        put(tx, rng.choice(L["exempt"]))
+    put(tx, f"{rng.choice(L['total'])} {amt(grand)}", 11, True)
+
+    if len(pages) > 1 or rng.random() < 0.5:
+        for p, ops in enumerate(pages, 1):
+            ops.append((270, 40, L["page"].format(p=p, n=len(pages)), 8, False))
+
+    data = {
+        "variabilni_symbol": vs,
+        "datum_vystaveni": issued.isoformat(),
+        "datum_splatnosti": due.isoformat(),
+        "duzp": issued.isoformat() if rate else None,
+        "castka_bez_dph": base if rate else grand,
+        "dph": vat,
+        "castka_s_dph": grand,
+        "dodavatel": {k: supplier[k] for k in ("nazev", "ico", "dic", "adresa")},
+        "mena": cur,
+        "platba_zpusob": pay,
+        "banka_prijemce": bank_name,
+        "ucet_prijemce": account,
+        "confidence": 1.0,
+    }
+    polozky = {"radky": [{"popis": desc, "mnozstvi": float(qty), "jednotka": None, "cena_za_jednotku": price,
+                          "sazba_dph": float(rate or 0), "bez_dph": None,
+                          "celkem": total} for desc, qty, price, total in items],
+               "pocet": n_items, "soucet": base, "kontrola": True}
+    meta = {"index": index, "seed": seed, "lang": lang, "layout": layout, "currency": cur, "vat_rate": rate,
+            "items": n_items, "pages": len(pages), "template": supplier["template"]}
+    scan = None
+    if scanned:
+        scan = {"dpi": rng.choice([100, 150, 200, 300]), "skew": round(rng.uniform(-3.0, 3.0), 2),
+                "blur": round(rng.choice([0.0, 0.0, 0.6, 1.0]), 2), "noise": rng.choice([0, 8, 16, 28]),
+                "jpeg_quality": rng.choice([None, 55, 75, 90])}
+    return data, meta, pages, scan, polozky
+
+
+# --- Rendering ---
+
+_FONT = {"path": None, "ascii": False}
+
+
+def _init_worker(font_path):
+    _FONT["path"] = font_path
+    _FONT["ascii"] = font_path is None
+    if font_path:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+        if "Corpus" not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont("Corpus", font_path))
+
+
+def _render_pdf(path, pages):
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(path, pagesize=(PAGE_W, PAGE_H), invariant=1)
+    for ops in pages:
+        for x, y, text, size, bold in ops:
+            if _FONT["path"]:
+                c.setFont("Corpus", size)
+            else:
+                c.setFont("Helvetica-Bold" if bold else "Helvetica", size)
+            c.drawString(x, y, text)
+        c.showPage()
+    c.save()
+
+
+def _pil_font(size):
+    from PIL import ImageFont
+    if _FONT["path"]:
+        return ImageFont.truetype(_FONT["path"], size)
+    import reportlab
+    return ImageFont.truetype(os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf"), size)
+
+
+def _render_scan(path, ops, scan, rng):
+    from PIL import Image, ImageDraw, ImageFilter
+    scale = scan["dpi"] / 72.0
+    img = Image.new("L", (int(PAGE_W * scale), int(PAGE_H * scale)), 255)
+    draw = ImageDraw.Draw(img)
+    fonts = {}
+    for x, y, text, size, bold in ops:
+        px = max(6, int(round(size * scale)))
+        font = fonts.get(px) or fonts.setdefault(px, _pil_font(px))
+        draw.text((x * scale, (PAGE_H - y) * scale), text, fill=0, font=font, anchor="ls")
+    if scan["skew"]:
+        img = img.rotate(scan["skew"], resample=Image.BICUBIC, expand=True, fillcolor=255)
+    if scan["blur"]:
+        img = img.filter(ImageFilter.GaussianBlur(scan["blur"]))
+    if scan["noise"]:
+        # Image.effect_noise is not seedable, so draw the noise field from rng
+        noise = Image.frombytes("L", img.size, rng.randbytes(img.size[0] * img.size[1]))
+        img = Image.blend(img, noise, scan["noise"] / 100.0)
+    if scan["jpeg_quality"]:
+        img.save(path, "JPEG", quality=scan["jpeg_quality"])
+    else:
+        img.save(path, "PNG", optimize=False)
+
+
+def make_one(args):
+    index, seed, out_dir, scanned_ratio, max_items = args
+    data, meta, pages, scan, polozky = build_invoice(index, seed, scanned_ratio, max_items)
+    if _FONT["ascii"]:
+        data["dodavatel"] = {k: _ascii(v) for k, v in data["dodavatel"].items()}
+        for row in polozky["radky"]:
+            row["popis"] = _ascii(row["popis"])
+        data = {k: _ascii(v) if isinstance(v, str) else v for k, v in data.items()}
+        pages = [[(x, y, _ascii(t), s, b) for x, y, t, s, b in ops] for ops in pages]
+    stem = f"inv_{index:06d}"
+    if scan:
+        ext = "jpg" if scan["jpeg_quality"] else "png"
+        fname = f"{stem}.{ext}"
+        _render_scan(os.path.join(out_dir, fname), pages[0], scan, random.Random(f"{seed}:{index}:scan"))
+        meta["scan"] = scan
+    else:
+        fname = f"{stem}.pdf"
+        _render_pdf(os.path.join(out_dir, fname), pages)
+    meta["file"] = fname
+    truth = {"data": data, "method": "ground_truth", "validations": validate_extraction(data), "polozky": polozky,
+             "_meta": meta}
+    with open(os.path.join(out_dir, f"{stem}.json"), "w", encoding="utf-8") as f:
+        json.dump(truth, f, ensure_ascii=False, indent=2)
+    return fname
+
+
+def find_font(explicit=None):
+    for p in [explicit] + FONT_CANDIDATES:
+        if p and os.path.exists(p):
+            return p
+    return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate a synthetic invoice corpus with ground truth.")
+    ap.add_argument("--count", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=os.path.join(ROOT, "samples", "corpus"))
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--scanned-ratio", type=float, default=0.3)
+    ap.add_argument("--max-items", type=int, default=80, help="max line items (multi-page tables)")
+    ap.add_argument("--font", help="TTF font with Czech glyphs (default: autodetect DejaVu/Liberation/Noto)")
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    font = find_font(args.font)
+    if not font:
+        print("No TTF font with Czech glyphs found - text and ground truth are folded to ASCII.")
+    jobs = [(i, args.seed, args.out, args.scanned_ratio, args.max_items) for i in range(args.count)]
+    with Pool(max(1, args.workers), initializer=_init_worker, initargs=(font,)) as pool:
+        for n, _ in enumerate(pool.imap_unordered(make_one, jobs, chunksize=8), 1):
+            if n % 500 == 0:
+                print(f"  {n}/{args.count}")
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": args.count, "seed": args.seed, "scanned_ratio": args.scanned_ratio,
+                   "max_items": args.max_items, "font": os.path.basename(font) if font else None}, f, indent=2)
+    print(f"Generated {args.count} invoices into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Zátěžový test /api/extract proti běžící instanci (uvicorn).
+
+Přehrává soubory z korpusu s danou frekvencí příchodů (open-loop, volitelně
+Poissonovsky), průběžně měří latenci /api/health (blokování event loopu)
+a stahuje /api/metrics pro CPU a RSS serveru. Na konci vypíše propustnost,
+p50/p99 latenci, chybovost a časovou řadu po intervalech.
+
+    python scripts/mock_openai.py --latency-ms 800 &
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8089/v1 uvicorn backend.app:app &
+    python scripts/loadtest.py --url http://127.0.0.1:8000 --corpus samples/corpus --rate 5 --duration 60
+"""
+
+import argparse
+import glob
+import json
+import mimetypes
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+FILE_EXTS = (".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".bmp", ".txt")
+
+
+def _multipart(filename: str, data: bytes):
+    boundary = uuid.uuid4().hex
+    ctype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: {ctype}\r\n\r\n").encode("utf-8")
+    return head + data + f"\r\n--{boundary}--\r\n".encode("ascii"), f"multipart/form-data; boundary={boundary}"
+
+
+def _pct(values, p):
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def _ms(v):
+    return None if v is None else round(v * 1000, 1)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = []   # (start, latency, status, method)
+        self.health = []    # (t, latency)
+        self.samples = []   # (t, cpu_seconds, rss_bytes, inflight)
+        self.inflight = 0
+        self.dropped = 0
+
+    def add(self, *row):
+        with self.lock:
+            self.results.append(row)
+
+
+def _send(url, path, method_param, timeout, rec: Recorder, t0):
+    with open(path, "rb") as f:
+        body, ctype = _multipart(os.path.basename(path), f.read())
+    req = urllib.request.Request(f"{url}/api/extract?method={method_param}", data=body,
+                                 headers={"Content-Type": ctype}, method="POST")
+    start = time.perf_counter()
+    status, used = 0, None
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            status = resp.status
+            used = (json.loads(resp.read() or b"{}") or {}).get("method")
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = -1  # connection error / timeout
+    finally:
+        with rec.lock:
+            rec.inflight -= 1
+    rec.add(start - t0, time.perf_counter() - start, status, used)
+
+
+def _parse_metrics(text):
+    vals = {}
+    for name in ("process_cpu_seconds_total", "process_resident_memory_bytes", "invoice_inflight_requests"):
+        m = re.search(rf"^{name} ([0-9.eE+\-]+)$", text, re.M)
+        if m:
+            vals[name] = float(m.group(1))
+    return vals
+
+
+def _monitor(url, rec: Recorder, stop: threading.Event, interval, t0):
+    while not stop.wait(interval):
+        now = time.perf_counter() - t0
+        s = time.perf_counter()
+        try:
+            urllib.request.urlopen(f"{url}/api/health", timeout=30).read()
+            rec.health.append((now, time.perf_counter() - s))
+        except Exception:
+            rec.health.append((now, None))
+        try:
+            vals = _parse_metrics(urllib.request.urlopen(f"{url}/api/metrics", timeout=30).read().decode())
+            rec.samples.append((now, vals.get("process_cpu_seconds_total"),
+                                vals.get("process_resident_memory_bytes"), vals.get("invoice_inflight_requests")))
+        except Exception:
+            pass
+
+
+def report(rec: Recorder, duration: float, bucket: float):
+    res = rec.results
+    ok = [r for r in res if r[2] == 200 and r[3] != "error"]
+    lat = [r[1] for r in ok]
+    statuses = {}
+    for r in res:
+        key = str(r[2]) if r[2] != 200 or r[3] != "error" else "200 (method=error)"
+        statuses[key] = statuses.get(key, 0) + 1
+    methods = {}
+    for r in ok:
+        methods[r[3]] = methods.get(r[3], 0) + 1
+    health = [h[1] for h in rec.health if h[1] is not None]
+
+    timeline = []
+    prev = None
+    n_buckets = int(duration // bucket) + 1
+    for i in range(n_buckets):
+        lo, hi = i * bucket, (i + 1) * bucket
+        done = [r for r in res if lo <= r[0] + r[1] < hi]
+        d_lat = [r[1] for r in done if r[2] == 200]
+        smp = [s for s in rec.samples if lo <= s[0] < hi]
+        row = {"t": round(hi, 1), "completed": len(done), "rps": round(len(done) / bucket, 2),
+               "p50_ms": _ms(_pct(d_lat, 50)), "p99_ms": _ms(_pct(d_lat, 99)),
+               "errors": sum(1 for r in done if r[2] != 200 or r[3] == "error"),
+               "health_ms": _ms(max((h[1] for h in rec.health if lo <= h[0] < hi and h[1] is not None), default=None))}
+        if smp:
+            last = smp[-1]
+            if prev and last[1] is not None and prev[1] is not None and last[0] > prev[0]:
+                row["cpu_pct"] = round((last[1] - prev[1]) / (last[0] - prev[0]) * 100, 1)
+            if last[2]:
+                row["rss_mb"] = round(last[2] / 2 ** 20, 1)
+            row["inflight"] = last[3]
+            prev = last
+        timeline.append(row)
+
+    return {
+        "requests": len(res),
+        "dropped_client_side": rec.dropped,
+        "throughput_rps": round(len(ok) / duration, 3) if duration else None,
+        "latency_ms": {"p50": _ms(_pct(lat, 50)), "p90": _ms(_pct(lat, 90)), "p99": _ms(_pct(lat, 99)),
+                       "max": _ms(max(lat) if lat else None)},
+        "error_rate": round(1 - len(ok) / len(res), 4) if res else None,
+        "statuses": statuses,
+        "methods": methods,
+        "health_latency_ms": {"p50": _ms(_pct(health, 50)), "p99": _ms(_pct(health, 99)),
+                              "max": _ms(max(health) if health else None)},
+        "timeline": timeline,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Open-loop load generator for /api/extract.")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--corpus", default="samples/corpus")
+    ap.add_argument("--rate", type=float, default=2.0, help="arrivals per second")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    ap.add_argument("--poisson", action="store_true", help="exponential inter-arrival times")
+    ap.add_argument("--max-inflight", type=int, default=256, help="client-side cap; excess arrivals are dropped")
+    ap.add_argument("--method", default="auto")
+    ap.add_argument("--timeout", type=float, default=300.0)
+    ap.add_argument("--interval", type=float, default=1.0, help="monitor/report bucket in seconds")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write the report as JSON")
+    args = ap.parse_args(argv)
+
+    files = sorted(p for p in glob.glob(os.path.join(args.corpus, "*")) if p.lower().endswith(FILE_EXTS))
+    if not files:
+        print(f"No documents in {args.corpus}")
+        return 2
+    rng = random.Random(args.seed)
+    rec = Recorder()
+    stop = threading.Event()
+    t0 = time.perf_counter()
+    mon = threading.Thread(target=_monitor, args=(args.url, rec, stop, args.interval, t0), daemon=True)
+    mon.start()
+
+    with ThreadPoolExecutor(max_workers=args.max_inflight) as pool:
+        next_t, i = 0.0, 0
+        while next_t < args.duration:
+            delay = next_t - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+            with rec.lock:
+                if rec.inflight >= args.max_inflight:
+                    rec.dropped += 1
+                    busy = True
+                else:
+                    rec.inflight += 1
+                    busy = False
+            if not busy:
+                pool.submit(_send, args.url, files[i % len(files)], args.method, args.timeout, rec, t0)
+            i += 1
+            next_t += rng.expovariate(args.rate) if args.poisson else 1.0 / args.rate
+        print(f"Sent {i} arrivals in {args.duration:.0f}s, waiting for in-flight requests...")
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    mon.join()
+
+    out = report(rec, elapsed, args.interval)
+    out["config"] = {k: v for k, v in vars(args).items() if k != "out"}
+    print(f"requests {out['requests']}  throughput {out['throughput_rps']} rps  error rate {out['error_rate']}")
+    print(f"latency p50 {out['latency_ms']['p50']} ms  p99 {out['latency_ms']['p99']} ms  "
+          f"health p99 {out['health_latency_ms']['p99']} ms  statuses {out['statuses']}")
+    print(f"{'t':>6} {'rps':>6} {'p50':>8} {'p99':>8} {'err':>4} {'health':>8} {'cpu%':>6} {'rss MB':>7}")
+    for r in out["timeline"]:
+        print(f"{r['t']:>6} {r['rps']:>6} {str(r['p50_ms']):>8} {str(r['p99_ms']):>8} {r['errors']:>4} "
+              f"{str(r['health_ms']):>8} {str(r.get('cpu_pct', '')):>6} {str(r.get('rss_mb', '')):>7}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Lokální falešný OpenAI-kompatibilní server (POST /v1/chat/completions) pro zátěžové testy.
+
+Umí simulovat latenci, chyby (HTTP 500) a rate limit (HTTP 429 s Retry-After).
+Backend na něj nasměruješ přes proměnné prostředí:
+
+    python scripts/mock_openai.py --port 8089 --latency-ms 800 --jitter-ms 300 --error-rate 0.02 --rate-limit 20
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8089/v1 uvicorn backend.app:app
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.capacity = rate, max(1.0, burst)
+        self.tokens, self.stamp = self.capacity, time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def _answer(prompt: str) -> dict:
+    """Cheap, plausible extraction answer derived from the prompt text."""
+    def find(rx):
+        m = re.search(rx, prompt, re.I)
+        return m.group(1) if m else None
+
+    return {
+        "variabilni_symbol": find(r"(?:variabiln\w* symbol|VS)[:\s]+(\d{4,12})"),
+        "datum_vystaveni": find(r"(?:vystaven\w*|issue date)[:\s]+([0-9./\-]{8,10})"),
+        "datum_splatnosti": find(r"(?:splatnost\w*|due date)[:\s]+([0-9./\-]{8,10})"),
+        "duzp": None,
+        "castka_bez_dph": None,
+        "dph": None,
+        "castka_s_dph": find(r"(?:k úhradě|celkem|amount due)[:\s]+([0-9 .,]+)"),
+        "dodavatel": {"nazev": None, "ico": find(r"I[ČC]O?[:\s]+(\d{8})"), "dic": None, "adresa": None},
+        "mena": "CZK",
+        "platba_zpusob": None,
+        "banka_prijemce": None,
+        "ucet_prijemce": None,
+        "confidence": 0.7,
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "mock-openai/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, body: dict, headers=None):
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            return self._send(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        if self.path == "/stats":
+            return self._send(200, self.server.stats())
+        self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length) if length else b""
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": "not found"}})
+        srv = self.server
+        srv.count("requests")
+        if srv.bucket and not srv.bucket.take():
+            srv.count("rate_limited")
+            return self._send(429, {"error": {"message": "Rate limit reached", "type": "requests",
+                                              "code": "rate_limit_exceeded"}},
+                              {"Retry-After": f"{srv.retry_after:g}"})
+        delay = max(0.0, random.gauss(srv.latency, srv.jitter)) if srv.jitter else srv.latency
+        time.sleep(delay)
+        if srv.error_rate and random.random() < srv.error_rate:
+            srv.count("errors")
+            return self._send(500, {"error": {"message": "Injected failure", "type": "server_error"}})
+        try:
+            req = json.loads(payload or b"{}")
+        except ValueError:
+            return self._send(400, {"error": {"message": "invalid JSON"}})
+        prompt = "\n".join(str(m.get("content", "")) for m in req.get("messages", []))
+        content = json.dumps(_answer(prompt), ensure_ascii=False)
+        srv.count("ok")
+        self._send(200, {
+            "id": f"chatcmpl-mock-{random.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=0.0, burst=None,
+                 retry_after=1.0, verbose=False):
+        super().__init__(addr, Handler)
+        self.latency, self.jitter, self.error_rate = latency, jitter, error_rate
+        self.bucket = TokenBucket(rate_limit, burst or rate_limit) if rate_limit else None
+        self.retry_after, self.verbose = retry_after, verbose
+        self._counts, self._lock = {}, threading.Lock()
+
+    def count(self, key):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fake OpenAI chat-completions server.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency-ms", type=float, default=500.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="std. deviation of the latency")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="requests/s before answering 429 (0 = off)")
+    ap.add_argument("--burst", type=float, help="token bucket size (default = rate limit)")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+
+    srv = MockServer((args.host, args.port), args.latency_ms / 1000.0, args.jitter_ms / 1000.0,
+                     args.error_rate, args.rate_limit, args.burst, args.retry_after, args.verbose)
+    print(f"Mock OpenAI listening on http://{args.host}:{args.port}/v1")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("stats:", srv.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test dávkové (vektorové) validace a dopočtu částek – výsledky musí být shodné se skalárními funkcemi
+"""
+
+import copy
+import random
+import sys
+sys.path.append('backend')
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from extractors import batch
+from extractors.validate import validate_extraction
+from extractors.postprocess import autofill_amounts
+
+def _amount(rng):
+    r = rng.random()
+    if r < 0.15:
+        return None
+    if r < 0.45:
+        return round(rng.uniform(-100, 200000), rng.choice([0, 1, 2]))
+    if r < 0.55:
+        return rng.uniform(0, 5000)  # více desetinných míst
+    if r < 0.62:
+        return rng.randrange(0, 10 ** 7)
+    if r < 0.7:
+        return rng.choice([0.005, 0.015, 1.005, 2.675, 1e20, float("nan"), True, "", "abc"])
+    v = rng.uniform(0, 100000)
+    return rng.choice([f"{v:,.2f}".replace(",", " ").replace(".", ","), f"{v:.2f} Kč", f"{int(v)} CZK", f"{v:.3f}"])
+
+def _ico(rng):
+    base = [rng.randrange(10) for _ in range(7)]
+    s = sum(d * (8 - i) for i, d in enumerate(base)) % 11
+    check = {0: 1, 1: 0, 10: 1}.get(s, 11 - s)
+    ico = "".join(map(str, base)) + str(check if rng.random() < 0.7 else rng.randrange(10))
+    return rng.choice([ico, ico, f"{ico[:4]} {ico[4:]}", "IČO " + ico, int(ico), ico[:7], None, "", "٢٧٠٨٢٤٤٠", "x" * 40])
+
+def _vs(rng):
+    d = str(rng.randrange(10 ** rng.randrange(1, 14)))
+    return rng.choice([d, d, f"VS {d}", f"vs{d}", f"  {d} ", "AB" + d[:6], "ab12", "Variabilní symbol: " + d,
+                       "12-34", None, "", int(d), "1", "V1234"])
+
+def _dic(rng):
+    return rng.choice(["CZ27082440", "cz27082440", "CZ12345", "SK2020123456", " CZ27082440 ", "DE123456789",
+                       "CZ 27082440", "ČZ27082440", None, "", "12345678901", "CZ1234567890123"])
+
+def _records(n, seed=7):
+    rng = random.Random(seed)
+    return [{"variabilni_symbol": _vs(rng), "castka_bez_dph": _amount(rng), "dph": _amount(rng),
+             "castka_s_dph": _amount(rng), "dodavatel": {"ico": _ico(rng), "dic": _dic(rng)}}
+            for _ in range(n)]
+
+def _same(a, b):
+    return a == b or (a != a and b != b)  # NaN
+
+def test_validate_equivalence():
+    """Náhodné záznamy: dávková validace == validate_extraction"""
+    recs = _records(5000)
+    expected = [validate_extraction(r) for r in recs]
+    got = batch.validate_records(recs)
+    for r, e, g in zip(recs, expected, got):
+        assert e == g, (r, e, g)
+
+def test_autofill_equivalence():
+    """Náhodné záznamy: dávkový dopočet == autofill_amounts"""
+    recs = _records(5000, seed=11)
+    expected = [autofill_amounts(copy.deepcopy(r)) for r in recs]
+    got = batch.autofill_records(copy.deepcopy(recs))
+    for r, e, g in zip(recs, expected, got):
+        for k in batch.AMOUNT_FIELDS + ("_computed",):
+            assert _same(e.get(k), g.get(k)), (k, r, e, g)
+
+def test_numpy_columns():
+    """Sloupce jako NumPy pole (float s NaN = None)"""
+    cols = {"castka_bez_dph": np.array([100.0, np.nan, 100.0]), "dph": np.array([21.0, 21.0, np.nan]),
+            "castka_s_dph": np.array([np.nan, 121.0, 100.0])}
+    out = batch.autofill_columns(cols)
+    assert out["castka_s_dph"][0] == 121.0 and out["castka_bez_dph"][1] == 100.0
+    assert np.isnan(out["dph"][2]) and not out["computed_dph"][2]  # osvobozeno od DPH
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test sloupcového exportu (Parquet / Arrow) – vyžaduje pyarrow
+"""
+
+import io
+import sys
+sys.path.append('backend')
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq
+import columnar
+
+RECORDS = [
+    {"filename": f"f{i}.pdf", "method": "heuristic",
+     "data": {"variabilni_symbol": str(i), "datum_vystaveni": "2025-06-12", "castka_s_dph": 100.0 + i,
+              "dodavatel": {"nazev": "Dodavatel", "ico": "27082440"},
+              "_computed": {"castka_bez_dph": False, "dph": True, "castka_s_dph": False}},
+     "validations": {"ico": True, "sum_check": None},
+     "timings": {"total_ms": 12.5, "stages": {"tesseract": {"ms": 8.0, "calls": 2}, "heuristics": {"ms": 1.0, "calls": 1}}}}
+    for i in range(25)
+]
+
+def test_parquet_row_groups_and_types():
+    """Typované sloupce a zápis po row groupách"""
+    buf = io.BytesIO()
+    rows = columnar.write_parquet(iter(RECORDS), buf, row_group_size=10)
+    assert rows == 25
+    f = pq.ParquetFile(io.BytesIO(buf.getvalue()))
+    assert f.metadata.num_row_groups == 3
+    t = f.read()
+    assert t.schema.field("datum_vystaveni").type == pa.date32()
+    assert t.schema.field("castka_s_dph").type == pa.float64()
+    row = t.slice(0, 1).to_pylist()[0]
+    print(f"  {row}")
+    assert row["dodavatel_ico"] == "27082440"
+    assert row["computed_dph"] is True and row["valid_sum_check"] is None
+    assert row["timing_tesseract_ms"] == 8.0 and row["tesseract_calls"] == 2
+
+def test_stage_columns_from_timings():
+    """Sloupce časů odpovídají zaznamenaným fázím, i nově přidaným"""
+    recs = [dict(RECORDS[0], timings={"total_ms": 5.0, "stages": {"deskew": {"ms": 1.5, "calls": 1}}}),
+            dict(RECORDS[1], timings={"total_ms": 6.0, "stages": {"items": {"ms": 2.0, "calls": 1}}})]
+    assert columnar.timing_stages(recs) == ["deskew", "items"]
+    t = pq.read_table(io.BytesIO(b"".join(columnar.iter_parquet(recs))))
+    assert t.column("timing_deskew_ms").to_pylist() == [1.5, None]
+    assert t.column("timing_items_ms").to_pylist() == [None, 2.0]
+    assert "timing_llm_ms" not in t.column_names
+    # Proud záznamů: fáze z první row groupy, případně předané explicitně
+    t = pa.ipc.open_stream(b"".join(columnar.iter_arrow(iter(recs), row_group_size=1))).read_all()
+    assert "timing_deskew_ms" in t.column_names and "timing_items_ms" not in t.column_names
+    buf = io.BytesIO()
+    columnar.write_parquet(iter(recs), buf, row_group_size=1, stages=columnar.timing_stages(recs))
+    assert pq.read_table(io.BytesIO(buf.getvalue())).column("timing_items_ms").to_pylist() == [None, 2.0]
+
+def test_empty_export_has_schema():
+    """Prázdná dávka dá platný soubor se základními sloupci"""
+    t = pq.read_table(io.BytesIO(b"".join(columnar.iter_parquet([]))))
+    assert t.num_rows == 0 and "castka_s_dph" in t.column_names
+
+def test_timings_long_format():
+    """Časy fází jako samostatná tabulka (dokument × fáze)"""
+    buf = io.BytesIO()
+    assert columnar.write_timings_parquet(RECORDS, buf) == 50
+    t = pq.read_table(io.BytesIO(buf.getvalue()))
+    assert set(t.column("stage").to_pylist()) == {"tesseract", "heuristics"}
+
+def test_arrow_stream():
+    """Arrow IPC stream jde přečíst zpět"""
+    data = b"".join(columnar.iter_arrow(RECORDS, row_group_size=10))
+    t = pa.ipc.open_stream(data).read_all()
+    assert t.num_rows == 25
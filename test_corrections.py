@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test datově řízených oprav OCR (Aho-Corasick, jeden průchod textem)
+"""
+
+import os
+import sys
+import json
+import tempfile
+sys.path.append('backend')
+
+from extractors import corrections
+from extractors.corrections import CorrectionEngine, Rule
+from extractors.utils import fix_czech_chars
+
+def test_single_pass_longest_match():
+    """Nejdelší shoda zleva, bez kaskády náhrad"""
+    eng = CorrectionEngine([Rule("s.r.o", "s.r.o."), Rule("s.r.o.", "s.r.o."), Rule("ab", "b"), Rule("b", "c")])
+    assert eng.apply("Firma s.r.o") == "Firma s.r.o."
+    assert eng.apply("Firma s.r.o.") == "Firma s.r.o."
+    # "ab" -> "b" se už znovu nepřepisuje na "c"
+    assert eng.apply("ab b") == "b c"
+
+def test_word_and_case_rules():
+    """Pravidla word a case z datového souboru"""
+    eng = CorrectionEngine([Rule("kc", "kč", word=True, case="preserve"),
+                            Rule("prevodem", "převodem", case="preserve"),
+                            Rule("bankovní převod", "peněžní převod", case="ignore"),
+                            Rule("Novak", "Novák")])
+    assert eng.apply("100 Kc, 5 KC, 1 kc") == "100 Kč, 5 KČ, 1 kč"
+    assert eng.apply("Lukcova") == "Lukcova"
+    assert eng.apply("PREVODEM Prevodem") == "PŘEVODEM Převodem"
+    assert eng.apply("Bankovní převod") == "peněžní převod"
+    assert eng.apply("NOVAK novak") == "NOVAK novak"
+
+def test_supplier_scope():
+    """Dodavatelská pravidla platí jen pro dané IČO a mají přednost před globálními"""
+    eng = CorrectionEngine([Rule("Aiza", "Alza", ico="27082440"), Rule("Aiza", "Aila")])
+    assert eng.apply("Aiza.cz", "27082440") == "Alza.cz"
+    assert eng.apply("Aiza.cz") == "Aila.cz"
+
+def test_learned_rules():
+    """Naučená oprava se uloží a projeví po přestavbě automatu"""
+    path = os.path.join(tempfile.mkdtemp(), "learned.jsonl")
+    os.environ["CORRECTIONS_LEARNED"] = path
+    try:
+        corrections.reload()
+        assert fix_czech_chars("Dodavatel Hrdlicka") == "Dodavatel Hrdlicka"
+        corrections.learn("Hrdlicka", "Hrdlička")
+        with open(path, encoding="utf-8") as f:
+            assert json.loads(f.readline())["to"] == "Hrdlička"
+        assert fix_czech_chars("Dodavatel Hrdlicka") == "Dodavatel Hrdlička"
+    finally:
+        del os.environ["CORRECTIONS_LEARNED"]
+        corrections.reload()
+
+def test_postprocess_applies_supplier_rules():
+    """Společný postprocess opraví textová pole i mimo LLM, dodavatelská pravidla podle IČO"""
+    from extractors.postprocess import fix_text_fields
+    path = os.path.join(tempfile.mkdtemp(), "learned.jsonl")
+    os.environ["CORRECTIONS_LEARNED"] = path
+    try:
+        corrections.reload()
+        corrections.learn("Hrdlicka", "Hrdlička", ico="27082440")
+        data = {"dodavatel": {"nazev": "Hrdlicka a syn", "ico": "27082440", "adresa": "Pizen"},
+                "banka_prijemce": "Komeréni banka"}
+        out = fix_text_fields(data)
+        assert out["dodavatel"]["nazev"] == "Hrdlička a syn"
+        assert out["dodavatel"]["adresa"] == "Plzeň"
+        assert out["banka_prijemce"] == "Komerční banka"
+        other = fix_text_fields({"dodavatel": {"nazev": "Hrdlicka a syn", "ico": "12345678"}})
+        assert other["dodavatel"]["nazev"] == "Hrdlicka a syn"
+    finally:
+        del os.environ["CORRECTIONS_LEARNED"]
+        corrections.reload()
+
+def test_learning_needs_token():
+    """Učení oprav vyžaduje CORRECTIONS_TOKEN; bez nastaveného tokenu je vypnuté"""
+    saved = os.environ.pop("CORRECTIONS_TOKEN", None)
+    try:
+        assert not corrections.token_ok("cokoliv") and not corrections.token_ok(None)
+        os.environ["CORRECTIONS_TOKEN"] = "tajne"
+        assert corrections.token_ok("tajne")
+        assert not corrections.token_ok("tajn") and not corrections.token_ok(None)
+    finally:
+        os.environ.pop("CORRECTIONS_TOKEN", None)
+        if saved is not None:
+            os.environ["CORRECTIONS_TOKEN"] = saved
+
+def test_learned_path_is_persistent():
+    """Naučená pravidla se bez CORRECTIONS_LEARNED ukládají do data/, ne do dočasného adresáře"""
+    saved = os.environ.pop("CORRECTIONS_LEARNED", None)
+    try:
+        path = corrections.learned_path()
+        assert path.endswith(os.path.join("data", "corrections_learned.jsonl"))
+        assert not path.startswith(tempfile.gettempdir())
+    finally:
+        if saved is not None:
+            os.environ["CORRECTIONS_LEARNED"] = saved
+
+def test_fix_czech_chars_compat():
+    """Původní příklady dávají stejný výsledek"""
+    assert fix_czech_chars("Komeréni banka, a.s.") == "Komerční banka, a.s."
+    assert fix_czech_chars("Novak, Pizen.") == "Novák, Plzeň."
+    assert fix_czech_chars("CreativeSpark Design") == "CreativeSpark Design s.r.o."
+    assert fix_czech_chars("CreativeSpark Design s.r.o..") == "CreativeSpark Design s.r.o."
+    assert fix_czech_chars("Ceska sporitelna, a.s.") == "Česká spořitelna, a.s."
+    assert fix_czech_chars("Aiza.cz a.s.", "27082440") == "Alza.cz a.s."
+    assert fix_czech_chars(None) is None
+
+def test_many_rules():
+    """Automat zvládne desítky tisíc pravidel"""
+    eng = CorrectionEngine([Rule(f"slovo{i}x", f"slovo{i}") for i in range(20000)])
+    assert eng.apply("a slovo123x b slovo19999x") == "a slovo123 b slovo19999"
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Test časového rozpočtu požadavku (X-Deadline-Ms / REQUEST_DEADLINE_MS)
+"""
+
+import sys
+import time
+sys.path.append('backend')
+
+import pytest
+
+from extractors import deadline
+
+def test_budget():
+    """timeout() vrací zbývající čas (nejvýš cap), po vypršení vyvolá Expired"""
+    assert deadline.remaining() is None and deadline.timeout(60) == 60
+    with deadline.track(0):
+        assert deadline.current() is None
+    with deadline.track(50):
+        assert 0 < deadline.timeout(60) <= 0.05
+        assert deadline.timeout(0.01) == 0.01
+        time.sleep(0.06)
+        with pytest.raises(deadline.Expired):
+            deadline.timeout(60)
+        with pytest.raises(deadline.Expired):
+            deadline.check()
+        assert not deadline.is_partial()
+        deadline.mark_partial("ocr")
+        assert deadline.is_partial() and deadline.current().skipped == ["ocr"]
+    assert not deadline.is_partial()
+
+def test_pdf_pages_partial():
+    """Po vypršení rozpočtu se další stránky PDF nečtou a výsledek je označen jako částečný"""
+    pytest.importorskip("pdfplumber")
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    import io
+    from extractors import ocr
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for i in range(3):
+        c.drawString(50, 800, f"Faktura {i + 1}")
+        c.showPage()
+    c.save()
+    assert len(ocr.extract_pages_from_file("a.pdf", buf.getvalue())) == 3
+    with deadline.track(1):
+        time.sleep(0.01)
+        assert ocr.extract_pages_from_file("a.pdf", buf.getvalue()) == []
+        assert deadline.is_partial()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test indexu duplicit (shodný soubor, MinHash podobnost OCR textu, klíč IČO/VS/částka/datum)
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('backend')
+
+from extractors import dedup
+
+TEXT = """Faktura - daňový doklad č. 2024001234
+Dodavatel: Alza.cz a.s., Jankovcova 1522/53, 170 00 Praha 7, IČO: 27082440, DIČ: CZ27082440
+Variabilní symbol: 2024001234  Datum vystavení: 12.06.2025  Datum splatnosti: 26.06.2025
+Položky: Notebook Lenovo ThinkPad 1 ks 24 990,00 Kč; Myš Logitech 2 ks 1 198,00 Kč
+Základ daně: 21 643,80 Kč  DPH 21 %: 4 544,20 Kč  Celkem k úhradě: 26 188,00 Kč
+"""
+# Stejný doklad z fotky: OCR chyby, jiné zalomení řádků
+SCAN = TEXT.replace("č.", "c.").replace("Jankovcova", "Jankovc0va").replace("\n", " ").replace("Kč", "Kc")
+OTHER = """Faktura 2025000777 Dodavatel: ČEZ, a. s., Duhová 2/1444, 140 53 Praha 4 IČO 45274649
+Elektřina za období 05/2025, spotřeba 312 kWh, k úhradě 2 431,00 Kč, splatnost 15.06.2025"""
+
+DATA = {"variabilni_symbol": "2024001234", "datum_vystaveni": "2025-06-12", "castka_s_dph": 26188.0,
+        "dodavatel": {"ico": "27082440"}}
+
+def test_signature_similarity():
+    """Naskenovaná kopie je podobná, jiná faktura ne"""
+    sig = dedup.signature(TEXT)
+    near = dedup.similarity(sig, dedup.signature(SCAN))
+    far = dedup.similarity(sig, dedup.signature(OTHER))
+    print(f"  near={near:.2f} far={far:.2f}")
+    assert near >= dedup.THRESHOLD
+    assert far < 0.3
+
+def test_index_matches():
+    """Hledání podle souboru, podobnosti a klíče"""
+    index = dedup.DedupIndex(os.path.join(tempfile.mkdtemp(), "dedup.sqlite"))
+    doc_id = index.add("a.pdf", dedup.sha256(b"pdf"), dedup.signature(TEXT), DATA, "template", {"ico": True})
+    index.add("b.pdf", dedup.sha256(b"other"), dedup.signature(OTHER), {}, "heuristic", {})
+
+    assert index.find_file(dedup.sha256(b"pdf"))["of"] == doc_id
+    near = index.find_similar(dedup.signature(SCAN), SCAN)
+    assert near["match"] == "near" and near["of"] == doc_id
+    assert near["_result"]["data"]["variabilni_symbol"] == "2024001234"
+    assert index.find_similar(dedup.signature("Úplně jiný dokument bez podobnosti " * 3), "") is None
+    assert index.find_key(dict(DATA))["of"] == doc_id
+    assert "_result" not in dedup.public(near)
+    index.close()
+
+def test_same_layout_other_invoice_not_matched():
+    """Další faktura téhož dodavatele (jiný VS, data a částky) je textově podobná, ale není duplikát"""
+    nxt = (TEXT.replace("2024001234", "2024001301").replace("12.06.2025", "12.07.2025")
+           .replace("26.06.2025", "26.07.2025").replace("21 643,80", "21 652,07")
+           .replace("4 544,20", "4 546,93").replace("26 188,00", "26 199,00"))
+    assert dedup.similarity(dedup.signature(TEXT), dedup.signature(nxt)) >= dedup.THRESHOLD
+    index = dedup.DedupIndex(os.path.join(tempfile.mkdtemp(), "dedup.sqlite"))
+    index.add("a.pdf", dedup.sha256(b"pdf"), dedup.signature(TEXT), DATA, "template", {})
+    assert index.find_similar(dedup.signature(nxt), nxt) is None
+    assert index.find_similar(dedup.signature(TEXT), TEXT)["match"] == "near"
+    assert not dedup.confirms({"data": {"variabilni_symbol": "2024001234"}}, TEXT)
+    index.close()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test strukturovaných e-faktur (ISDOC, ZUGFeRD/Factur-X) včetně přílohy v PDF
+"""
+
+import sys
+import zlib
+sys.path.append('backend')
+
+from export import to_isdoc
+from extractors import einvoice
+
+DATA = {
+    "variabilni_symbol": "2024001234", "datum_vystaveni": "2025-06-12", "datum_splatnosti": "2025-06-26",
+    "duzp": "2025-06-12", "castka_bez_dph": 10000.0, "dph": 2100.0, "castka_s_dph": 12100.0,
+    "dodavatel": {"nazev": "Alza.cz a.s.", "ico": "27082440", "dic": "CZ27082440",
+                  "adresa": "Jankovcova 1522/53, 170 00 Praha 7"},
+    "mena": "CZK", "platba_zpusob": "převodem", "banka_prijemce": "ČSOB", "ucet_prijemce": "123456789/0300",
+}
+
+CII = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rsm:CrossIndustryInvoice xmlns:rsm="urn:un:unece:uncefact:data:standard:CrossIndustryInvoice:100"
+    xmlns:ram="urn:un:unece:uncefact:data:standard:ReusableAggregateBusinessInformationEntity:100"
+    xmlns:udt="urn:un:unece:uncefact:data:standard:UnqualifiedDataType:100">
+  <rsm:ExchangedDocument><ram:ID>FV-2025-17</ram:ID>
+    <ram:IssueDateTime><udt:DateTimeString format="102">20250612</udt:DateTimeString></ram:IssueDateTime>
+  </rsm:ExchangedDocument>
+  <rsm:SupplyChainTradeTransaction>
+    <ram:IncludedSupplyChainTradeLineItem><ram:AssociatedDocumentLineDocument><ram:LineID>1</ram:LineID></ram:AssociatedDocumentLineDocument></ram:IncludedSupplyChainTradeLineItem>
+    <ram:ApplicableHeaderTradeAgreement><ram:SellerTradeParty><ram:Name>Muster GmbH</ram:Name>
+      <ram:PostalTradeAddress><ram:PostcodeCode>10115</ram:PostcodeCode><ram:LineOne>Hauptstr. 1</ram:LineOne><ram:CityName>Berlin</ram:CityName></ram:PostalTradeAddress>
+      <ram:SpecifiedTaxRegistration><ram:ID schemeID="VA">DE123456789</ram:ID></ram:SpecifiedTaxRegistration>
+    </ram:SellerTradeParty></ram:ApplicableHeaderTradeAgreement>
+    <ram:ApplicableHeaderTradeSettlement>
+      <ram:PaymentReference>FV-2025-17</ram:PaymentReference>
+      <ram:InvoiceCurrencyCode>EUR</ram:InvoiceCurrencyCode>
+      <ram:SpecifiedTradeSettlementPaymentMeans><ram:TypeCode>58</ram:TypeCode>
+        <ram:PayeePartyCreditorFinancialAccount><ram:IBANID>DE02120300000000202051</ram:IBANID></ram:PayeePartyCreditorFinancialAccount>
+      </ram:SpecifiedTradeSettlementPaymentMeans>
+      <ram:SpecifiedTradePaymentTerms><ram:DueDateDateTime><udt:DateTimeString format="102">20250712</udt:DateTimeString></ram:DueDateDateTime></ram:SpecifiedTradePaymentTerms>
+      <ram:SpecifiedTradeSettlementHeaderMonetarySummation>
+        <ram:TaxBasisTotalAmount>100.00</ram:TaxBasisTotalAmount><ram:TaxTotalAmount currencyID="EUR">19.00</ram:TaxTotalAmount>
+        <ram:GrandTotalAmount>119.00</ram:GrandTotalAmount>
+      </ram:SpecifiedTradeSettlementHeaderMonetarySummation>
+    </ram:ApplicableHeaderTradeSettlement>
+  </rsm:SupplyChainTradeTransaction>
+</rsm:CrossIndustryInvoice>"""
+
+def _pdf_with_attachment(name, payload):
+    """Minimální PDF s přílohou v EmbeddedFiles (bez obsahu stránky)."""
+    stream = zlib.compress(payload)
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R /Names << /EmbeddedFiles << /Names [(%s) 4 0 R] >> >> >>" % name.encode(),
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] >>",
+        b"<< /Type /Filespec /F (%s) /UF (%s) /EF << /F 5 0 R >> >>" % (name.encode(), name.encode()),
+        b"<< /Type /EmbeddedFile /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ]
+    out, offsets = bytearray(b"%PDF-1.7\n"), []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+def test_isdoc_roundtrip():
+    """ISDOC z exportu se načte zpět do stejných hodnot"""
+    r = einvoice.parse_xml(to_isdoc({"filename": "a.pdf", "data": DATA}))
+    assert r["_einvoice"]["format"] == "isdoc"
+    for k in ("variabilni_symbol", "datum_vystaveni", "datum_splatnosti", "duzp", "castka_bez_dph", "dph",
+              "castka_s_dph", "mena", "banka_prijemce", "ucet_prijemce"):
+        assert r[k] == DATA[k], k
+    assert r["dodavatel"]["ico"] == "27082440" and r["dodavatel"]["dic"] == "CZ27082440"
+    assert r["dodavatel"]["adresa"] == "Jankovcova 1522/53, 17000 Praha 7"
+
+def test_cii():
+    """ZUGFeRD / Factur-X (CII)"""
+    r = einvoice.parse_xml(CII)
+    assert r["_einvoice"] == {"format": "zugferd", "id": "FV-2025-17"}
+    assert (r["datum_vystaveni"], r["datum_splatnosti"]) == ("2025-06-12", "2025-07-12")
+    assert (r["castka_bez_dph"], r["dph"], r["castka_s_dph"], r["mena"]) == (100.0, 19.0, 119.0, "EUR")
+    assert r["dodavatel"] == {"nazev": "Muster GmbH", "ico": None, "dic": "DE123456789", "adresa": "Hauptstr. 1, 10115 Berlin"}
+    assert r["ucet_prijemce"] == "DE02120300000000202051"
+    assert r["variabilni_symbol"] is None  # not a numeric reference
+
+def test_pdf_attachment():
+    """Příloha v PDF se najde a naparsuje; PDF bez přílohy vrací None"""
+    pdf = _pdf_with_attachment("faktura.isdoc", to_isdoc({"filename": "a.pdf", "data": DATA}))
+    r = einvoice.extract("faktura.pdf", pdf)
+    assert r["castka_s_dph"] == 12100.0 and r["_einvoice"]["attachment"] == "faktura.isdoc"
+    assert einvoice.extract("factur-x.pdf", _pdf_with_attachment("factur-x.xml", CII))["mena"] == "EUR"
+    assert einvoice.extract("x.pdf", _pdf_with_attachment("notes.txt", b"hello")) is None
+    assert einvoice.extract("faktura.jpg", b"\xff\xd8") is None
+
+def test_rejects_non_invoice_and_dtd():
+    """Jiné XML a dokumenty s DTD se ignorují"""
+    assert einvoice.parse_xml(b"<html><body/></html>") is None
+    assert einvoice.parse_xml(b"<?xml version='1.0'?><!DOCTYPE x [<!ENTITY a 'b'>]><Invoice/>") is None
+    assert einvoice.parse_xml(b"<Invoice><ID>1") is None
+
+def test_rejects_late_dtd():
+    """DTD za dlouhým komentářem se také odmítne"""
+    xml = b"<?xml version='1.0'?>" + b"<!--" + b" " * 10000 + b"-->" + b"<!DOCTYPE Invoice [<!ENTITY a 'b'>]><Invoice><ID>&a;</ID></Invoice>"
+    assert einvoice.parse_xml(xml) is None
+
+def test_attachment_size_limit():
+    """Příloha, která se rozbalí nad MAX_XML_BYTES, se nenačte celá"""
+    xml = to_isdoc({"filename": "a.pdf", "data": DATA})
+    pdf = _pdf_with_attachment("faktura.isdoc", xml + b"<!--" + b" " * 200000 + b"-->")
+    old = einvoice.MAX_XML_BYTES
+    einvoice.MAX_XML_BYTES = 100000
+    try:
+        assert einvoice.extract("faktura.pdf", pdf) is None
+    finally:
+        einvoice.MAX_XML_BYTES = old
+    assert einvoice.extract("faktura.pdf", pdf)["castka_s_dph"] == 12100.0
+
+def test_isdoc_foreign_currency():
+    """ISDOC v cizí měně vrací ForeignCurrencyCode a částky *Curr"""
+    data = dict(DATA, mena="EUR", castka_bez_dph=400.0, dph=84.0, castka_s_dph=484.0, kurz=25.0)
+    xml = to_isdoc({"filename": "a.pdf", "data": data})
+    assert b"<ForeignCurrencyCode>EUR</ForeignCurrencyCode>" in xml
+    r = einvoice.parse_xml(xml)
+    assert (r["mena"], r["castka_bez_dph"], r["dph"], r["castka_s_dph"]) == ("EUR", 400.0, 84.0, 484.0)
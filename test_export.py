@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Test hromadného exportu (jeden řádek = jedna faktura)
+"""
+
+import io
+import os
+import csv
+import json
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+import pytest
+sys.path.append('backend')
+
+import export
+
+RECORDS = [
+    {"filename": f"f{i}.pdf", "method": "template",
+     "data": {"variabilni_symbol": str(2024000 + i), "castka_s_dph": 1210.0 + i, "mena": "CZK",
+              "dodavatel": {"nazev": "Příklad s.r.o.", "ico": "27082440"}},
+     "validations": {"ico": True}}
+    for i in range(1234)
+]
+
+def test_bulk_csv_streams_in_chunks():
+    """CSV vychází po částech a má jeden řádek na fakturu"""
+    chunks = list(export.iter_csv(iter(RECORDS)))
+    assert len(chunks) > 1
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    print(f"  {len(chunks)} chunks, {len(rows)} rows")
+    assert rows[0] == [name for name, _ in export.COLUMNS]
+    assert len(rows) == len(RECORDS) + 1
+    header = rows[0]
+    assert rows[1][header.index("dodavatel_nazev")] == "Příklad s.r.o."
+    assert rows[1][header.index("valid_ico")] == "True"
+
+def test_bulk_jsonl_and_bare_data():
+    """JSONL zachová záznamy, holý slovník dat se zabalí do {"data": ...}"""
+    out = b"".join(export.iter_jsonl([RECORDS[0], {"variabilni_symbol": "1"}])).decode("utf-8")
+    lines = [json.loads(l) for l in out.splitlines()]
+    assert lines[0]["filename"] == "f0.pdf"
+    assert lines[1] == {"data": {"variabilni_symbol": "1"}}
+
+def test_bulk_xlsx():
+    """XLSX ve write-only režimu jde znovu načíst"""
+    from openpyxl import load_workbook
+    data = b"".join(export.iter_xlsx(iter(RECORDS[:50])))
+    ws = load_workbook(io.BytesIO(data), read_only=True)["Invoices"]
+    rows = list(ws.iter_rows(values_only=True))
+    assert len(rows) == 51
+    assert rows[1][0] == "f0.pdf"
+
+INVOICE = {"filename": "a.pdf", "method": "template", "data": {
+    "variabilni_symbol": "2024001", "datum_vystaveni": "2025-06-12", "duzp": "2025-06-12",
+    "datum_splatnosti": "2025-06-26", "castka_bez_dph": 10000.0, "dph": 2100.0, "castka_s_dph": 12100.0,
+    "mena": "CZK", "platba_zpusob": "převodem", "ucet_prijemce": "123456789/0100",
+    "dodavatel": {"nazev": "A & B s.r.o.", "ico": "27082440", "dic": "CZ27082440",
+                  "adresa": "Hlavní 1, 110 00 Praha 1"}}}
+
+XSD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "xsd")
+XSD = {
+    # (oficiální schéma, stažené scripts/fetch_xsd.py; přiložený výřez se stejnými elementy a typy)
+    "isdoc": ("isdoc-invoice-6.0.2.xsd", "isdoc-invoice-6.0.2-subset.xsd"),
+    "pohoda": (os.path.join("pohoda", "official", "data.xsd"), os.path.join("pohoda", "data.xsd")),
+}
+
+def _schema(kind):
+    """XSD z tests/xsd: oficiální, je-li stažené, jinak přiložený výřez"""
+    from lxml import etree  # requirements-dev.txt
+    official, subset = (os.path.join(XSD_DIR, p) for p in XSD[kind])
+    return etree.XMLSchema(etree.parse(official if os.path.exists(official) else subset))
+
+def _xsd_validate(xml_bytes, kind):
+    from lxml import etree
+    _schema(kind).assertValid(etree.fromstring(xml_bytes))
+
+EUR_INVOICE = {**INVOICE, "data": {**INVOICE["data"], "mena": "EUR", "kurz": 25.0, "platba_zpusob": "kartou",
+                                   "castka_bez_dph": 100.0, "dph": 12.0, "castka_s_dph": 112.0}}
+
+def test_isdoc_structure():
+    """ISDOC 6: mapování polí a pořadí hlavních elementů"""
+    ns = {"i": export.ISDOC_NS}
+    root = ET.fromstring(export.to_isdoc(INVOICE))
+    assert root.tag == f"{{{export.ISDOC_NS}}}Invoice"
+    assert root.find("i:ID", ns).text == "2024001"
+    assert root.find("i:AccountingSupplierParty/i:Party/i:PartyIdentification/i:ID", ns).text == "27082440"
+    assert root.find("i:AccountingSupplierParty/i:Party/i:PostalAddress/i:PostalZone", ns).text == "11000"
+    assert root.find("i:LegalMonetaryTotal/i:PayableAmount", ns).text == "12100.00"
+    assert root.find("i:TaxTotal/i:TaxSubTotal/i:TaxCategory/i:Percent", ns).text == "21"
+    details = root.find("i:PaymentMeans/i:Payment/i:Details", ns)
+    assert (details.find("i:ID", ns).text, details.find("i:BankCode", ns).text) == ("123456789", "0100")
+    tags = [c.tag.split("}")[1] for c in root]
+    assert tags.index("IssueDate") < tags.index("AccountingSupplierParty") < tags.index("InvoiceLines") \
+        < tags.index("TaxTotal") < tags.index("LegalMonetaryTotal") < tags.index("PaymentMeans")
+
+def _isdoc_elements_filled(root):
+    """Povinná datová a měnová pole nesmí být prázdná (kontrola bez XSD)"""
+    ns = {"i": export.ISDOC_NS}
+    for path in ("i:IssueDate", "i:LocalCurrencyCode", "i:CurrRate", "i:RefCurrRate",
+                 "i:LegalMonetaryTotal/i:PayableAmount", "i:PaymentMeans/i:Payment/i:Details/i:PaymentDueDate"):
+        el = root.find(path, ns)
+        assert el is not None and (el.text or "").strip(), path
+    assert re.fullmatch(r"\d{4}-\d{2}-\d{2}", root.find("i:IssueDate", ns).text)
+    assert root.find("i:LocalCurrencyCode", ns).text == "CZK"
+
+def test_isdoc_required_fields():
+    """ISDOC bez XSD: vyplněná data, tuzemská měna CZK a ForeignCurrencyCode jen u cizí měny"""
+    ns = {"i": export.ISDOC_NS}
+    root = ET.fromstring(export.to_isdoc(INVOICE))
+    _isdoc_elements_filled(root)
+    assert root.find("i:ForeignCurrencyCode", ns) is None
+    assert root.find("i:CurrRate", ns).text == "1"
+
+def test_isdoc_foreign_currency():
+    """Faktura v EUR: LocalCurrencyCode CZK, ForeignCurrencyCode EUR, kurz a částky v obou měnách"""
+    ns = {"i": export.ISDOC_NS}
+    eur = {**INVOICE, "data": {**INVOICE["data"], "mena": "EUR", "kurz": 25.0,
+                               "castka_bez_dph": 100.0, "dph": 21.0, "castka_s_dph": 121.0}}
+    root = ET.fromstring(export.to_isdoc(eur))
+    _isdoc_elements_filled(root)
+    assert root.find("i:ForeignCurrencyCode", ns).text == "EUR"
+    assert root.find("i:CurrRate", ns).text == "25"
+    total = root.find("i:LegalMonetaryTotal", ns)
+    assert total.find("i:PayableAmount", ns).text == "3025.00"
+    assert total.find("i:PayableAmountCurr", ns).text == "121.00"
+    tags = [c.tag.split("}")[1] for c in total]
+    assert tags.index("PayableAmount") + 1 == tags.index("PayableAmountCurr")
+    line = [c.tag.split("}")[1] for c in root.find("i:InvoiceLines/i:InvoiceLine", ns)]
+    assert line.index("LineExtensionAmountCurr") + 1 == line.index("LineExtensionAmount")
+    # Bez kurzu nelze fakturu v cizí měně převést
+    no_rate = {**eur, "data": {**eur["data"], "kurz": None}}
+    with pytest.raises(export.ExportError):
+        export.to_isdoc(no_rate)
+
+def test_isdoc_missing_date():
+    """Bez data vystavení ISDOC nevznikne; v dávce se záznam vynechá a uvede ve skipped.txt"""
+    undated = {**INVOICE, "filename": "bez_data.pdf",
+               "data": {**INVOICE["data"], "datum_vystaveni": None, "duzp": None}}
+    with pytest.raises(export.ExportError):
+        export.to_isdoc(undated)
+    zf = zipfile.ZipFile(io.BytesIO(b"".join(export.iter_isdoc_zip([INVOICE, undated, INVOICE]))))
+    names = zf.namelist()
+    assert len(names) == 3 and names[-1] == "skipped.txt"
+    assert "bez_data.pdf" in zf.read("skipped.txt").decode("utf-8")
+    for name in names[:-1]:
+        _isdoc_elements_filled(ET.fromstring(zf.read(name)))
+
+def test_isdoc_batch_zip():
+    """Dávka ISDOC = zip s jedním dokladem na fakturu"""
+    zf = zipfile.ZipFile(io.BytesIO(b"".join(export.iter_isdoc_zip([INVOICE] * 3))))
+    assert len(zf.namelist()) == 3
+    ET.fromstring(zf.read(zf.namelist()[0]))
+
+def test_pohoda_requires_ico():
+    """Bez POHODA_ICO export do Pohody selže hned, ne prázdným atributem ico"""
+    saved = os.environ.pop("POHODA_ICO", None)
+    try:
+        with pytest.raises(export.ExportError):
+            export.iter_pohoda([INVOICE])
+        os.environ["POHODA_ICO"] = "12345678"
+        root = ET.fromstring(b"".join(export.iter_pohoda([INVOICE])))
+        assert root.get("ico") == "12345678"
+    finally:
+        os.environ.pop("POHODA_ICO", None)
+        if saved is not None:
+            os.environ["POHODA_ICO"] = saved
+
+def test_pohoda_datapack_streams():
+    """Pohoda data-pack: jeden dataPackItem na fakturu, výstup po částech"""
+    os.environ.setdefault("POHODA_ICO", "12345678")
+    chunks = list(export.iter_pohoda([INVOICE] * 120))
+    assert len(chunks) > 1
+    root = ET.fromstring(b"".join(chunks))
+    dat, inv, typ = (export.POHODA_NS[k] for k in ("dat", "inv", "typ"))
+    items = root.findall(f"{{{dat}}}dataPackItem")
+    assert len(items) == 120
+    header = items[0].find(f"{{{inv}}}invoice/{{{inv}}}invoiceHeader")
+    assert header.find(f"{{{inv}}}symVar").text == "2024001"
+    assert header.find(f"{{{inv}}}partnerIdentity/{{{typ}}}address/{{{typ}}}ico").text == "27082440"
+    summary = items[0].find(f"{{{inv}}}invoice/{{{inv}}}invoiceSummary/{{{inv}}}homeCurrency")
+    assert summary.find(f"{{{typ}}}priceHighSum").text == "12100.00"
+
+def test_isdoc_xsd():
+    """ISDOC proti XSD z tests/xsd (CZK i cizí měna, každý doklad dávky)"""
+    _xsd_validate(export.to_isdoc(INVOICE), "isdoc")
+    _xsd_validate(export.to_isdoc(EUR_INVOICE), "isdoc")
+    zf = zipfile.ZipFile(io.BytesIO(b"".join(export.iter_isdoc_zip([INVOICE, EUR_INVOICE]))))
+    for name in zf.namelist():
+        _xsd_validate(zf.read(name), "isdoc")
+
+def test_isdoc_xsd_rejects_broken():
+    """Schéma opravdu kontroluje: prázdné datum vystavení neprojde"""
+    from lxml import etree
+    root = etree.fromstring(export.to_isdoc(INVOICE))
+    root.find(f"{{{export.ISDOC_NS}}}IssueDate").text = ""
+    assert not _schema("isdoc").validate(root)
+
+def test_pohoda_xsd():
+    """Pohoda data-pack proti XSD z tests/xsd (sazby 21 %, 12 %, bez DPH a cizí měna)"""
+    os.environ.setdefault("POHODA_ICO", "12345678")
+    exempt = {**INVOICE, "data": {**INVOICE["data"], "castka_bez_dph": 500.0, "dph": 0.0, "castka_s_dph": 500.0}}
+    _xsd_validate(b"".join(export.iter_pohoda([INVOICE, EUR_INVOICE, exempt])), "pohoda")
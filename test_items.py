@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test extrakce položek faktury z geometrie slov (PDF i OCR boxy) a kontroly součtu
+"""
+
+import io
+import sys
+sys.path.append('backend')
+
+import pytest
+
+from extractors import items
+
+W = items.Word
+
+def _line(y, *cells, h=10):
+    """Řádek slov: cells = (x, text), text se rozdělí na slova jako u pdfplumberu."""
+    words = []
+    for x, text in cells:
+        for part in text.split():
+            words.append(W(part, x, x + 6 * len(part), y, y + h))
+            x += 6 * len(part) + 3
+    return words
+
+def _pdf(rows, per_page=40):
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    cols = [50, 280, 340, 420, 480]
+    for start in range(0, len(rows), per_page):
+        c.setFont("Helvetica", 9)
+        c.drawString(50, 800, "Faktura 2024001")
+        for x, h in zip(cols, ["Popis", "Mnozstvi", "Cena/MJ", "DPH %", "Celkem"]):
+            c.drawString(x, 770, h)
+        y = 755
+        for desc, qty, price, total in rows[start:start + per_page]:
+            for x, v in zip(cols, [desc, str(qty), f"{price:,.2f} Kc".replace(",", " ").replace(".", ","), "21",
+                                   f"{total:,.2f} Kc".replace(",", " ").replace(".", ",")]):
+                c.drawString(x, y, v)
+            y -= 13
+        if start + per_page >= len(rows):
+            c.drawString(320, y - 20, "Zaklad dane: %.2f Kc" % sum(r[3] for r in rows))
+            c.drawString(320, y - 34, "Celkem k uhrade 99,00 Kc")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+def test_pdf_rows_across_pages():
+    """Řádky tabulky přes několik stran (hlavička se opakuje) vyjdou všechny a součet sedí"""
+    pytest.importorskip("pdfplumber")
+    rows = [(f"Sluzba {i}", i % 7 + 1, 100.0 + i, round((i % 7 + 1) * (100.0 + i), 2)) for i in range(95)]
+    tally = items.Tally(items.iter_items("faktura.pdf", _pdf(rows)))
+    got = list(tally)
+    assert len(got) == 95
+    assert got[0] == {"popis": "Sluzba 0", "mnozstvi": 1.0, "jednotka": None, "cena_za_jednotku": 100.0,
+                      "sazba_dph": 21.0, "bez_dph": None, "celkem": 100.0}
+    assert [r["celkem"] for r in got] == [r[3] for r in rows]
+    base = round(sum(r[3] for r in rows), 2)
+    assert tally.summary({"castka_bez_dph": base}) == {"pocet": 95, "soucet": base, "kontrola": True}
+    assert tally.summary({"castka_bez_dph": base + 100})["kontrola"] is False
+
+def test_page_range():
+    """Rozsah stran vybere jen položky dané faktury (rozdělené PDF)"""
+    pytest.importorskip("pdfplumber")
+    rows = [(f"Radek {i}", 1, 10.0, 10.0) for i in range(50)]
+    assert len(list(items.iter_items("a.pdf", _pdf(rows), first=1, end=2))) == 10
+
+def test_word_boxes_right_aligned_and_continuation():
+    """Čísla zarovnaná doprava, jednotka u množství, pokračující popis a osamocená částka pod tabulkou"""
+    words = (_line(0, (40, "Označení dodávky"), (300, "Počet"), (380, "Jedn. cena"), (470, "Celkem"))
+             + _line(20, (40, "Hovorné"), (296, "2,5 ks"), (384, "100,00"), (462, "250,00"))
+             + _line(32, (40, "mimo EU"))
+             + _line(60, (40, "Paušál"), (305, "1"), (384, "399,00"), (462, "399,00"))
+             + _line(200, (462, "0,40"))
+             + _line(220, (300, "Celkem k úhradě"), (462, "649,40")))
+    got = list(items.rows([words]))
+    assert got == [
+        {"popis": "Hovorné mimo EU", "mnozstvi": 2.5, "jednotka": "ks", "cena_za_jednotku": 100.0,
+         "sazba_dph": None, "bez_dph": None, "celkem": 250.0},
+        {"popis": "Paušál", "mnozstvi": 1.0, "jednotka": None, "cena_za_jednotku": 399.0,
+         "sazba_dph": None, "bez_dph": None, "celkem": 399.0},
+    ]
+
+def test_no_table():
+    """Bez hlavičky tabulky nejsou žádné položky a kontrola nemá s čím porovnat"""
+    tally = items.Tally(items.rows([_line(0, (40, "Celkem"), (300, "121,00"))]))
+    assert list(tally) == []
+    assert tally.summary({"castka_bez_dph": 100}) == {"pocet": 0, "soucet": 0.0, "kontrola": None}
+
+def _table(header, row):
+    """Hlavička a jeden řádek se stejnými sloupci (x v bodech), čísla zarovnaná doprava pod hlavičkou."""
+    xs = [40 + 62 * i for i in range(len(header))]
+    words = _line(0, *zip(xs, header))
+    for x, h, v in zip(xs, header, row):
+        words += _line(20, (x + 6 * len(h) - 6 * len(v) if v[:1].isdigit() else x, v))
+    return list(items.rows([words]))
+
+def test_vat_amount_and_base_columns():
+    """Sloupce Bez DPH a DPH (částka) nepřetékají do sazby ani do celkové částky"""
+    got = _table(["Popis", "Počet", "MJ", "Cena/MJ", "DPH %", "Bez DPH", "DPH", "Celkem"],
+                 ["Licence", "2", "ks", "1000,00", "21", "2000,00", "420,00", "2420,00"])
+    assert got == [{"popis": "Licence", "mnozstvi": 2.0, "jednotka": "ks", "cena_za_jednotku": 1000.0,
+                    "sazba_dph": 21.0, "bez_dph": 2000.0, "celkem": 2420.0}]
+    tally = items.Tally(iter(got))
+    list(tally)
+    assert tally.summary({"castka_bez_dph": 2000.0})["kontrola"] is True
+
+def test_zaklad_castka_celkem_columns():
+    """U „Základ | Částka | Celkem“ je řádkem celkem sloupec Celkem, Částka (DPH) se ignoruje"""
+    got = _table(["Položka", "Množství", "Základ", "Částka", "Celkem"],
+                 ["Servis", "1", "2000,00", "420,00", "2420,00"])
+    assert got[0]["bez_dph"] == 2000.0 and got[0]["celkem"] == 2420.0
+    got = _table(["Položka", "Množství", "Cena/MJ", "Částka"], ["Servis", "1", "500,00", "500,00"])
+    assert got[0]["celkem"] == 500.0
+
+def test_cell_with_two_amounts_rejected():
+    """Buňka s více čísly (slova jiného sloupce) není částka"""
+    assert items._amount("4200 242") is None
+    assert items._amount("1 234,56 Kč") == 1234.56
+    assert items._amount("1,234.56") == 1234.56
+    assert items._amount("21 %") == 21.0
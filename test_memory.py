@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test odhadu paměti, zmenšování velkých obrázků a přijímání dokumentů podle paměťového rozpočtu
+"""
+
+import io
+import sys
+import struct
+import threading
+import time
+import zlib
+sys.path.append('backend')
+
+import pytest
+
+from extractors import memory
+
+def _png_header(w, h):
+    """PNG, který má v hlavičce zadaný rozměr (pixely se nikdy nedekódují)."""
+    ihdr = struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    idat = b"IDAT"
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+            + struct.pack(">I", 0) + idat + struct.pack(">I", zlib.crc32(idat)))
+
+def test_plan():
+    """Zmenšení na cílové DPI / limit pixelů a omezené zvětšení malých obrázků"""
+    assert memory.target_size((2480, 3508), (300, 300)) is None
+    assert memory.target_size((4960, 7016), (600, 600)) == (2480, 3508)
+    w, h = memory.target_size((20000, 10000))
+    assert w * h <= memory.MAX_IMAGE_PIXELS and abs(w / h - 2) < 0.01
+    assert memory.upscale_factor((600, 800)) == 2
+    assert memory.upscale_factor((300, 400)) == 3
+    assert memory.upscale_factor((900, 60000)) == 1  # 3× by přesáhlo MAX_IMAGE_PIXELS
+    assert memory.max_scale((1000, 1000)) == 3 and memory.max_scale((8000, 8000)) == 1
+    assert memory.image_bytes((1000, 1000), "RGB") == 3_000_000 + 1_350_000 + 3 * 9_000_000
+
+def test_estimate_from_header():
+    """Odhad z hlavičky bez dekódování; příliš velký obrázek se odmítne"""
+    assert memory.estimate("a.png", _png_header(2000, 1000)) > 2000 * 1000 * 3
+    with pytest.raises(memory.Rejected):
+        memory.estimate("bomb.png", _png_header(30000, 30000))
+    assert memory.estimate("a.pdf", b"x" * 1000) == 4000 + memory.PDF_RASTER
+
+def test_open_image_downscales():
+    Image = pytest.importorskip("PIL.Image")
+    from extractors import ocr
+    buf = io.BytesIO()
+    Image.new("RGB", (1200, 1600), "white").save(buf, "JPEG", dpi=(1200, 1200))
+    assert ocr._open_image(buf.getvalue()).size == (300, 400)
+
+def test_budget_admission():
+    """Dokument čeká, dokud se nevejde do rozpočtu; po timeoutu je odmítnut"""
+    budget = memory.Budget(100)
+    assert budget.acquire(60)
+    assert not budget.acquire(60, timeout=0.01)
+    threading.Timer(0.05, budget.release, (60,)).start()
+    t = time.perf_counter()
+    assert budget.acquire(60, timeout=2)
+    assert time.perf_counter() - t >= 0.04
+    budget.release(60)
+    assert budget.acquire(500) and budget.used == 100  # větší než celý rozpočet: jen samotný
+    budget.release(500)
+    assert budget.used == 0
+
+def test_track_peak_measures_rss():
+    """Skutečná špička: dočasně alokovaných 64 MB se projeví v naměřené paměti dokumentu"""
+    if memory.rss() is None:
+        pytest.skip("RSS not readable on this platform")
+    with memory.track_peak() as peak:
+        block = bytearray(64 * 2 ** 20)
+        block[::4096] = b"x" * len(block[::4096])  # touch every page so it is resident
+        time.sleep(3 * memory.PEAK_INTERVAL)
+        del block
+    assert peak["bytes"] >= 48 * 2 ** 20
+    with memory.track_peak() as idle:
+        pass
+    assert idle["bytes"] < 16 * 2 ** 20
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Test pro metriky (Prometheus formát) a měření časů fází
+"""
+
+import sys
+sys.path.append('backend')
+
+from extractors import metrics
+
+def test_timed_stage_is_recorded():
+    """Ověří, že fáze se zapíše do histogramu i do timings bloku požadavku"""
+    with metrics.track_request() as rec:
+        with metrics.timed("unit_test_stage"):
+            pass
+        with metrics.timed("unit_test_stage"):
+            pass
+    timings = rec.as_dict()
+    print(f"  timings: {timings}")
+    assert timings["stages"]["unit_test_stage"]["calls"] == 2
+    assert 'invoice_stage_seconds_count{stage="unit_test_stage"} 2' in metrics.render()
+
+def test_counters_render():
+    """Ověří textový výstup čítačů"""
+    metrics.METHOD_TOTAL.inc(method="unit_test")
+    metrics.swallowed("unit_test", ValueError("x"))
+    out = metrics.render()
+    assert 'invoice_extract_method_total{method="unit_test"} 1' in out
+    assert 'invoice_swallowed_exceptions_total{where="unit_test",exception="ValueError"} 1' in out
+    assert "# TYPE invoice_stage_seconds histogram" in out
+
+if __name__ == "__main__":
+    test_timed_stage_is_recorded()
+    test_counters_render()
+    print("\n=== Test dokončen ===")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test rychlých parserů částek a dat – výstup musí být shodný s původní (pomalou) implementací
+"""
+
+import random
+import sys
+sys.path.append('backend')
+
+from extractors import utils
+
+CURRENCIES = ["", "Kč", "CZK", "kč", "EUR", "€", "$", "USD", "zł", "Ft", "kr", "eur"]
+SPACES = ["", " ", " ", "  ", "\t"]
+
+def random_amount(rng):
+    r = rng.random()
+    if r < 0.1:
+        return rng.choice([None, 0, -3, 10 ** 18, 1.005, 2.675, 1e-7, 1e16, float("nan"), True, 12.5, -0.0])
+    if r < 0.2:
+        return round(rng.uniform(-1e6, 1e7), rng.choice([0, 1, 2, 3]))
+    v = rng.uniform(0, 10 ** rng.randrange(1, 9))
+    whole = str(int(v))
+    dec = rng.choice(["", "0", "00", "5", "50", "99", "123"])
+    grp = rng.choice(["", " ", " ", ",", ".", "'"])
+    if grp and rng.random() < 0.8:
+        parts = []
+        while len(whole) > 3:
+            parts.insert(0, whole[-3:])
+            whole = whole[:-3]
+        whole = grp.join([whole] + parts)
+    s = whole + (rng.choice([",", ".", ", "]) + dec if dec else "")
+    if rng.random() < 0.2:
+        s = "-" + s
+    if rng.random() < 0.1:
+        s = rng.choice(["- ", "−", "+", "ca ", "Celkem: "]) + s
+    cur = rng.choice(CURRENCIES)
+    if cur:
+        s = (cur + rng.choice(SPACES) + s) if rng.random() < 0.3 else (s + rng.choice(SPACES) + cur)
+    if rng.random() < 0.1:
+        s = rng.choice(SPACES) + s + rng.choice(SPACES + ["\n", ".", ",-", " Kč/ks"])
+    if rng.random() < 0.03:
+        s = s.replace("1", "١")
+    return s
+
+def random_date(rng):
+    r = rng.random()
+    if r < 0.1:
+        return rng.choice([None, "", "2025-06-12", "2025.06.12", "12. června 2025", "June 12, 2025", "12.06.25",
+                           "1.1.1899", "29.02.2024", "29.02.2025", "00.01.2025", "12.06.2025 10:30", "Q2 2025"])
+    d, m, y = rng.randrange(0, 34), rng.randrange(0, 15), rng.choice([rng.randrange(1850, 2230), rng.randrange(0, 100)])
+    sep = rng.choice([".", "/", "-", " ", ". ", "-"])
+    ds = f"{d:02d}" if rng.random() < 0.5 else str(d)
+    ms = f"{m:02d}" if rng.random() < 0.5 else str(m)
+    s = f"{ds}{sep}{ms}{rng.choice([sep, '.', '/'])}{y}"
+    if rng.random() < 0.1:
+        s = rng.choice([" ", "Datum: ", "\t"]) + s + rng.choice(["", " ", "\n"])
+    return s
+
+def test_parse_amount_equivalence():
+    """50 000 náhodných vstupů: parse_amount == původní implementace"""
+    rng = random.Random(2024)
+    for _ in range(50000):
+        s = random_amount(rng)
+        fast, slow = utils.parse_amount(s), utils._parse_amount_slow(s)
+        assert fast == slow or (fast != fast and slow != slow), (s, fast, slow)
+
+def test_normalize_date_equivalence():
+    """Náhodná data (platná i neplatná, různé oddělovače): normalize_date == původní implementace"""
+    rng = random.Random(7)
+    for _ in range(30000):
+        s = random_date(rng)
+        assert utils.normalize_date(s) == utils._normalize_date_slow(s), s
+    for d in range(1, 32):
+        for m in range(1, 13):
+            s = f"{d}.{m}.2025"
+            assert utils.normalize_date(s) == utils._normalize_date_slow(s), s
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test registru regulárních výrazů (kontrola backtrackingu, timeout, metriky)
+"""
+
+import re
+import sys
+sys.path.append('backend')
+
+import pytest
+
+from extractors import patterns, metrics
+from extractors.templates import Template, _compile_fields
+from extractors.heuristics import AMOUNT_PAT_STRICT, DATE_PAT, _label_lines
+
+def test_hazard_detection():
+    """Vnořené kvantifikátory a nejednoznačné alternativy jsou odmítnuty"""
+    assert patterns.hazard(r"(\d+\s?)+X")
+    assert patterns.hazard(r"(a|aa)+c")
+    assert patterns.hazard(r"(?:x+x+)*y")
+    assert patterns.hazard(r"(?>\d+\s?)+") is None
+    assert patterns.hazard(r"(?:\d+\s?)++") is None
+    assert patterns.hazard(AMOUNT_PAT_STRICT) is None
+    assert patterns.hazard(DATE_PAT) is None
+    assert patterns.hazard(r"ČEZ Prodej.*?\n(.*)", re.S) is None
+    with pytest.raises(patterns.UnsafePattern):
+        patterns.compile(r"(\w+\s?)*$")
+
+def test_timeout_is_no_match():
+    """Překročení timeoutu se chová jako neshoda a započítá se"""
+    p = patterns.SafePattern(r"(a|aa)+c", name="test_slow", timeout=0.05)
+    assert p.search("a" * 40) is None
+    assert p.finditer("a" * 40) == []
+    assert metrics.render().count('invoice_regex_timeouts_total{pattern="test_slow"}') == 1
+
+def test_template_rejects_unsafe_field():
+    """Nebezpečné pole šablony se při načtení vyřadí, ostatní fungují"""
+    tpl = Template(name="Test", required_keywords=["Test"], optional_keywords=[],
+                   fields={"variabilni_symbol": r"VS[:\s]+(\d+)", "dodavatel_adresa": r"((?:\w+\s?)+)\n"},
+                   supplier_defaults={})
+    _compile_fields(tpl)
+    assert "dodavatel_adresa" in tpl.rejected
+    assert "dodavatel_adresa" not in tpl.compiled
+    assert tpl.compiled["variabilni_symbol"].search("VS: 123456").group(1) == "123456"
+
+def test_label_lines_match_per_line_search():
+    """Jeden průchod spojeným textem najde stejné řádky jako hledání po řádcích"""
+    lines = ["Faktura", "Datum zdan.", "plnění 1.1.2024", "Celkem k", "úhradě 100", "zdan. pln 2.1.2024"]
+    label = patterns.compile(r"zdan\.\s*pln|celkem k úhradě|faktura", re.I)
+    assert _label_lines(lines, label) == [i for i, ln in enumerate(lines) if label.search(ln)]
+
+def test_metrics_per_pattern():
+    """Čas a počet volání se exportují pro každý vzor"""
+    p = patterns.compile(r"IČO\s*(\d{8})", name="test_ico")
+    assert p.search("IČO 27082440").group(1) == "27082440"
+    out = metrics.render()
+    assert 'invoice_regex_calls_total{pattern="test_ico"} 1' in out
+    assert 'invoice_regex_seconds_total{pattern="test_ico"}' in out
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test průběhových událostí (SSE) a zrušení rozpracované extrakce
+"""
+
+import sys
+sys.path.append('backend')
+
+import pytest
+
+from extractors import progress, metrics
+
+def test_events_and_stages():
+    """Události nesou elapsed_ms; metrics.timed hlásí dokončené fáze"""
+    events = []
+    reporter = progress.Reporter(events.append)
+    progress.emit("page", page=1, pages=2)  # bez reporteru nic
+    with metrics.track_request() as rec, progress.track(reporter):
+        rec.on_stage = reporter.stage
+        progress.emit("page", page=1, pages=2, source="text")
+        with metrics.timed("template"):
+            pass
+    assert [e["event"] for e in events] == ["page", "stage"]
+    assert events[0]["page"] == 1 and events[0]["elapsed_ms"] >= 0
+    assert events[1]["stage"] == "template" and "ms" in events[1]
+
+def test_cancel():
+    """Po odpojení klienta vyvolá další bod průběhu Cancelled, který obecné except nezachytí"""
+    reporter = progress.Reporter(lambda e: None)
+    with progress.track(reporter):
+        progress.checkpoint()
+        reporter.cancel()
+        with pytest.raises(progress.Cancelled):
+            try:
+                progress.emit("page", page=2, pages=30)
+            except Exception:
+                pytest.fail("Cancelled was swallowed")
+        with pytest.raises(progress.Cancelled):
+            progress.checkpoint()
+    progress.checkpoint()  # mimo kontext bez efektu
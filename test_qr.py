@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test QR Platba (SPAYD) a QR Faktura - parsování a sloučení s extrakcí
+"""
+
+import sys
+import zlib
+sys.path.append('backend')
+
+from extractors import qr
+
+def _with_crc(kind, body):
+    canonical = "*".join([kind, "1.0"] + sorted(body.split("*")))
+    return f"{kind}*1.0*{body}*CRC32:{zlib.crc32(canonical.encode()):08X}"
+
+SPD = _with_crc("SPD", "ACC:CZ5855000000001265098001+RZBCCZPP*AM:12100.00*CC:CZK*MSG:Faktura%2A2024*X-VS:2024001234*DT:20250626")
+
+def test_parse_spayd():
+    """Pole QR Platby ve schématu extrakce"""
+    p = qr.parse_spayd(SPD)
+    assert p["type"] == "SPD" and p["crc"] is True
+    assert p["fields"] == {
+        "ucet_prijemce": "1265098001/5500", "castka_s_dph": 12100.0, "mena": "CZK",
+        "variabilni_symbol": "2024001234", "datum_splatnosti": "2025-06-26",
+    }
+    assert p["raw"]["MSG"] == "Faktura*2024"
+    assert qr.parse_spayd("https://example.com") is None
+    assert qr.parse_spayd("SPD*1.0*AM:abc*DT:20251340")["fields"] == {}
+
+def test_parse_qr_faktura():
+    """QR Faktura (SID) doplní dodavatele, data a DPH"""
+    p = qr.parse_spayd("SID*1.0*ID:FV2025001*DD:20250612*AM:12100*VS:2024001234*INI:27082440*VII:CZ27082440"
+                       "*DUZP:20250612*DT:20250626*TB0:10000*T0:2100*CC:CZK*ACC:CZ6508000000192000145399")
+    f = p["fields"]
+    assert f["datum_vystaveni"] == "2025-06-12" and f["duzp"] == "2025-06-12"
+    assert f["castka_bez_dph"] == 10000.0 and f["dph"] == 2100.0
+    assert f["dodavatel"] == {"ico": "27082440", "dic": "CZ27082440"}
+    assert f["ucet_prijemce"] == "19-2000145399/0800"
+    assert qr.complete(qr.to_result(p))
+    assert not qr.complete(qr.to_result(qr.parse_spayd(SPD)))
+
+def test_merge_authoritative():
+    """Hodnoty z QR přepíší OCR; při chybném CRC jen doplní chybějící"""
+    data = {"castka_s_dph": 12000.0, "variabilni_symbol": None, "dodavatel": {"ico": "27082440"}}
+    qr.merge(data, qr.parse_spayd(SPD))
+    assert data["castka_s_dph"] == 12100.0 and data["variabilni_symbol"] == "2024001234"
+    assert set(data["_qr"]["fields"]) == {"ucet_prijemce", "castka_s_dph", "mena", "variabilni_symbol", "datum_splatnosti"}
+
+    bad = qr.parse_spayd(SPD.rsplit("*", 1)[0] + "*CRC32:00000000")
+    assert bad["crc"] is False
+    data = {"castka_s_dph": 12000.0}
+    qr.merge(data, bad)
+    assert data["castka_s_dph"] == 12000.0 and data["variabilni_symbol"] == "2024001234"
+
+def test_decode_image():
+    """Dekódování vygenerovaného QR kódu dekodérem z requirements.txt"""
+    import io
+    import qrcode  # requirements-dev.txt
+    assert qr.available(), "no QR decoder: pip install -r requirements.txt"
+    buf = io.BytesIO()
+    qrcode.make(SPD).save(buf, format="PNG")
+    assert qr.scan("faktura.png", buf.getvalue())["fields"]["castka_s_dph"] == 12100.0
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test offline registru firem (mmap index IČO → název, DIČ, adresa)
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append('backend')
+
+from extractors import registry
+
+ROWS = [
+    ("27082440", "Alza.cz a.s.", "CZ27082440", "Jankovcova 1522/53, 170 00 Praha 7"),
+    ("45274649", "ČEZ, a. s.", "CZ45274649", "Duhová 1444/2, 140 00 Praha 4"),
+    ("60193336", "O2 Czech Republic a.s.", "CZ60193336", "Za Brumlovkou 266/2, 140 22 Praha 4"),
+] + [(str(10000000 + i * 7), f"Firma {i} s.r.o.", "", "") for i in range(5000)]
+
+def _build():
+    path = os.path.join(tempfile.mkdtemp(), "registry.bin")
+    assert registry.build(iter(ROWS), path) == len(ROWS)
+    return registry.Registry(path)
+
+def test_lookup():
+    """Binární hledání v namapovaném indexu"""
+    reg = _build()
+    assert reg.lookup("27082440")["nazev"] == "Alza.cz a.s."
+    assert reg.lookup("10000070")["nazev"] == "Firma 10 s.r.o."
+    assert reg.lookup("10000071") is None
+    assert reg.lookup("99999999") is None
+    reg.close()
+
+def test_supplier_correction():
+    """Zkomolený název z OCR se opraví, nesouvisející název se jen nahlásí"""
+    reg = _build()
+    data = {"dodavatel": {"nazev": "CEZ, a. 5.", "ico": "45274649", "dic": None, "adresa": None}}
+    registry.apply_to_supplier(data, "", reg)
+    print(f"  {data}")
+    assert data["dodavatel"]["nazev"] == "ČEZ, a. s."
+    assert data["dodavatel"]["dic"] == "CZ45274649"
+    assert data["_registry"]["status"] == "corrected"
+
+    data = {"dodavatel": {"nazev": "Úplně jiná firma s.r.o.", "ico": "27082440"}}
+    registry.apply_to_supplier(data, "faktura ...", reg)
+    assert data["dodavatel"]["nazev"] == "Úplně jiná firma s.r.o."
+    assert data["_registry"]["status"] == "mismatch"
+
+    # IČO dopočtené z DIČ
+    data = {"dodavatel": {"nazev": "O2 Czech Republic a.s.", "ico": None, "dic": "CZ60193336"}}
+    registry.apply_to_supplier(data, "", reg)
+    assert data["dodavatel"]["ico"] == "60193336"
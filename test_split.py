@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test rozdělení vícefakturového PDF na jednotlivé faktury podle textu stránek
+"""
+
+import sys
+sys.path.append('backend')
+
+from extractors import split
+
+def _page(no, vs=None, header=True, total=False, marker=None):
+    lines = ["Faktura - daňový doklad"] if header else ["Pokračování"]
+    if no:
+        lines.append(f"Číslo faktury: {no}")
+    if marker:
+        lines.append("Strana %d z %d" % marker)
+    lines.append("Dodavatel: ČEZ Prodej, a.s., IČO: 27232433")
+    if vs:
+        lines.append(f"Variabilní symbol: {vs}")
+    if total:
+        lines.append("Celkem k úhradě: 1 210,00 Kč")
+    return "\n".join(lines)
+
+def test_invoice_number_changes():
+    """Nové číslo faktury = nová faktura; stránka se stejným číslem pokračuje"""
+    pages = [_page("FV001", total=True), _page("FV002"), _page("FV002", total=True), _page("FV003", total=True)]
+    assert split.segments(pages) == [(0, 1), (1, 3), (3, 4)]
+
+def test_page_markers_win():
+    """Značka „Strana 1 z N“ rozhoduje i proti hlavičce bez čísla"""
+    pages = [_page(None, marker=(1, 2)), _page(None, marker=(2, 2), total=True),
+             _page(None, marker=(1, 1), total=True)]
+    assert split.boundaries(pages) == [0, 2]
+
+def test_header_after_total_and_blank_pages():
+    """Hlavička bez čísla začíná fakturu jen po řádku k úhradě; prázdné a doplňkové stránky pokračují"""
+    pages = [_page(None, vs="1001", total=True), "", _page(None, header=False),
+             _page(None), _page(None, total=True)]
+    assert split.segments(pages) == [(0, 3), (3, 5)]
+    assert split.segments([_page("FV001", total=True)]) == [(0, 1)]
+    assert split.segments([]) == []
+
+def test_signals():
+    """Signály jedné stránky"""
+    s = split.page_signals("Invoice no. INV-2025/17\nPage 3 of 4\nAmount due: 10.00 EUR")
+    assert (s.invoice_no, s.page_no, s.page_total, s.header, s.total) == ("INV-2025/17", 3, 4, True, True)
+    assert split.page_signals("  \n ").blank
+
+def test_invoice_number_and_vs_not_compared():
+    """Pokračovací stránka jen s VS (shodným s VS první stránky) nezačíná novou fakturu"""
+    pages = [_page("FV24001", vs="24001", total=False), _page(None, vs="24001", header=False, total=True)]
+    assert split.segments(pages) == [(0, 2)]
+    pages = [_page("FV24001", vs="24001", total=True), _page(None, vs="24002", total=True)]
+    assert split.segments(pages) == [(0, 1), (1, 2)]